@@ -0,0 +1,327 @@
+import os
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .rclone import CACHE_DIR
+except ImportError:
+    from rclone import CACHE_DIR
+
+CATALOG_FILE = CACHE_DIR / "catalog.sqlite"
+CONFIG_BASE = Path('/workspace/SimpleTuner/config')
+OUTPUT_BASE = Path('/workspace/SimpleTuner/output')
+DATASETS_BASE = Path('/workspace/SimpleTuner/datasets')
+LORA_BASE = Path('/workspace/ComfyUI/models/loras/flux')
+# Remote folder the LoRA library syncs to, below the configured store
+LORA_REMOTE = "studio/ai/libs/diffusion-models/models/loras/flux"
+EXCLUDED_DIRS = {'.ipynb_checkpoints', 'templates'}
+
+# config.json options kept as columns so they can be queried directly
+HYPERPARAMETERS = {
+    "--learning_rate": "learning_rate",
+    "--lora_rank": "lora_rank",
+    "--lora_alpha": "lora_alpha",
+    "--train_batch_size": "train_batch_size",
+    "--optimizer": "optimizer",
+    "--lr_scheduler": "lr_scheduler",
+    "--max_train_steps": "max_train_steps",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    base TEXT, name TEXT, family TEXT, model TEXT, version TEXT,
+    dir_mtime INTEGER, config_mtime INTEGER,
+    learning_rate REAL, lora_rank INTEGER, lora_alpha REAL, train_batch_size INTEGER,
+    optimizer TEXT, lr_scheduler TEXT, max_train_steps INTEGER, options TEXT,
+    validation_grid INTEGER, dataset_grid INTEGER,
+    PRIMARY KEY (base, name)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    base TEXT, model TEXT, version TEXT, dir_mtime INTEGER,
+    validation_mtime INTEGER, validation_images INTEGER,
+    PRIMARY KEY (base, model, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    base TEXT, model TEXT, version TEXT, name TEXT, step INTEGER,
+    PRIMARY KEY (base, model, version, name)
+);
+CREATE TABLE IF NOT EXISTS library (
+    base TEXT, family TEXT, version TEXT, dir_mtime INTEGER,
+    files INTEGER, bytes INTEGER, pending INTEGER,
+    PRIMARY KEY (base, family, version)
+);
+CREATE TABLE IF NOT EXISTS folders (
+    base TEXT, path TEXT, mtime INTEGER,
+    PRIMARY KEY (base, path)
+);
+"""
+
+
+def family_name(config_name: str) -> str:
+    """The family of a config folder: its name up to the first `_`."""
+    return config_name.split('_')[0]
+
+
+def _subdirs(path: Path) -> Dict[str, int]:
+    """Visible subfolders of `path` -> mtime_ns (empty if missing)."""
+    try:
+        entries = list(os.scandir(path))
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    return {entry.name: entry.stat().st_mtime_ns for entry in entries
+            if entry.is_dir() and entry.name not in EXCLUDED_DIRS and not entry.name.startswith('.')}
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class Catalog:
+    """SQLite index of config folders, training outputs and the LoRA library.
+
+    `refresh` walks the three trees but only re-reads a folder whose mtime
+    (or, for configs, whose config.json mtime) changed since the last
+    refresh, so repeated lookups cost one stat per folder instead of a
+    parse per file. Rows are keyed by the base folder, so tools pointed at
+    different trees share one database.
+    """
+
+    def __init__(self, config_base: Path = CONFIG_BASE, output_base: Path = OUTPUT_BASE,
+                 lora_base: Path = LORA_BASE, db_file: Optional[Path] = None, lora_remote: Optional[str] = None):
+        self.config_base = Path(config_base).absolute()
+        self.output_base = Path(output_base).absolute()
+        self.lora_base = Path(lora_base).absolute()
+        # Only needed for the library's sync state; resolved on first use
+        self.lora_remote = lora_remote
+        self.db_file = Path(db_file) if db_file else CATALOG_FILE
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.db_file), timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self.refreshed = set()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _ensure(self, tree: str) -> None:
+        # Each tree is refreshed on first use; call refresh() to pick up later changes
+        if tree not in self.refreshed:
+            self.refresh([tree])
+
+    def refresh(self, trees: Iterable[str] = ("configs", "outputs", "library")) -> Dict[str, int]:
+        """Bring the index up to date; returns how many folders were re-read per tree."""
+        counts = {}
+        with self.db:
+            for tree in trees:
+                counts[tree] = getattr(self, f"_refresh_{tree}")()
+                self.refreshed.add(tree)
+        return counts
+
+    # -- configs ---------------------------------------------------------------
+
+    def _refresh_configs(self) -> int:
+        base = str(self.config_base)
+        known = {row["name"]: (row["dir_mtime"], row["config_mtime"]) for row in
+                 self.db.execute("SELECT name, dir_mtime, config_mtime FROM configs WHERE base = ?", (base,))}
+        current = _subdirs(self.config_base)
+
+        gone = [(base, name) for name in known if name not in current]
+        self.db.executemany("DELETE FROM configs WHERE base = ? AND name = ?", gone)
+
+        reread = 0
+        for name, dir_mtime in current.items():
+            config_dir = self.config_base / name
+            config_mtime = _mtime(config_dir / "config.json")
+            if known.get(name) == (dir_mtime, config_mtime):
+                continue
+            self.db.execute("INSERT OR REPLACE INTO configs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                            self._config_row(base, config_dir, dir_mtime, config_mtime))
+            reread += 1
+        return reread
+
+    def _config_row(self, base: str, config_dir: Path, dir_mtime: int, config_mtime: Optional[int]) -> Tuple:
+        options = {}
+        try:
+            with open(config_dir / "config.json", "r", encoding="utf-8") as f:
+                options = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if not isinstance(options, dict):
+            options = {}
+
+        # --output_dir is <output>/<model>/<version>; older configs fall back
+        # to the <model>_<version> folder name
+        if options.get("--output_dir"):
+            output_dir = Path(str(options["--output_dir"]))
+            model, version = output_dir.parent.name, output_dir.name
+        else:
+            model, _, version = config_dir.name.partition('_')
+
+        values = []
+        for option in HYPERPARAMETERS:
+            value = options.get(option)
+            values.append(value if value is None or isinstance(value, (int, float)) else str(value))
+        files = set(os.listdir(config_dir))
+        return (base, config_dir.name, family_name(config_dir.name), model, version, dir_mtime, config_mtime,
+                *values, json.dumps(options),
+                int(f"{model}_{version}-validation-grid.jpg" in files),
+                int(f"{config_dir.name}-dataset-grid.jpg" in files))
+
+    def configs(self, pattern: Optional[str] = None, family: Optional[str] = None) -> List[sqlite3.Row]:
+        """Config rows, optionally only names containing `pattern` or one family."""
+        self._ensure("configs")
+        sql = "SELECT * FROM configs WHERE base = ?"
+        params: List = [str(self.config_base)]
+        if pattern:
+            sql += " AND instr(name, ?) > 0"
+            params.append(pattern)
+        if family:
+            sql += " AND family = ?"
+            params.append(family)
+        return list(self.db.execute(sql + " ORDER BY name", params))
+
+    def config_names(self, pattern: Optional[str] = None) -> List[str]:
+        return [row["name"] for row in self.configs(pattern)]
+
+    def config(self, name: str) -> Optional[sqlite3.Row]:
+        self._ensure("configs")
+        return self.db.execute("SELECT * FROM configs WHERE base = ? AND name = ?",
+                               (str(self.config_base), name)).fetchone()
+
+    def families(self) -> Dict[str, List[Path]]:
+        """Config folders grouped by family."""
+        families: Dict[str, List[Path]] = {}
+        for row in self.configs():
+            families.setdefault(row["family"], []).append(self.config_base / row["name"])
+        return families
+
+    # -- outputs ---------------------------------------------------------------
+
+    def _refresh_outputs(self) -> int:
+        base = str(self.output_base)
+        known = {(row["model"], row["version"]): (row["dir_mtime"], row["validation_mtime"]) for row in
+                 self.db.execute("SELECT model, version, dir_mtime, validation_mtime FROM outputs WHERE base = ?",
+                                 (base,))}
+        current = {}
+        for model in _subdirs(self.output_base):
+            for version, dir_mtime in _subdirs(self.output_base / model).items():
+                validation_mtime = _mtime(self.output_base / model / version / "validation_images")
+                current[(model, version)] = (dir_mtime, validation_mtime)
+
+        for model, version in known:
+            if (model, version) not in current:
+                self.db.execute("DELETE FROM outputs WHERE base = ? AND model = ? AND version = ?",
+                                (base, model, version))
+                self.db.execute("DELETE FROM checkpoints WHERE base = ? AND model = ? AND version = ?",
+                                (base, model, version))
+
+        reread = 0
+        for (model, version), mtimes in current.items():
+            if known.get((model, version)) == mtimes:
+                continue
+            version_dir = self.output_base / model / version
+            checkpoints = []
+            for name in _subdirs(version_dir):
+                step = name.split('-')[-1]
+                if name.startswith('checkpoint-') and step.isdigit():
+                    checkpoints.append((base, model, version, name, int(step)))
+            validation_images = 0
+            if mtimes[1] is not None:
+                validation_images = sum(1 for name in os.listdir(version_dir / "validation_images")
+                                        if name.endswith(".png"))
+            self.db.execute("DELETE FROM checkpoints WHERE base = ? AND model = ? AND version = ?",
+                            (base, model, version))
+            self.db.executemany("INSERT INTO checkpoints VALUES (?,?,?,?,?)", checkpoints)
+            self.db.execute("INSERT OR REPLACE INTO outputs VALUES (?,?,?,?,?,?)",
+                            (base, model, version, mtimes[0], mtimes[1], validation_images))
+            reread += 1
+        return reread
+
+    def output_models(self) -> List[str]:
+        self._ensure("outputs")
+        return [row[0] for row in self.db.execute(
+            "SELECT DISTINCT model FROM outputs WHERE base = ? ORDER BY model", (str(self.output_base),))]
+
+    def output_versions(self, model: str) -> List[str]:
+        self._ensure("outputs")
+        return [row[0] for row in self.db.execute(
+            "SELECT version FROM outputs WHERE base = ? AND model = ? ORDER BY version",
+            (str(self.output_base), model))]
+
+    def versions(self, model: str) -> List[str]:
+        """Versions of a model found in output/ or named by a config."""
+        versions = set(self.output_versions(model))
+        versions.update(row["version"] for row in self.configs() if row["model"] == model)
+        return sorted(versions, key=lambda x: str(x))
+
+    def checkpoints(self, model: str, version: str) -> List[sqlite3.Row]:
+        self._ensure("outputs")
+        return list(self.db.execute(
+            "SELECT name, step FROM checkpoints WHERE base = ? AND model = ? AND version = ? ORDER BY step",
+            (str(self.output_base), model, version)))
+
+    def output(self, model: str, version: str) -> Optional[sqlite3.Row]:
+        self._ensure("outputs")
+        return self.db.execute("SELECT * FROM outputs WHERE base = ? AND model = ? AND version = ?",
+                               (str(self.output_base), model, version)).fetchone()
+
+    # -- LoRA library ----------------------------------------------------------
+
+    def _refresh_library(self) -> int:
+        try:
+            from .sync_journal import SyncJournal
+            from .remote_store import get_store
+        except ImportError:
+            from sync_journal import SyncJournal
+            from remote_store import get_store
+
+        base = str(self.lora_base)
+        known = {(row["family"], row["version"]): row["dir_mtime"] for row in
+                 self.db.execute("SELECT family, version, dir_mtime FROM library WHERE base = ?", (base,))}
+        current = {}
+        for family in _subdirs(self.lora_base):
+            for version, dir_mtime in _subdirs(self.lora_base / family).items():
+                current[(family, version)] = dir_mtime
+
+        gone = [(base, family, version) for family, version in known if (family, version) not in current]
+        self.db.executemany("DELETE FROM library WHERE base = ? AND family = ? AND version = ?", gone)
+
+        # Sync state comes from the journal's recorded changes; no extra walk
+        pending: Dict[Tuple[str, str], int] = {}
+        if current:
+            remote = self.lora_remote or get_store().path(LORA_REMOTE)
+            for rel in SyncJournal(self.lora_base, remote).pending:
+                parts = rel.split('/')
+                if len(parts) > 2:
+                    pending[(parts[0], parts[1])] = pending.get((parts[0], parts[1]), 0) + 1
+
+        reread = 0
+        for (family, version), dir_mtime in current.items():
+            if known.get((family, version)) == dir_mtime:
+                self.db.execute("UPDATE library SET pending = ? WHERE base = ? AND family = ? AND version = ?",
+                                (pending.get((family, version), 0), base, family, version))
+                continue
+            files = size = 0
+            for entry in os.scandir(self.lora_base / family / version):
+                if entry.is_file() and not entry.name.startswith('.'):
+                    files += 1
+                    size += entry.stat().st_size
+            self.db.execute("INSERT OR REPLACE INTO library VALUES (?,?,?,?,?,?,?)",
+                            (base, family, version, dir_mtime, files, size, pending.get((family, version), 0)))
+            reread += 1
+        return reread
+
+    def library_families(self) -> List[str]:
+        self._ensure("library")
+        return [row[0] for row in self.db.execute(
+            "SELECT DISTINCT family FROM library WHERE base = ? ORDER BY family", (str(self.lora_base),))]
+
+    def library_versions(self, family: str) -> List[sqlite3.Row]:
+        self._ensure("library")
+        return list(self.db.execute(
+            "SELECT * FROM library WHERE base = ? AND family = ? ORDER BY version", (str(self.lora_base), family)))
@@ -0,0 +1,159 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+# Fastest available hash wins; hashlib is always there as a fallback
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+SIDECAR_FILE = "checksums.json"
+READ_CHUNK_SIZE = 8 * 1024 * 1024
+CONTENT_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def default_algorithm() -> str:
+    """Name of the hash algorithm used for new sidecar entries."""
+    if xxhash is not None:
+        return "xxh3_128"
+    if blake3 is not None:
+        return "blake3"
+    return "blake2b"
+
+
+def new_hasher(algorithm: Optional[str] = None):
+    """Create a streaming hasher for the given (or default) algorithm."""
+    algorithm = algorithm or default_algorithm()
+    if algorithm == "xxh3_128":
+        if xxhash is None:
+            raise ValueError("xxhash is not installed")
+        return xxhash.xxh3_128()
+    if algorithm == "blake3":
+        if blake3 is None:
+            raise ValueError("blake3 is not installed")
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+
+class MultiHasher:
+    """Feed the same bytes to several hashers in one pass."""
+
+    def __init__(self, *hashers):
+        self.hashers = [hasher for hasher in hashers if hasher is not None]
+
+    def update(self, data) -> None:
+        for hasher in self.hashers:
+            hasher.update(data)
+
+
+def hash_file(path: Path, algorithm: Optional[str] = None) -> str:
+    """Hash a file that was not produced by a hashing copy."""
+    hasher = new_hasher(algorithm)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentHasher:
+    """Streaming Dropbox content hash: SHA-256 over the SHA-256 of each 4 MiB block.
+
+    This is the hash rclone reports for Dropbox files (`--hash-type dropbox`),
+    so a local file can be checked against the remote copy without reading
+    it back. Takes data in chunks of any size, so it can ride along a copy.
+    """
+
+    def __init__(self):
+        self.overall = hashlib.sha256()
+        self.block = hashlib.sha256()
+        self.block_size = 0
+
+    def update(self, data) -> None:
+        data = memoryview(data)
+        while len(data):
+            take = min(len(data), CONTENT_HASH_BLOCK_SIZE - self.block_size)
+            self.block.update(data[:take])
+            self.block_size += take
+            data = data[take:]
+            if self.block_size == CONTENT_HASH_BLOCK_SIZE:
+                self.overall.update(self.block.digest())
+                self.block = hashlib.sha256()
+                self.block_size = 0
+
+    def hexdigest(self) -> str:
+        overall = self.overall.copy()
+        if self.block_size:
+            overall.update(self.block.digest())
+        return overall.hexdigest()
+
+
+def content_hash(path: Path) -> str:
+    """Dropbox content hash of a file (see `ContentHasher`)."""
+    hasher = ContentHasher()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(CONTENT_HASH_BLOCK_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def load_sidecar(directory: Path) -> Dict[str, Dict]:
+    """Read a directory's checksum sidecar (file name -> size/algorithm/hash)."""
+    sidecar = Path(directory) / SIDECAR_FILE
+    if not sidecar.exists():
+        return {}
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_sidecar(directory: Path, entries: Dict[str, Dict]) -> None:
+    """Merge entries into a directory's checksum sidecar."""
+    directory = Path(directory)
+    checksums = load_sidecar(directory)
+    checksums.update(entries)
+    # Drop entries for files that no longer exist (pruned, archived, ...)
+    checksums = {name: entry for name, entry in sorted(checksums.items())
+                 if (directory / name).exists()}
+    temp_path = directory / f".{SIDECAR_FILE}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checksums, f, indent=4)
+    temp_path.replace(directory / SIDECAR_FILE)
+
+
+def sidecar_entry(path: Path, digest: str, algorithm: Optional[str] = None, **extra) -> Dict:
+    """Build a sidecar entry for a freshly written file.
+
+    `extra` carries further hashes (the Dropbox `content_hash`) and
+    provenance fields.
+    """
+    stat = Path(path).stat()
+    return {
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "algorithm": algorithm or default_algorithm(),
+        "hash": digest,
+        **extra,
+    }
+
+
+def verify_file(path: Path, entry: Dict) -> bool:
+    """Check a file against its sidecar entry."""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size != entry.get("size"):
+        return False
+    return hash_file(path, entry.get("algorithm")) == entry.get("hash")
@@ -1,5 +1,4 @@
 import os
-import time
 import json
 from .response import Response
 from collections.abc import Mapping, Sequence
@@ -39,9 +38,45 @@ def format_float(o):
     else:
         return o
 
+# Step counts that scale down when the batch size goes up
+AUTO_DIVIDES = [
+    "--max_train_steps",
+    "--checkpointing_steps",
+    "--checkpoints_total_limit",
+    "--lr_warmup_steps",
+]
+
+def divide_by_batch_size(config, overrides, batch_size):
+    """Step values for a new batch size; `overrides` wins over `config`."""
+    return {
+        key: int(int(overrides.get(key, config[key])) / int(batch_size))
+        for key in AUTO_DIVIDES
+    }
+
+def preset_folder_names(instance_prompt, instance_prompt_version, config, keys):
+    """Config and output folder names from a naming preset's keys."""
+    folder_name_with_instance_and_version = f"{instance_prompt}_{instance_prompt_version}"
+    folder_name_with_only_version = f"{instance_prompt_version}"
+
+    for key in keys:
+        value = str(format_float(config[key])).replace('-','_')
+        folder_name_with_instance_and_version = f"{folder_name_with_instance_and_version}_{str(value)}"
+        folder_name_with_only_version = f"{folder_name_with_only_version}_{str(value)}"
+
+    return folder_name_with_instance_and_version, folder_name_with_only_version
+
+def preset_paths(config_folder, output_folder, instance_prompt, folder_i, folder_v):
+    """Config keys that point a run at its named folders."""
+    return {
+        "--tracker_run_name": folder_i,
+        "--user_prompt_library": f"{config_folder}/{folder_i}/user_prompt_library.json",
+        "--data_backend_config": f"{config_folder}/{folder_i}/multidatabackend.json",
+        "--output_dir": f"{output_folder}/{instance_prompt}/{folder_v}",
+    }
+
 class Config:
 
-    def __init__(self):
+    def __init__(self, headless=None):
 
         self.instance_prompt = None
         self.dataset_folder = None
@@ -53,15 +88,16 @@ class Config:
 
         self.options_file = None
         self.sample_config_file_path = None
-        self.response = Response()
+        self.response = Response(headless)
 
         self.config = {}
+        self.final_config = None
 
     def add_config_data(self, key, value):
 
         self.config[key] = value
-        self.response.print(f"Updated key {key}: {value}",'s')   
-        time.sleep(0.5)
+        self.response.status(f"Updated key {key}: {value}")   
+        self.response.pause(0.5)
 
     def remove_config_data(self, key):    
 
@@ -201,21 +237,9 @@ class Config:
                     value = self.response.input("Enter value", "s")
                     self.add_config_data(picked[index], value)
 
-                    auto_divides = [
-                        "--max_train_steps",
-                        "--checkpointing_steps",
-                        "--checkpoints_total_limit",
-                        "--lr_warmup_steps",
-                    ]
-
                     if(picked[index] == "--train_batch_size"):
-                        for auto_divide in auto_divides:
-
-                            auto_value = int(config[auto_divide]) / int(value)
-                            if auto_divide in self.config:
-                                auto_value = int(self.config[auto_divide]) / int(value)
-
-                            self.add_config_data(auto_divide, int(auto_value))
+                        for auto_divide, auto_value in divide_by_batch_size(config, self.config, value).items():
+                            self.add_config_data(auto_divide, auto_value)
     
                 else:
                     self.response.print(f"Editing failed", 'e')
@@ -224,11 +248,11 @@ class Config:
 
                 self.response.print(f"Editing failed", 'e')
 
-            time.sleep(1)
+            self.response.pause(1)
     
     def editor(self):
 
-        if self.skip_editor == 1:
+        if self.skip_editor == 1 or self.response.headless:
             return
 
         while True:
@@ -269,46 +293,29 @@ class Config:
                 value = self.response.input("Enter value", "s")
                 self.add_config_data(picked[index], value)
 
-                auto_divides = [
-                    "--max_train_steps",
-                    "--checkpointing_steps",
-                    "--checkpoints_total_limit",
-                    "--lr_warmup_steps",
-                ]
-
                 if(picked[index] == "--train_batch_size"):
-                    for auto_divide in auto_divides:
-
-                        auto_value = int(config[auto_divide]) / int(value)
-                        if auto_divide in self.config:
-                            auto_value = int(self.config[auto_divide]) / int(value)
-
-                        self.add_config_data(auto_divide, int(auto_value))
+                    for auto_divide, auto_value in divide_by_batch_size(config, self.config, value).items():
+                        self.add_config_data(auto_divide, auto_value)
 
             else:
                 self.response.print(f"Editing failed", 'e')
 
-            time.sleep(1)
+            self.response.pause(1)
 
-        time.sleep(1)
+        self.response.pause(1)
 
     def apply_name_preset(self, config, keys):
 
-        folder_name_with_instance_and_version = f"{self.instance_prompt}_{self.instance_prompt_version}"
-        folder_name_with_only_version = f"{self.instance_prompt_version}"
-
-        for key in keys:
-            value = str(format_float(config[key])).replace('-','_')
-            folder_name_with_instance_and_version = f"{folder_name_with_instance_and_version}_{str(value)}"
-            folder_name_with_only_version = f"{folder_name_with_only_version}_{str(value)}"
+        folder_name_with_instance_and_version, folder_name_with_only_version = preset_folder_names(
+            self.instance_prompt, self.instance_prompt_version, config, keys)
             
         self.response.print(f"Folder name: {folder_name_with_instance_and_version}")
         self.response.print(f"Output Folder name: {folder_name_with_only_version}")
 
-        self.add_config_data("--tracker_run_name",folder_name_with_instance_and_version)
-        self.add_config_data("--user_prompt_library",f"{self.config_folder}/{folder_name_with_instance_and_version}/user_prompt_library.json")
-        self.add_config_data("--data_backend_config",f"{self.config_folder}/{folder_name_with_instance_and_version}/multidatabackend.json")
-        self.add_config_data("--output_dir",f"{self.output_folder}/{self.instance_prompt}/{folder_name_with_only_version}")
+        for key, value in preset_paths(self.config_folder, self.output_folder, self.instance_prompt,
+                                       folder_name_with_instance_and_version,
+                                       folder_name_with_only_version).items():
+            self.add_config_data(key, value)
 
         return folder_name_with_instance_and_version, folder_name_with_only_version
         
@@ -323,13 +330,15 @@ class Config:
             config.update(self.config)
             folder = f"{self.config_folder}/{folder_i}"
 
-        time.sleep(1)
+        self.response.pause(1)
+        self.response.flush_status("Config")
 
         os.makedirs(folder, exist_ok=True)
         self.response.print(f"Saving config to {folder}/config.json", 'i')
         with open(f"{folder}/config.json", "w", encoding="utf-8") as f:
             f.write(json.dumps(config, indent=4, cls=ScientificNotationEncoder))
 
+        self.final_config = config
         return folder
 
 
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+# zstd gives smaller bundles when installed; zip is always there as a fallback
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BUNDLE_DIR = "bundles"
+INDEX_SUFFIX = ".index.json"
+ZSTD_LEVEL = 10
+# Already compressed; deflating them again only costs time
+STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp", ".safetensors")
+
+
+def bundle_format() -> str:
+    return "tar.zst" if zstandard is not None else "zip"
+
+
+def _bundle_files(base_path: Path, configs: Iterable[Path], excluded_dirs: Iterable[str]) -> Dict[str, List[Path]]:
+    excluded = set(excluded_dirs)
+    files = {}
+    for config in configs:
+        config = Path(config)
+        paths = []
+        for directory, dirs, names in os.walk(config):
+            dirs[:] = sorted(d for d in dirs if d not in excluded)
+            paths.extend(Path(directory) / name for name in sorted(names))
+        files[config.relative_to(base_path).as_posix()] = paths
+    return files
+
+
+def build_bundle(base_path: Path, configs: Iterable[Path], name: str, out_dir: Path,
+                 excluded_dirs: Iterable[str] = ()) -> Path:
+    """Pack config folders into one archive plus a JSON index next to it.
+
+    Archive paths are relative to `base_path`, so extracting into the config
+    folder restores the layout. The index lists every config and file, so a
+    bundle's contents can be checked without downloading it. Returns the
+    archive path.
+    """
+    base_path = Path(base_path)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fmt = bundle_format()
+    archive = out_dir / f"{name}.{fmt}"
+    files = _bundle_files(base_path, configs, excluded_dirs)
+
+    temp_path = archive.with_name(f".{archive.name}.tmp")
+    if fmt == "tar.zst":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        with open(temp_path, "wb") as f, compressor.stream_writer(f) as writer, \
+                tarfile.open(fileobj=writer, mode="w|") as tar:
+            for paths in files.values():
+                for path in paths:
+                    tar.add(path, arcname=path.relative_to(base_path).as_posix(), recursive=False)
+    else:
+        with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for paths in files.values():
+                for path in paths:
+                    stored = path.suffix.lower() in STORED_SUFFIXES
+                    zf.write(path, path.relative_to(base_path).as_posix(),
+                             compress_type=zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+    temp_path.replace(archive)
+
+    index = {
+        "format": fmt,
+        "archive": archive.name,
+        "created": time.time(),
+        "configs": sorted(files),
+        "files": {path.relative_to(base_path).as_posix(): path.stat().st_size
+                  for paths in files.values() for path in paths},
+    }
+    with open(out_dir / f"{name}{INDEX_SUFFIX}", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return archive
+
+
+def extract_bundle(archive: Path, dest: Path) -> List[str]:
+    """Unpack a bundle into `dest`; returns the extracted relative paths."""
+    archive = Path(archive)
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    if archive.name.endswith(".tar.zst"):
+        if zstandard is None:
+            raise ValueError("zstandard is not installed; cannot extract .tar.zst bundles")
+        names = []
+        with open(archive, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader, \
+                tarfile.open(fileobj=reader, mode="r|") as tar:
+            for member in tar:
+                target = (dest / member.name).resolve()
+                if not member.isfile() or dest.resolve() not in target.parents:
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with tar.extractfile(member) as src, open(target, "wb") as out:
+                    out.write(src.read())
+                os.utime(target, (member.mtime, member.mtime))
+                names.append(member.name)
+        return names
+
+    with zipfile.ZipFile(archive) as zf:
+        names = [name for name in zf.namelist() if not name.endswith("/")]
+        for name in names:
+            if dest.resolve() not in (dest / name).resolve().parents:
+                raise ValueError(f"Unsafe path in bundle: {name}")
+        zf.extractall(dest)
+    return names
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List, Optional, Set, Dict
+from typing import List, Optional, Set, Dict, Tuple
 from rich.console import Console
 from rich.panel import Panel
 from rich.columns import Columns
@@ -11,6 +11,38 @@ import json
 import math
 import traceback
 
+try:
+    from .catalog import Catalog, family_name
+except ImportError:
+    from catalog import Catalog, family_name
+
+
+def read_dataset_paths(config_dir: Path, datasets_path: Path) -> Tuple[List[Path], List[Path]]:
+    """Enabled dataset folders of a config's multidatabackend.json, split into
+    (existing, missing)."""
+    with open(config_dir / "multidatabackend.json") as f:
+        data = json.load(f)
+
+    unique_paths = set()  # Use a set to store unique paths
+    missing = []
+    for item in data:
+        if isinstance(item, dict) and 'instance_data_dir' in item and not item.get('disabled', False):
+            # Handle full path properly
+            full_path = item['instance_data_dir']
+            if full_path.startswith('datasets/'):
+                # Remove 'datasets/' prefix
+                rel_path = full_path[len('datasets/'):]
+            else:
+                rel_path = full_path
+
+            dataset_path = datasets_path / rel_path
+            if dataset_path.exists():
+                unique_paths.add(dataset_path)
+            elif dataset_path not in missing:
+                missing.append(dataset_path)
+    return sorted(unique_paths), missing
+
+
 class DatasetGridTool:
     def __init__(self):
         self.console = Console()
@@ -19,24 +51,11 @@ class DatasetGridTool:
 
     def extract_family_name(self, config_path: Path) -> str:
         """Extract the family name (prefix) from a config path."""
-        # Extract just the base family name (e.g., "sofia" from "sofia_001_...")
-        return config_path.name.split('_')[0]
+        return family_name(config_path.name)
 
     def get_unique_families(self) -> Dict[str, List[Path]]:
         """Get only unique family names (prefixes) and group configs by family."""
-        folders = [f for f in self.config_path.iterdir() 
-                  if f.is_dir() and f.name != 'templates' 
-                  and not f.name.startswith('.ipynb_checkpoints')]
-        
-        # Group by family name
-        families = {}
-        for folder in folders:
-            family_name = self.extract_family_name(folder)
-            if family_name not in families:
-                families[family_name] = []
-            families[family_name].append(folder)
-            
-        return families
+        return Catalog(config_base=self.config_path).families()
 
     def display_unique_families(self, families: Dict[str, List[Path]]) -> List[str]:
         """Display only unique family names in a two-column layout."""
@@ -117,32 +136,12 @@ class DatasetGridTool:
 
     def get_dataset_paths(self, config_dir: Path) -> List[Path]:
         """Extract all unique dataset paths from multidatabackend.json."""
-        backend_file = config_dir / "multidatabackend.json"
-        unique_paths = set()  # Use a set to store unique paths
-        
+        paths = []
         try:
-            with open(backend_file) as f:
-                data = json.load(f)
-                for item in data:
-                    if isinstance(item, dict) and 'instance_data_dir' in item and not item.get('disabled', False):
-                        # Handle full path properly
-                        full_path = item['instance_data_dir']
-                        if full_path.startswith('datasets/'):
-                            # Remove 'datasets/' prefix
-                            rel_path = full_path[len('datasets/'):]
-                        else:
-                            rel_path = full_path
-
-                        dataset_path = self.datasets_path / rel_path
-                        if dataset_path.exists():
-                            # Add to set to ensure uniqueness
-                            unique_paths.add(dataset_path)
-                        else:
-                            self.console.print(f"[yellow]Warning: Path not found: {dataset_path}[/yellow]")
-            
-            # Convert set back to list for return
-            paths = list(unique_paths)
-            
+            paths, missing = read_dataset_paths(config_dir, self.datasets_path)
+            for dataset_path in missing:
+                self.console.print(f"[yellow]Warning: Path not found: {dataset_path}[/yellow]")
+
             if paths:
                 self.console.print(f"[green]Found {len(paths)} unique dataset paths[/green]")
             else:
@@ -228,8 +227,10 @@ class DatasetGridTool:
             
         return images
 
-    def process_single_config(self, config_dir):
-        dataset_paths = self.get_dataset_paths(config_dir)
+    def process_single_config(self, config_dir, dataset_paths: Optional[List[Path]] = None):
+        # The post-process pipeline passes paths it already read
+        if dataset_paths is None:
+            dataset_paths = self.get_dataset_paths(config_dir)
         if not dataset_paths:
             self.console.print("[red]Could not find any valid dataset paths in config[/red]")
             return
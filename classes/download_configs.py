@@ -1,5 +1,6 @@
 import os
-import subprocess
+import shutil
+import tempfile
 import traceback
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
@@ -7,53 +8,60 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.columns import Columns
+from rich.prompt import Prompt
 from rich import print as rprint
 
+try:
+    from .rclone import RemoteListingCache, write_files_from, write_manifest, SMALL_FILE_FLAGS, CACHE_DIR
+    from .remote_store import get_store
+    from .transfer_queue import TransferQueue, ask_background
+    from .config_bundle import build_bundle, BUNDLE_DIR, INDEX_SUFFIX
+    from .lora_retention import format_bytes
+    from .catalog import Catalog, family_name
+except ImportError:
+    from rclone import RemoteListingCache, write_files_from, write_manifest, SMALL_FILE_FLAGS, CACHE_DIR
+    from remote_store import get_store
+    from transfer_queue import TransferQueue, ask_background
+    from config_bundle import build_bundle, BUNDLE_DIR, INDEX_SUFFIX
+    from lora_retention import format_bytes
+    from catalog import Catalog, family_name
+
 class Tool:
     def __init__(self):
         self.console = Console()
         self.base_path = Path('/workspace/SimpleTuner/config')
-        self.dropbox_base = "dbx:/studio/ai/data/1models"
+        self.store = get_store()
+        self.dropbox_base = self.store.path("studio/ai/data/1models")
         self.excluded_dirs = {'.ipynb_checkpoints', 'templates'}
+        self.listing_cache = RemoteListingCache(self.store)
+        self.folder_matches: Dict[str, Optional[str]] = {}
 
     def verify_paths(self) -> bool:
         if not self.base_path.exists():
             rprint(f"[red]Error: Base config directory not found at {self.base_path}[/red]")
             return False
         try:
-            result = self._run_rclone_command(["lsf", self.dropbox_base])
-            if not result:
+            # Same listing the folder matching uses, so this warms the cache
+            if self.listing_cache.list(self.dropbox_base, dirs_only=True) is None:
+                rprint(f"[red]Remote command failed: {self.listing_cache.last_error}[/red]")
                 return False
         except Exception as e:
             rprint(f"[red]Error checking Dropbox access: {str(e)}[/red]")
             return False
         return True
 
-    def _run_rclone_command(self, args: List[str], check_output: bool = True) -> Optional[str]:
-        try:
-            cmd = ["rclone"] + args
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                rprint(f"[red]Rclone command failed: {result.stderr}[/red]")
-                return None
-            return result.stdout if check_output else ""
-        except Exception as e:
-            rprint(f"[red]Error running rclone command: {str(e)}[/red]")
-            return None
-
     def find_matching_dropbox_folder(self, base_name: str) -> Optional[str]:
-        result = self._run_rclone_command([
-            "lsf", self.dropbox_base,
-            "--dirs-only",
-            "-R",
-            "--max-depth", "1"
-        ])
-        
-        if not result:
+        # Match once per session; the listing itself is cached across sessions
+        if base_name in self.folder_matches:
+            return self.folder_matches[base_name]
+
+        result = self.listing_cache.list(self.dropbox_base, dirs_only=True)
+        if result is None:
+            rprint(f"[red]Remote command failed: {self.listing_cache.last_error}[/red]")
             return None
 
         matches = []
-        for folder in result.splitlines():
+        for folder in result:
             folder = folder.strip('/')
             if not folder:
                 continue
@@ -72,87 +80,125 @@ class Tool:
             matches.sort(key=lambda x: (-x[0], len(x[1])))
             best_match = matches[0][1]
             rprint(f"[cyan]Found matching Dropbox folder: {best_match}[/cyan]")
+            self.folder_matches[base_name] = best_match
             return best_match
             
         rprint(f"[yellow]No matching Dropbox folder found for {base_name}[/yellow]")
         return None
 
-    def download_config(self, source_path: Path, base_name: str) -> bool:
-        """Upload a config from RunPod (local) to Dropbox."""
+    def upload_configs(self, configs: List[Path], base_name: str, background: bool = False,
+                       bundle: bool = False) -> bool:
+        """Upload config folders to Dropbox in a single rclone invocation.
+
+        With `bundle`, the folders are packed into one compressed archive plus
+        index under `config/bundles/`, so many small files cost one upload.
+        With `background`, the upload is handed to the transfer queue instead.
+        """
         dropbox_folder = self.find_matching_dropbox_folder(base_name)
         if not dropbox_folder:
             return False
 
-        # Create destination path in Dropbox
-        dest_path = f"{self.dropbox_base}/{dropbox_folder}/4training/config/{source_path.name}"
-        dest_path = dest_path.replace('//', '/')
+        dest_root = f"{self.dropbox_base}/{dropbox_folder}/4training/config"
+        dest_root = dest_root.replace('//', '/')
+        names = ", ".join(config.name for config in configs)
 
-        # Ensure the directory exists in Dropbox
-        mkdir_result = self._run_rclone_command([
-            "mkdir",
-            f"{self.dropbox_base}/{dropbox_folder}/4training/config"
-        ], check_output=False)
-        
-        if mkdir_result is None:
-            return False
+        if bundle:
+            bundle_name = configs[0].name if len(configs) == 1 else f"{base_name}_family"
+            # Staged in the cache so a queued upload still finds it after we exit; the
+            # folder is unique per upload so a second bundle can't overwrite a queued one
+            staging = CACHE_DIR / BUNDLE_DIR
+            staging.mkdir(parents=True, exist_ok=True)
+            source = Path(tempfile.mkdtemp(prefix=f"{bundle_name}-", dir=staging))
+            archive = build_bundle(self.base_path, configs, bundle_name, source, self.excluded_dirs)
+            remote = f"{dest_root}/{BUNDLE_DIR}"
+            files = [archive.name, f"{bundle_name}{INDEX_SUFFIX}"]
+            rprint(f"[cyan]Bundled {len(configs)} config(s) into {archive.name} "
+                   f"({format_bytes(archive.stat().st_size)})[/cyan]")
+        else:
+            # One manifest for every selected config: rclone pays startup, auth
+            # and the destination listing once instead of once per folder
+            source = self.base_path
+            remote = dest_root
+            manifest = write_files_from(self.base_path, configs, self.excluded_dirs)
+            files = manifest.read_text(encoding="utf-8").splitlines()
+            manifest.unlink()
 
-        # Copy from local (RunPod) to Dropbox
-        rprint(f"[cyan]Copying {source_path.name} to {dest_path}[/cyan]")
-        copy_result = self._run_rclone_command([
-            "copy",
-            "--checksum",
-            str(source_path),   # Source is local RunPod path
-            dest_path,          # Destination is Dropbox path
-            "-v",
-            "--progress",
-            "--exclude", ".ipynb_checkpoints/**"
-        ], check_output=False)
-        
-        if copy_result is not None:
-            rprint(f"[green]Successfully uploaded {source_path.name} to Dropbox[/green]")
+        queued = False
+        try:
+            # Ensure the directory exists in Dropbox (skipped if done recently)
+            if not self.listing_cache.ensure_dir(remote):
+                rprint(f"[red]Remote command failed: {self.listing_cache.last_error}[/red]")
+                return False
+
+            if background:
+                job_id = TransferQueue().enqueue(
+                    "dc", names, "copy",
+                    source=str(source),
+                    remote=remote,
+                    names=files,
+                    checksum=True,
+                    flags=["--no-traverse", "-v", *SMALL_FILE_FLAGS],
+                    invalidate=[dest_root],
+                    # The worker removes the staged bundle once it is uploaded
+                    cleanup=[str(source)] if bundle else []
+                )
+                queued = True
+                rprint(f"[green]Queued upload of {len(configs)} config(s) as job {job_id}. Check progress with: easy tq[/green]")
+                return True
+
+            rprint(f"[cyan]Copying {len(configs)} config(s) to {dest_root}: {names}[/cyan]")
+            manifest = write_manifest(files)
+            try:
+                copied = self.store.copy(
+                    source,             # Source is local RunPod path
+                    remote,             # Destination is Dropbox path
+                    files_from=manifest,
+                    checksum=True,
+                    flags=["--no-traverse", *SMALL_FILE_FLAGS]
+                )
+            finally:
+                manifest.unlink()
+
+            if not copied:
+                rprint(f"[red]Upload failed: {self.store.last_error}[/red]")
+                return False
+
+            self.listing_cache.invalidate(dest_root)
+            rprint(f"[green]Successfully uploaded {len(configs)} config(s) to Dropbox[/green]")
             return True
-        return False
+        finally:
+            if bundle and not queued:
+                shutil.rmtree(source, ignore_errors=True)
 
-    def download_config_group(self, base_name: str) -> bool:
-        """Upload all configs for a family from RunPod (local) to Dropbox."""
-        dropbox_folder = self.find_matching_dropbox_folder(base_name)
-        if not dropbox_folder:
-            return False
+    def download_config(self, source_path: Path, base_name: str, background: bool = False,
+                        bundle: bool = False) -> bool:
+        """Upload a config from RunPod (local) to Dropbox."""
+        return self.upload_configs([source_path], base_name, background=background, bundle=bundle)
 
+    def download_config_group(self, base_name: str, background: bool = False, bundle: bool = False) -> bool:
+        """Upload all configs for a family from RunPod (local) to Dropbox."""
         # Get all configs with the specified family name
-        configs = list(self.base_path.glob(f"{base_name}_*"))
+        configs = sorted(self.base_path.glob(f"{base_name}_*"))
         if not configs:
             rprint(f"[yellow]No configs found matching {base_name}[/yellow]")
             return False
 
-        # Upload each config to Dropbox
-        success = True
-        for config in configs:
-            if not self.download_config(config, base_name):
-                success = False
-                rprint(f"[red]Failed to upload {config.name} to Dropbox[/red]")
+        if not self.upload_configs(configs, base_name, background=background, bundle=bundle):
+            rprint(f"[red]Failed to upload {base_name} configs to Dropbox[/red]")
+            return False
+        return True
 
-        return success
+    def ask_bundle(self) -> bool:
+        """Ask whether to upload as a single compressed bundle instead of loose files."""
+        return Prompt.ask("Upload as one compressed bundle?", choices=["y", "n"], default="n") == "y"
 
     def extract_family_name(self, config_path: Path) -> str:
         """Extract the family name (prefix) from a config path."""
-        # Extract the base family name (e.g., "sofia" from "sofia_001_...")
-        return config_path.name.split('_')[0]
+        return family_name(config_path.name)
     
     def get_unique_families(self) -> Dict[str, List[Path]]:
         """Get only unique family names (prefixes) and group configs by family."""
-        configs = [
-            d for d in self.base_path.iterdir()
-            if d.is_dir() and d.name not in self.excluded_dirs
-        ]
-        
-        families = {}
-        for config in configs:
-            family_name = self.extract_family_name(config)
-            if family_name not in families:
-                families[family_name] = []
-            families[family_name].append(config)
-        return families
+        return Catalog(config_base=self.base_path).families()
 
     def display_unique_families(self, families: Dict[str, List[Path]]) -> List[str]:
         """Display only unique family names in a two-column layout."""
@@ -284,10 +330,12 @@ class Tool:
                     try:
                         config_idx = int(config_selection)
                         if config_idx == 1:  # "all" option
-                            self.download_config_group(selected_family)
+                            self.download_config_group(selected_family, background=ask_background(),
+                                                       bundle=self.ask_bundle())
                         elif 2 <= config_idx <= len(family_configs) + 1:  # +1 for "all" option
                             selected_config = family_configs[config_idx - 2]  # -2 to adjust for "all" and 0-indexing
-                            self.download_config(selected_config, selected_family)
+                            self.download_config(selected_config, selected_family, background=ask_background(),
+                                                 bundle=self.ask_bundle())
                         else:
                             rprint("[red]Invalid selection[/red]")
                     except ValueError:
@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+
+try:
+    from .config import Config, divide_by_batch_size
+    from .lookup import ConfigLookup
+    from .multidatabackend import MultiDataBackend
+    from .userpromptlibrary import UserPromptLibrary
+except ImportError:
+    from config import Config, divide_by_batch_size
+    from lookup import ConfigLookup
+    from multidatabackend import MultiDataBackend
+    from userpromptlibrary import UserPromptLibrary
+
+OPTIONS_FILE = "/workspace/easy/settings/options.json"
+
+
+def _generate(settings: Dict, instance_prompt: str, version: str, dataset: str, sample_config_file_path: str,
+              naming_preset: str, id_base: str, resolutions: List[int], sample_prompt_file_path: str,
+              overrides: Optional[Dict] = None, backend_edits: Optional[List[str]] = None,
+              headless: bool = True, options_file: str = OPTIONS_FILE) -> Dict:
+    dataset_folder = f"{settings['dataset_folder_path']}/{dataset}"
+
+    config = Config(headless)
+    if not config.take_inputs(
+        instance_prompt=instance_prompt,
+        instance_prompt_version=version,
+        dataset_folder=dataset_folder,
+        config_folder=settings["config_folder_path"],
+        output_folder=settings["output_folder_path"],
+        sample_config_file_path=sample_config_file_path,
+        options_file=options_file,
+        naming_preset_file=f"{settings['names_folder_path']}/{naming_preset}.json",
+    ):
+        raise ValueError("Invalid config inputs")
+
+    overrides = overrides or {}
+    for key, value in overrides.items():
+        config.add_config_data(key, value)
+    if "--train_batch_size" in overrides:
+        # Same rule as the editor; step counts given explicitly are kept
+        sample = config.load_files()[0]
+        for key, value in divide_by_batch_size(sample, {}, overrides["--train_batch_size"]).items():
+            if key not in overrides:
+                config.add_config_data(key, value)
+
+    config.editor()
+    folder = config.save()
+
+    mdb = MultiDataBackend(headless)
+    if not mdb.take_inputs(dataset_folder=dataset_folder, config_folder=folder, id_base=id_base,
+                           resolutions=resolutions):
+        raise ValueError("Invalid backend inputs")
+    mdb.resolve()
+    for line in backend_edits or []:
+        mdb.edit(line)
+    mdb.editor()
+    mdb.save()
+
+    upl = UserPromptLibrary(headless)
+    if not upl.take_inputs(instance_prompt=instance_prompt, save_path=folder,
+                           sample_prompt_file_path=sample_prompt_file_path):
+        raise ValueError("Invalid prompt library inputs")
+    upl.save()
+
+    return {
+        "folder": folder,
+        "config": config.final_config,
+        "multidatabackend": list(mdb.multidatabackend.values()),
+        "user_prompt_library": upl.upl,
+    }
+
+
+def init_config(settings: Dict, instance_prompt: str, version: str, dataset: str, scenario: str,
+                naming_preset: str, id_base: str, resolutions: List[int], prompt_file: str,
+                overrides: Optional[Dict] = None, backend_edits: Optional[List[str]] = None,
+                headless: bool = True) -> Dict:
+    """Create a config folder from a scenario, as `easy init` does.
+
+    `settings` is the easy.json dict. `overrides` sets config keys and
+    `backend_edits` takes editor lines (`key=resolution:value,...`) in
+    place of the interactive editors. Headless runs skip the editors and
+    the UI pauses. Returns the folder and the written config, backend and
+    prompt library.
+    """
+    return _generate(
+        settings, instance_prompt, version, dataset,
+        sample_config_file_path=f"{settings['scenario_folder_path']}/{scenario}/config.json",
+        naming_preset=naming_preset, id_base=id_base, resolutions=resolutions,
+        sample_prompt_file_path=f"{settings['prompt_folder_path']}/{prompt_file}.json",
+        overrides=overrides, backend_edits=backend_edits, headless=headless
+    )
+
+
+def reinit_config(settings: Dict, name: str, instance_prompt: str, version: str, dataset: str,
+                  naming_preset: str, id_base: str, resolutions: List[int],
+                  overrides: Optional[Dict] = None, backend_edits: Optional[List[str]] = None,
+                  headless: bool = True, source_folder: Optional[str] = None) -> Dict:
+    """Create a config folder from an existing one, as `easy reinit` does.
+
+    The existing config and prompt library serve as the templates; the
+    arguments and return value are those of `init_config`. `source_folder`
+    is a config folder `name` was already resolved to, which skips the
+    catalog lookup.
+    """
+    base_path = settings["config_folder_path"]
+    source = source_folder or ConfigLookup(config_base=base_path).best(name)
+    if not source:
+        raise ValueError(f"Cannot find config folder matching {name}")
+
+    return _generate(
+        settings, instance_prompt, version, dataset,
+        sample_config_file_path=f"{base_path}/{source}/config.json",
+        naming_preset=naming_preset, id_base=id_base, resolutions=resolutions,
+        sample_prompt_file_path=f"{base_path}/{source}/user_prompt_library.json",
+        overrides=overrides, backend_edits=backend_edits, headless=headless
+    )
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import tempfile
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional
+from rich.console import Console
+from rich.prompt import Prompt
+from rich.table import Table
+from rich.filesize import decimal
+
+try:
+    from .rclone import RemoteListingCache, LARGE_FILE_FLAGS, SMALL_FILE_FLAGS, write_manifest
+    from .remote_store import get_store, check_cached
+    from .checksums import content_hash
+    from .sync_journal import SyncJournal
+    from .transfer_progress import TransferProgress
+    from .download_configs import Tool as ConfigTool
+    from .config_bundle import extract_bundle, BUNDLE_DIR, INDEX_SUFFIX
+except ImportError:
+    from rclone import RemoteListingCache, LARGE_FILE_FLAGS, SMALL_FILE_FLAGS, write_manifest
+    from remote_store import get_store, check_cached
+    from checksums import content_hash
+    from sync_journal import SyncJournal
+    from transfer_progress import TransferProgress
+    from download_configs import Tool as ConfigTool
+    from config_bundle import extract_bundle, BUNDLE_DIR, INDEX_SUFFIX
+
+INDEX_FILE = ".remote_index.json"
+WEIGHT_SUFFIXES = (".safetensors", ".ckpt", ".pt", ".bin")
+
+
+def is_weight(name: str) -> bool:
+    return name.endswith(WEIGHT_SUFFIXES)
+
+
+def load_index(lora_base: Path) -> Dict[str, Dict]:
+    """The lazy-pull index of a LoRA library (relative path -> size/hash)."""
+    try:
+        with open(Path(lora_base) / INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remote_only(lora_base: Path, index: Dict[str, Dict], prefixes: List[str]) -> List[str]:
+    """Indexed files under `prefixes` that are absent or incomplete locally."""
+    missing = []
+    for rel, info in sorted(index.items()):
+        if prefixes and not any(rel == p or rel.startswith(p.rstrip("/") + "/") for p in prefixes):
+            continue
+        local = Path(lora_base) / rel
+        if not local.exists() or local.stat().st_size != info["size"]:
+            missing.append(rel)
+    return missing
+
+
+def ensure_local(lora_base: Path, prefixes: List[str]) -> bool:
+    """Fetch lazily pulled weights under `prefixes` before a tool reads or mirrors them.
+
+    Cheap when nothing was pulled lazily: only the index is read.
+    """
+    if not remote_only(lora_base, load_index(lora_base), prefixes):
+        return True
+    return Hydrator(lora_base).ensure_local(prefixes)
+
+
+class Hydrator:
+    """Pull LoRA families and their configs from Dropbox onto a fresh pod.
+
+    In lazy mode only the remote index (every file with its size and hash)
+    and the small metadata files are pulled; weights stay remote until
+    `easy pull fetch` or a tool that needs them (`ensure_local`) asks for
+    them, and are checked against the index hash once they arrive.
+    """
+
+    def __init__(self, lora_base: Optional[Path] = None):
+        self.console = Console()
+        self.store = get_store()
+        self.lora_base = Path(lora_base or '/workspace/ComfyUI/models/loras/flux')
+        self.lora_remote = self.store.path("studio/ai/libs/diffusion-models/models/loras/flux")
+        self.config_base = Path('/workspace/SimpleTuner/config')
+        self.listing_cache = RemoteListingCache(self.store)
+        self.index_file = self.lora_base / INDEX_FILE
+        self.index: Dict[str, Dict] = load_index(self.lora_base)
+
+    def _save_index(self) -> None:
+        self.lora_base.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_file.with_name(f".{self.index_file.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        temp_path.replace(self.index_file)
+
+    def remote_families(self) -> Optional[List[str]]:
+        listing = self.listing_cache.list(self.lora_remote, dirs_only=True)
+        if listing is None:
+            return None
+        return sorted(name.strip("/") for name in listing if name.strip("/"))
+
+    def _download(self, remote: str, dest: Path, description: str, flags: List[str],
+                  names: Optional[List[str]] = None, include: Optional[List[str]] = None) -> bool:
+        manifest = write_manifest(names) if names is not None else None
+        try:
+            with TransferProgress(self.console, description) as progress:
+                ok = self.store.download(remote, dest, files_from=manifest, include=include,
+                                         flags=flags, on_output=progress.line, on_stats=progress.stats)
+        finally:
+            if manifest:
+                manifest.unlink()
+        if not ok:
+            self.console.print(f"[red]{description} failed: {self.store.last_error}[/red]")
+        return ok
+
+    def pull_loras(self, families: List[str], lazy: bool = False) -> bool:
+        """Mirror LoRA families; lazily, only the index and non-weight files."""
+        if not lazy:
+            ok = self._download(self.lora_remote, self.lora_base, f"Pulling LoRAs: {', '.join(families)}",
+                                ["--no-traverse", *LARGE_FILE_FLAGS], include=families)
+            if ok:
+                # Pulled files are already on the remote; don't push them back
+                SyncJournal(self.lora_base, self.lora_remote).mark_scopes_synced(families)
+            return ok
+
+        metadata = []
+        for family in families:
+            remote_files = self.store.file_info(f"{self.lora_remote}/{family}")
+            if remote_files is None:
+                self.console.print(f"[red]Cannot list {family}: {self.store.last_error}[/red]")
+                return False
+            for name, info in remote_files.items():
+                rel = f"{family}/{name}"
+                self.index[rel] = info
+                if not is_weight(name):
+                    metadata.append(rel)
+        self._save_index()
+
+        if metadata and not self._download(self.lora_remote, self.lora_base, "Pulling LoRA metadata",
+                                           ["--no-traverse", *SMALL_FILE_FLAGS], names=metadata):
+            return False
+        SyncJournal(self.lora_base, self.lora_remote).mark_synced(metadata)
+        lazy_count = sum(1 for rel in self.index if is_weight(rel) and not (self.lora_base / rel).exists())
+        self.console.print(f"[green]Indexed {len(self.index)} file(s); {lazy_count} weight file(s) stay on Dropbox. "
+                           f"Pruning and full easy ls syncs fetch them when needed, or run "
+                           f"easy pull fetch <path>[/green]")
+        return True
+
+    def pull_bundles(self, remote_root: str, family: str) -> Optional[bool]:
+        """Pull a family's configs from compressed bundles; None when there are none."""
+        listing = self.listing_cache.list(f"{remote_root}/{BUNDLE_DIR}", files_only=True) or []
+        indexes = [name for name in listing if name.endswith(INDEX_SUFFIX)
+                   and (name.startswith(f"{family}_") or name == f"{family}{INDEX_SUFFIX}")]
+        if not indexes:
+            return None
+
+        with tempfile.TemporaryDirectory(prefix="easy-bundles-") as temp_dir:
+            temp_dir = Path(temp_dir)
+            if not self._download(f"{remote_root}/{BUNDLE_DIR}", temp_dir, "Pulling bundle indexes",
+                                  ["--no-traverse", *SMALL_FILE_FLAGS], names=indexes):
+                return False
+            bundles = []
+            for name in indexes:
+                with open(temp_dir / name, "r", encoding="utf-8") as f:
+                    bundles.append(json.load(f))
+            # Oldest first, so configs in newer bundles win
+            bundles.sort(key=lambda index: index["created"])
+            archives = [index["archive"] for index in bundles]
+            if not self._download(f"{remote_root}/{BUNDLE_DIR}", temp_dir, f"Pulling {len(archives)} {family} bundle(s)",
+                                  ["--no-traverse", *SMALL_FILE_FLAGS], names=archives):
+                return False
+            for archive in archives:
+                extracted = extract_bundle(temp_dir / archive, self.config_base)
+                self.console.print(f"[green]Extracted {len(extracted)} file(s) from {archive}[/green]")
+        return True
+
+    def pull_configs(self, families: List[str], bundles: bool = False) -> bool:
+        """Pull each family's training configs into the SimpleTuner config folder.
+
+        With `bundles`, compressed bundles uploaded by `easy dc` are used when
+        the family has any, falling back to the loose config folders.
+        """
+        config_tool = ConfigTool()
+        ok = True
+        for family in families:
+            folder = config_tool.find_matching_dropbox_folder(family)
+            if not folder:
+                continue
+            remote_root = f"{config_tool.dropbox_base}/{folder}/4training/config"
+            if bundles:
+                pulled = self.pull_bundles(remote_root, family)
+                if pulled is not None:
+                    ok = pulled and ok
+                    continue
+            listing = self.listing_cache.list(remote_root, dirs_only=True) or []
+            configs = [name.strip("/") for name in listing
+                       if name.strip("/") == family or name.startswith(f"{family}_")]
+            configs = [name for name in configs if name != BUNDLE_DIR]
+            if not configs:
+                self.console.print(f"[yellow]No configs for {family} in {remote_root}[/yellow]")
+                continue
+            ok = self._download(remote_root, self.config_base, f"Pulling {len(configs)} {family} config(s)",
+                                ["--no-traverse", *SMALL_FILE_FLAGS], include=configs) and ok
+        return ok
+
+    def pull(self, families: List[str], lazy: bool = False, loras: bool = True, configs: bool = True,
+             bundles: bool = False) -> bool:
+        """Pull configs, then LoRAs; each is a single parallel rclone transfer."""
+        ok = True
+        if configs:
+            ok = self.pull_configs(families, bundles) and ok
+        if loras:
+            ok = self.pull_loras(families, lazy) and ok
+        return ok
+
+    def missing(self, prefixes: List[str]) -> List[str]:
+        return remote_only(self.lora_base, self.index, prefixes)
+
+    def fetch(self, prefixes: List[str]) -> bool:
+        """Download lazily indexed files under `prefixes` and verify them."""
+        missing = self.missing(prefixes)
+        if not missing:
+            self.console.print("[green]Everything requested is already local[/green]")
+            return True
+        total = sum(self.index[rel]["size"] for rel in missing)
+        self.console.print(f"[cyan]Fetching {len(missing)} file(s), {decimal(total)}[/cyan]")
+        if not self._download(self.lora_remote, self.lora_base, "Fetching weights",
+                              ["--no-traverse", *LARGE_FILE_FLAGS], names=missing):
+            return False
+
+        fetched = []
+        for rel in missing:
+            expected = self.index[rel].get("hash")
+            local = self.lora_base / rel
+            if expected and local.exists() and content_hash(local) != expected:
+                self.console.print(f"[red]Hash mismatch for {rel}; removed, fetch again[/red]")
+                local.unlink()
+                continue
+            fetched.append(rel)
+        SyncJournal(self.lora_base, self.lora_remote).mark_synced(fetched)
+        return len(fetched) == len(missing)
+
+    def ensure_local(self, prefixes: List[str]) -> bool:
+        """Fetch the remote-only files under `prefixes`; True once all of them are local."""
+        missing = self.missing(prefixes)
+        if not missing:
+            return True
+        self.console.print(f"[cyan]{len(missing)} file(s) of {', '.join(prefixes)} are only on Dropbox "
+                           f"(lazy pull); fetching them first[/cyan]")
+        if not check_cached(self.store, timeout=10):
+            self.console.print(f"[red]Cannot connect to Dropbox ({self.store.last_error})[/red]")
+            return False
+        return self.fetch(prefixes)
+
+    def show_status(self) -> None:
+        table = Table(title="Lazily hydrated LoRAs")
+        table.add_column("Version", style="magenta")
+        table.add_column("Local files", justify="right")
+        table.add_column("Remote only", justify="right", style="yellow")
+        table.add_column("Remote size", justify="right")
+        versions: Dict[str, List[int]] = {}
+        for rel, info in self.index.items():
+            version = "/".join(rel.split("/")[:2])
+            counts = versions.setdefault(version, [0, 0, 0])
+            if (self.lora_base / rel).exists():
+                counts[0] += 1
+            else:
+                counts[1] += 1
+                counts[2] += info["size"]
+        for version, (local, remote_only, size) in sorted(versions.items()):
+            table.add_row(version, str(local), str(remote_only), decimal(size))
+        self.console.print(table)
+
+    def select_families(self) -> List[str]:
+        families = self.remote_families()
+        if not families:
+            self.console.print(f"[red]No remote LoRA families found ({self.listing_cache.last_error})[/red]")
+            return []
+        for idx, family in enumerate(families, 1):
+            self.console.print(f"[yellow]{idx}.[/yellow] {family}")
+        selection = Prompt.ask("\nEnter number(s) to pull, comma separated (or press Enter to exit)").strip()
+        try:
+            return [families[int(num) - 1] for num in selection.split(",") if num.strip()]
+        except (ValueError, IndexError):
+            self.console.print("[red]Invalid selection[/red]")
+            return []
+
+
+def main(args: List[str]) -> None:
+    """`easy pull [--lazy] [--bundles] [--loras-only|--configs-only] [family ...]`,
+    `easy pull fetch <family/version[/file]> ...` and `easy pull status`."""
+    hydrator = Hydrator()
+    if args and args[0] == "status":
+        hydrator.show_status()
+        return
+    if args and args[0] == "fetch":
+        hydrator.fetch(args[1:])
+        return
+
+    if not check_cached(hydrator.store, timeout=10):
+        hydrator.console.print(f"[red]Cannot connect to Dropbox ({hydrator.store.last_error})[/red]")
+        return
+    flags = {arg for arg in args if arg.startswith("--")}
+    families = [arg for arg in args if not arg.startswith("--")] or hydrator.select_families()
+    if not families:
+        return
+    if hydrator.pull(families, lazy="--lazy" in flags,
+                     loras="--configs-only" not in flags, configs="--loras-only" not in flags,
+                     bundles="--bundles" in flags):
+        hydrator.console.print("[green]Pull completed successfully![/green]")
+
+
+if __name__ == "__main__":
+    try:
+        main(sys.argv[1:])
+    except Exception as e:
+        console = Console(stderr=True)
+        console.print("[red]Fatal error:[/red]")
+        console.print(f"[red]{str(e)}[/red]")
+        console.print(traceback.format_exc())
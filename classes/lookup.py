@@ -0,0 +1,159 @@
+import re
+import json
+import math
+import bisect
+import itertools
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    from .catalog import Catalog, HYPERPARAMETERS
+    from .sweep import parse_sweep_args
+except ImportError:
+    from catalog import Catalog, HYPERPARAMETERS
+    from sweep import parse_sweep_args
+
+# Match kinds, best first; anything below SUBSTRING is only a suggestion
+EXACT, PREFIX, TOKEN_PREFIX, SUBSTRING, FUZZY = 4, 3, 2, 1, 0
+MIN_SIMILARITY = 0.5
+
+TOKEN_SPLIT = re.compile(r"[_\-\s.]+")
+
+
+def split_query(args: Iterable[str]) -> Tuple[List[str], Dict[str, List]]:
+    """`sofia v2 lr=1e-4 rank=16,32` -> (["sofia", "v2"], {option: values})."""
+    terms, filters = [], []
+    for arg in args:
+        for part in str(arg).split():
+            (filters if "=" in part else terms).append(part)
+    return terms, parse_sweep_args(filters)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _same_value(expected, actual) -> bool:
+    try:
+        return math.isclose(float(expected), float(actual), rel_tol=1e-9)
+    except (TypeError, ValueError):
+        return str(expected).lower() == str(actual).lower()
+
+
+class ConfigLookup:
+    """Ranked config-name lookup over the catalog.
+
+    Lowercased names and their `_`/`-` tokens are kept as sorted arrays, so
+    a prefix is a binary search (a flattened prefix trie) rather than a scan
+    of the folder. An exact name ranks first, then name prefixes, token
+    prefixes and substrings. Only a term matching nothing falls back to a
+    trigram index, built on the first miss, for suggestions. `key=value`
+    terms filter on the options indexed from each config.json. Ties go to
+    the shorter name, then alphabetical order, so a lookup is deterministic.
+    """
+
+    def __init__(self, catalog: Optional[Catalog] = None, config_base=None):
+        if catalog is None:
+            catalog = Catalog(config_base=config_base) if config_base else Catalog()
+        self.rows = {row["name"]: row for row in catalog.configs()}
+        self.names = sorted(self.rows)
+        self.lower = [name.lower() for name in self.names]
+        self.sorted_names = sorted((name, idx) for idx, name in enumerate(self.lower))
+        self.tokens = sorted((token, idx) for idx, name in enumerate(self.lower)
+                             for token in set(TOKEN_SPLIT.split(name)) if token)
+        self._grams: Optional[Dict[str, Set[int]]] = None
+        self._options: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _prefixed(entries: List[Tuple[str, int]], prefix: str) -> Set[int]:
+        start = bisect.bisect_left(entries, (prefix,))
+        found = set()
+        for word, idx in itertools.islice(entries, start, None):
+            if not word.startswith(prefix):
+                break
+            found.add(idx)
+        return found
+
+    def _fuzzy(self, term: str) -> Dict[int, float]:
+        if self._grams is None:
+            self._grams = {}
+            for idx, name in enumerate(self.lower):
+                for gram in _trigrams(name):
+                    self._grams.setdefault(gram, set()).add(idx)
+        query = _trigrams(term)
+        shared: Dict[int, int] = {}
+        for gram in query:
+            for idx in self._grams.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+        # Share of the term's trigrams found in the name
+        return {idx: count / len(query) for idx, count in shared.items() if count / len(query) >= MIN_SIMILARITY}
+
+    def _term_scores(self, term: str, fuzzy: bool) -> Dict[int, Tuple[int, float]]:
+        """name index -> (match kind, similarity) for one text term."""
+        term = term.lower()
+        scores: Dict[int, Tuple[int, float]] = {}
+        for idx in self._prefixed(self.sorted_names, term):
+            scores[idx] = (EXACT if self.lower[idx] == term else PREFIX, 1.0)
+        for idx in self._prefixed(self.tokens, term):
+            scores.setdefault(idx, (TOKEN_PREFIX, 1.0))
+        for idx, name in enumerate(self.lower):
+            if idx not in scores and term in name:
+                scores[idx] = (SUBSTRING, 1.0)
+        if fuzzy and not scores:
+            scores = {idx: (FUZZY, similarity) for idx, similarity in self._fuzzy(term).items()}
+        return scores
+
+    def options(self, name: str) -> Dict:
+        if name not in self._options:
+            self._options[name] = json.loads(self.rows[name]["options"] or "{}")
+        return self._options[name]
+
+    def value(self, name: str, key: str):
+        # Indexed hyperparameters are columns; other options need the JSON
+        if key in HYPERPARAMETERS:
+            return self.rows[name][HYPERPARAMETERS[key]]
+        return self.options(name).get(key)
+
+    def _passes(self, name: str, filters: Dict[str, List]) -> bool:
+        for key, values in filters.items():
+            actual = self.value(name, key)
+            if actual is None or not any(_same_value(value, actual) for value in values):
+                return False
+        return True
+
+    def search(self, query: Union[str, Iterable[str]], fuzzy: bool = True,
+               limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Ranked (name, match kind) for every config matching all terms and filters."""
+        terms, filters = split_query([query] if isinstance(query, str) else query)
+
+        candidates: Optional[Dict[int, Tuple[int, float]]] = None
+        for term in terms:
+            scores = self._term_scores(term, fuzzy)
+            if candidates is None:
+                candidates = scores
+            else:
+                # Every term must match; a config ranks by its weakest term
+                candidates = {idx: min(candidates[idx], scores[idx]) for idx in candidates if idx in scores}
+        if candidates is None:
+            candidates = {idx: (EXACT, 1.0) for idx in range(len(self.names))}
+
+        ranked = []
+        for idx, (kind, similarity) in candidates.items():
+            name = self.names[idx]
+            if filters and not self._passes(name, filters):
+                continue
+            ranked.append((-kind, -similarity, len(name), name))
+        ranked.sort()
+        return [(name, -kind) for kind, _, _, name in ranked[:limit]]
+
+    def matches(self, query: Union[str, Iterable[str]]) -> List[str]:
+        """Names matching the query as substrings or better, alphabetically."""
+        return sorted(name for name, _ in self.search(query, fuzzy=False))
+
+    def best(self, query: Union[str, Iterable[str]]) -> Optional[str]:
+        """The top-ranked config that matches as a substring or better."""
+        ranked = self.search(query, fuzzy=False, limit=1)
+        return ranked[0][0] if ranked else None
+
+    def suggest(self, query: Union[str, Iterable[str]], limit: int = 5) -> List[str]:
+        return [name for name, _ in self.search(query, limit=limit)]
@@ -1,9 +1,8 @@
 #  copy dbx not working double... 20250130 ...
 
 import os
-import shutil
+import json
 import time
-import subprocess
 from pathlib import Path
 from typing import List, Dict, Optional
 from rich.console import Console
@@ -13,14 +12,43 @@ from rich.panel import Panel
 from rich.columns import Columns
 from rich import print as rprint
 from rich.prompt import Prompt
-# from metadata_handler import MetadataHandler
+
+try:
+    from .safetensors_io import write_with_metadata
+    from .lora_retention import LoraRetention, RetentionPolicy, format_bytes
+    from .checksums import new_hasher, sidecar_entry, update_sidecar, ContentHasher, MultiHasher
+    from .lora_store import LoraStore, disk_usage
+    from .rclone import RemoteListingCache, LARGE_FILE_FLAGS, copied_name, write_manifest
+    from .remote_store import get_store
+    from .sync_journal import SyncJournal
+    from .transfer_queue import TransferQueue, ask_background
+    from .upload_state import UploadState
+    from .transfer_progress import TransferProgress
+    from .catalog import Catalog
+    from .hydrate import ensure_local
+except ImportError:
+    from safetensors_io import write_with_metadata
+    from lora_retention import LoraRetention, RetentionPolicy, format_bytes
+    from checksums import new_hasher, sidecar_entry, update_sidecar, ContentHasher, MultiHasher
+    from lora_store import LoraStore, disk_usage
+    from rclone import RemoteListingCache, LARGE_FILE_FLAGS, copied_name, write_manifest
+    from remote_store import get_store
+    from sync_journal import SyncJournal
+    from transfer_queue import TransferQueue, ask_background
+    from upload_state import UploadState
+    from transfer_progress import TransferProgress
+    from catalog import Catalog
+    from hydrate import ensure_local
 
 class LoRaMover:
     def __init__(self):
         self.console = Console()
         self.base_path = Path.cwd()
         self.destination_base = Path('/workspace/ComfyUI/models/loras/flux')
-        # self.metadata_handler = MetadataHandler()
+        self.config_base = Path('/workspace/SimpleTuner/config')
+        self.archive_base = Path('/workspace/lora-archive/flux')
+        self.store = get_store()
+        self.remote_base = "studio/ai/libs/diffusion-models/models/loras/flux"
 
     def clear_screen(self):
         """Clear terminal screen."""
@@ -53,8 +81,7 @@ class LoRaMover:
     def list_model_paths(self) -> List[str]:
         """Scan current directory for model paths and display them in a formatted table."""
         try:
-            model_paths = [f.name for f in self.base_path.iterdir() 
-                         if f.is_dir() and f.name not in ['.ipynb_checkpoints']]
+            model_paths = Catalog(output_base=self.base_path).output_models()
             
             if not model_paths:
                 rprint("[yellow]No model paths found in current directory[/yellow]")
@@ -69,9 +96,7 @@ class LoRaMover:
     def list_model_versions(self, model_path: str) -> List[str]:
         """Scan selected model path for versions and display them in a formatted table."""
         try:
-            version_path = self.base_path / model_path
-            versions = [f.name for f in version_path.iterdir() 
-                      if f.is_dir() and f.name not in ['.ipynb_checkpoints']]
+            versions = Catalog(output_base=self.base_path).output_versions(model_path)
             
             if not versions:
                 rprint(f"[yellow]No versions found for model {model_path}[/yellow]")
@@ -148,90 +173,142 @@ class LoRaMover:
 
             return ordered_items
 
-    def sync_to_dropbox(self, model_path: str, is_single_version: bool = False) -> None:
+    def sync_to_dropbox(self, model_path: str, is_single_version: bool = False,
+                        background: bool = False) -> None:
         try:
-            source_path = str(self.destination_base / model_path)
-            destination = f"dbx:/studio/ai/libs/diffusion-models/models/loras/flux/{model_path}"
+            source_path = self.destination_base / model_path
+            destination = self.store.path(self.remote_base, model_path)
             
             # First, get list of files to be transferred
-            cmd_check = [
-                "rclone",
-                "lsf",
-                source_path,
-                "--files-only",
-                "-R"
-            ]
-            
-            files_to_transfer = subprocess.check_output(cmd_check, 
-                                                      universal_newlines=True).splitlines()
+            files_to_transfer = [f for f in source_path.rglob('*') if f.is_file()]
             
             if not files_to_transfer:
                 rprint("[yellow]No files to transfer[/yellow]")
                 return
                 
             rprint(f"[yellow]Found {len(files_to_transfer)} files to process[/yellow]")
-            
-            # Run transfer with simpler progress tracking
-            cmd = [
-                "rclone",
-                "copy",
-                "--checksum",
-                source_path,
-                destination,
-                "--ignore-existing",
-                "-P"
-            ]
-            
-            with Progress(
-                TextColumn("[bold blue]{task.description}"),
-                BarColumn(complete_style="green"),
-                TaskProgressColumn(),
-                console=self.console,
-                transient=True
-            ) as progress:
-                task = progress.add_task(f"[cyan]Uploading {model_path}", total=100)
-                
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True
+
+            # Only files not yet confirmed on the remote are checked; of those,
+            # remote copies with the right size and hash are confirmed and the
+            # missing or mismatched (e.g. truncated) ones are uploaded again
+            state = UploadState(source_path, destination)
+            rels = [f.relative_to(source_path).as_posix() for f in files_to_transfer]
+            pending = state.unconfirmed(rels)
+            if not pending:
+                rprint("[green]All files already confirmed on Dropbox[/green]")
+                return
+
+            remote_files = self.store.file_info(destination)
+            if remote_files is None:
+                rprint(f"[red]Error listing Dropbox destination: {self.store.last_error}[/red]")
+                return
+            uploads = state.reconcile(pending, remote_files)
+            rprint(f"[yellow]{len(rels) - len(uploads)} file(s) confirmed on Dropbox, "
+                   f"{len(uploads)} to upload[/yellow]")
+            if not uploads:
+                return
+
+            # --ignore-times: every listed file is known to be missing or wrong
+            flags = ["-v", "--no-traverse", "--ignore-times", *LARGE_FILE_FLAGS]
+            if background:
+                job_id = TransferQueue().enqueue(
+                    "lm", model_path, "copy",
+                    source=str(source_path),
+                    remote=destination,
+                    names=uploads,
+                    flags=flags,
+                    upload_state={"source": str(source_path), "remote": destination, "rels": uploads},
+                    invalidate=[destination]
                 )
+                rprint(f"[green]Queued upload job {job_id}. Check progress with: easy tq[/green]")
+                return
+            
+            with TransferProgress(self.console, f"Uploading {model_path}") as progress:
+                def on_output(line: str) -> None:
+                    # Confirm each file as soon as rclone reports it copied, so
+                    # an interrupted batch resumes after the last finished file
+                    name = copied_name(line)
+                    if name:
+                        state.confirm([name])
+                    progress.line(line)
                 
-                # Update progress in chunks
-                for _ in range(100):
-                    if process.poll() is not None:
-                        break
-                    progress.update(task, advance=1)
-                    time.sleep(0.1)
-                
-                # Ensure process completes
-                process.wait()
-                
-                if process.returncode == 0:
-                    progress.update(task, completed=100)
-                    rprint("\n[green]Dropbox synchronization completed successfully![/green]")
-                else:
-                    rprint("\n[red]Error during Dropbox synchronization[/red]")
+                manifest = write_manifest(uploads)
+                try:
+                    copied = self.store.copy(
+                        source_path,
+                        destination,
+                        files_from=manifest,
+                        flags=flags,
+                        on_output=on_output,
+                        on_stats=progress.stats
+                    )
+                finally:
+                    manifest.unlink()
+            RemoteListingCache(self.store).invalidate(destination)
+            
+            if copied:
+                state.confirm(uploads)
+                rprint("\n[green]Dropbox synchronization completed successfully![/green]")
+            else:
+                rprint(f"\n[red]Error during Dropbox synchronization: {self.store.last_error}[/red]")
                     
         except Exception as e:
             rprint(f"[red]Error during Dropbox sync: {str(e)}[/red]")
 
+    def report_usage(self, label: str, path: Path) -> Dict[str, int]:
+        """Print apparent vs. on-disk size of a library path."""
+        usage = disk_usage(path) if path.exists() else {"apparent": 0, "actual": 0}
+        rprint(f"[cyan]{label}: {format_bytes(usage['actual'])} on disk "
+               f"({format_bytes(usage['apparent'])} across all versions)[/cyan]")
+        return usage
+
+    def load_training_metadata(self, model_name: str, version: str) -> Dict[str, str]:
+        """Build safetensors metadata from the version's config folder.
+
+        Version and step are left out: they are in the file name and the
+        sidecar, and keeping them out of the header lets identical weights
+        trained from the same config share one store object.
+        """
+        config_dir = self.config_base / f"{model_name}_{version}"
+        metadata = {"easy_model": model_name}
+
+        for file_name, key in (("config.json", "easy_config"),
+                               ("multidatabackend.json", "easy_multidatabackend")):
+            file_path = config_dir / file_name
+            if not file_path.exists():
+                continue
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                rprint(f"[yellow]Warning: Could not read {file_path}: {str(e)}[/yellow]")
+                continue
+
+            metadata[key] = json.dumps(data, separators=(",", ":"))
+            if file_name == "config.json":
+                # Surface the most useful hyperparameters as flat keys
+                for option in ("--learning_rate", "--lr_scheduler", "--optimizer",
+                               "--train_batch_size", "--max_train_steps", "--lora_rank",
+                               "--lora_alpha", "--instance_prompt", "--model_family"):
+                    if option in data:
+                        metadata[f"easy_{option.lstrip('-')}"] = str(data[option])
+
+        return metadata
+
     def process_safetensors(self, source_path: Path, dest_path: Path, 
                             model_name: str, version: str) -> int:
             """Process and copy safetensors files with proper naming."""
+            processed_count = 0
+            checksums = {}
             try:
-                processed_count = 0
-                
-                # Construct the full model path for metadata
-                full_model_path = f"{model_name}_{version}"
+                store = LoraStore(self.destination_base)
                 
-                # # Get metadata once for all checkpoints
-                # metadata = self.metadata_handler.create_metadata(full_model_path)
-                # if metadata:
-                #     self.console.print("[cyan]Extracted training configuration[/cyan]")
-                # else:
-                #     self.console.print("[yellow]Warning: Could not extract metadata[/yellow]")
+                # Get metadata once for all checkpoints
+                metadata = self.load_training_metadata(model_name, version)
+                if len(metadata) > 1:
+                    self.console.print("[cyan]Extracted training configuration[/cyan]")
+                else:
+                    self.console.print("[yellow]Warning: Could not extract metadata[/yellow]")
                 
                 checkpoints = [d for d in source_path.iterdir() if d.is_dir() 
                             and d.name.startswith('checkpoint-')]
@@ -243,32 +320,56 @@ class LoRaMover:
                     source_file = checkpoint_dir / "pytorch_lora_weights.safetensors"
                     if source_file.exists():
                         new_filename = f"{model_name}-{version}-{step_count}.safetensors"
-                        # version_path = dest_path / model_name / version  # Creates /flux/amodelmelia/version_number/
                         dest_file = dest_path / new_filename
                         
                         # Create destination directory if it doesn't exist
                         dest_file.parent.mkdir(parents=True, exist_ok=True)
                         
-                        # Copy the file first
-                        shutil.copy2(source_file, dest_file)
-                        
-                        # # Update metadata if available
-                        # if metadata:
-                        #     if self.metadata_handler.update_safetensors_metadata(dest_file, metadata):
-                        #         self.console.print(f"[green]Updated metadata for {new_filename}[/green]")
-                        #     else:
-                        #         self.console.print(f"[yellow]Warning: Failed to update metadata for {new_filename}[/yellow]")
-                        
-                        processed_count += 1
-                        rprint(f"[green]Copied: {new_filename}[/green]")
+                        # Rewrite only the header; tensor bytes are streamed unchanged
+                        # and hashed on the way through, including the Dropbox hash
+                        # the upload state checks remote copies against
+                        hasher, content_hasher = new_hasher(), ContentHasher()
+                        try:
+                            write_with_metadata(source_file, dest_file, metadata,
+                                                hasher=MultiHasher(hasher, content_hasher))
+                            entry = sidecar_entry(dest_file, hasher.hexdigest(),
+                                                  content_hash=content_hasher.hexdigest(),
+                                                  version=version, step=int(step_count))
+                            checksums[new_filename] = entry
+                            processed_count += 1
+                            # The store is keyed by the whole file, so only checkpoints
+                            # whose header matches too are linked
+                            linked, fields = store.add(dest_file, entry)
+                            if linked:
+                                checksums[new_filename] = {**entry, **fields}
+                                rprint(f"[green]Linked duplicate: {new_filename}[/green]")
+                            else:
+                                rprint(f"[green]Copied: {new_filename}[/green]")
+                        except ValueError as e:
+                            rprint(f"[red]Skipping {checkpoint_dir.name}: checkpoint failed integrity check ({str(e)})[/red]")
+                        except OSError as e:
+                            # Disk full, or a checkpoint still being written by the trainer
+                            rprint(f"[red]Skipping {checkpoint_dir.name}: {str(e)}[/red]")
                         
                 return processed_count
             except Exception as e:
                 rprint(f"[red]Error processing safetensors: {str(e)}[/red]")
-                if self.console.is_debug:
+                if getattr(self.console, "is_debug", False):
                     import traceback
                     rprint(f"[dim]{traceback.format_exc()}[/dim]")
-                return 0
+                return processed_count
+            finally:
+                # Whatever was copied before a failure still gets its checksums and
+                # journal entries, so the next `easy ls` pushes exactly these files
+                if checksums:
+                    try:
+                        update_sidecar(dest_path, checksums)
+                        journal = SyncJournal(self.destination_base, self.store.path(self.remote_base))
+                        for file_name in list(checksums) + ["checksums.json"]:
+                            journal.record(dest_path / file_name)
+                        journal.save()
+                    except OSError as e:
+                        rprint(f"[red]Could not record checksums for {dest_path.name}: {str(e)}[/red]")
 
     def process_single_version(self):
         """Handle processing of a single model version."""
@@ -307,15 +408,17 @@ class LoRaMover:
         dest_path = self.destination_base / selected_model / selected_version
         
         rprint(f"\n[cyan]Processing version {selected_version} of {selected_model}...[/cyan]")
+        self.report_usage("Before", self.destination_base / selected_model)
         files_processed = self.process_safetensors(source_path, dest_path, 
                                                  selected_model, selected_version)
         if files_processed > 0:
             self.show_progress("Processing complete", 100)
             rprint(f"[green]Successfully processed {files_processed} files![/green]")
+            self.report_usage("After", self.destination_base / selected_model)
             
             # Sync to Dropbox - for single version, we use the full path including version
             sync_path = f"{selected_model}/{selected_version}"
-            self.sync_to_dropbox(sync_path, is_single_version=True)
+            self.sync_to_dropbox(sync_path, is_single_version=True, background=ask_background())
         else:
             rprint("[yellow]No files were processed[/yellow]")
 
@@ -346,6 +449,7 @@ class LoRaMover:
 
         total_processed = 0
         rprint(f"\n[cyan]Processing all versions of {selected_model}...[/cyan]")
+        self.report_usage("Before", self.destination_base / selected_model)
         for version in sorted(versions, reverse=True):  # Process versions in reverse order
             source_path = model_path / version
             dest_path = self.destination_base / selected_model / version
@@ -357,12 +461,83 @@ class LoRaMover:
         if total_processed > 0:
             self.show_progress("Processing complete", 100)
             rprint(f"[green]Successfully processed {total_processed} files across all versions![/green]")
+            self.report_usage("After", self.destination_base / selected_model)
             
             # Sync to Dropbox - for all versions, we sync the entire model directory
-            self.sync_to_dropbox(selected_model, is_single_version=False)
+            self.sync_to_dropbox(selected_model, is_single_version=False, background=ask_background())
         else:
             rprint("[yellow]No files were processed[/yellow]")
 
+    def prune_library(self):
+        """Apply a retention policy to a model in the ComfyUI LoRA library."""
+        models = sorted(f.name for f in self.destination_base.iterdir()
+                        if f.is_dir() and not f.name.startswith('.'))
+        if not models:
+            rprint("[yellow]No models found in the LoRA library[/yellow]")
+            return
+
+        rprint("[cyan]Library Models:[/cyan]")
+        models = self._display_items_in_panels(models, "Library Models")
+        model_num = Prompt.ask("\nEnter number to select model").strip()
+        if not model_num:
+            rprint("[red]Exited--no input given[/red]")
+            return
+
+        try:
+            selected_model = models[int(model_num) - 1]
+            keep_every = int(Prompt.ask("Keep every Nth step (0 to disable)", default="1000"))
+            keep_last = int(Prompt.ask("Keep last K checkpoints", default="2"))
+            pinned = {int(s) for s in Prompt.ask("Pin steps (comma separated)", default="").split(",") if s.strip()}
+        except (ValueError, IndexError):
+            rprint("[red]Invalid selection[/red]")
+            return
+
+        # Lazily pulled weights count towards the plan and may need archiving
+        if not ensure_local(self.destination_base, [selected_model]):
+            rprint("[red]Could not fetch the remote-only checkpoints of this model; pruning cancelled[/red]")
+            return
+
+        retention = LoraRetention(self.destination_base, self.archive_base)
+        plan = retention.plan_model(selected_model, RetentionPolicy(keep_every, keep_last, pinned))
+        total = retention.display_plan(selected_model, plan)
+        if total == 0:
+            rprint("[green]Nothing to prune[/green]")
+            return
+
+        action = Prompt.ask("Delete, archive or cancel", choices=["d", "a", "c"], default="c")
+        if action == "c":
+            rprint("[yellow]Pruning cancelled[/yellow]")
+            return
+
+        # Pins are only kept once the user has committed to this plan
+        if pinned:
+            for version in plan:
+                retention.pin_steps(self.destination_base / selected_model / version, pinned)
+
+        before = disk_usage(self.destination_base)["actual"]
+        removed = sum(retention.apply(drop, archive=(action == "a")) for _, drop in plan.values())
+        journal = SyncJournal(self.destination_base, self.store.path(self.remote_base))
+        for _, drop in plan.values():
+            for file_path in drop:
+                journal.record(file_path)
+        journal.save()
+        # Objects still linked from another version stay in the store
+        LoraStore(self.destination_base).collect_garbage()
+        reclaimed = before - disk_usage(self.destination_base)["actual"]
+        rprint(f"[green]Removed {format_bytes(removed)} of checkpoints from {selected_model}, "
+               f"reclaimed {format_bytes(reclaimed)} on disk[/green]")
+        rprint("[cyan]Run `easy ls` to mirror the pruning to Dropbox[/cyan]")
+
+    def dedupe_library(self):
+        """Link identical checkpoints across the LoRA library to a single stored copy."""
+        store = LoraStore(self.destination_base)
+        rprint("[cyan]Deduplicating LoRA library...[/cyan]")
+        before = self.report_usage("Before", self.destination_base)
+        seen, duplicates = store.dedupe_tree(self.destination_base)
+        after = self.report_usage("After", self.destination_base)
+        rprint(f"[green]Scanned {seen} checkpoints, linked {duplicates} duplicates, "
+               f"saved {format_bytes(before['actual'] - after['actual'])}[/green]")
+
     def run(self):
             """Main execution method."""
             self.clear_screen()
@@ -376,6 +551,8 @@ class LoRaMover:
             rprint("\n[cyan]Select processing mode:[/cyan]")
             rprint("[yellow]1. Process single version[/yellow]")
             rprint("[yellow]2. Process all versions of a model[/yellow]")
+            rprint("[yellow]3. Prune checkpoints in LoRA library[/yellow]")
+            rprint("[yellow]4. Deduplicate LoRA library[/yellow]")
             
             choice = Prompt.ask("\nEnter choice").strip()
             if not choice:
@@ -386,6 +563,10 @@ class LoRaMover:
                 self.process_single_version()
             elif choice == "2":
                 self.process_all_versions()
+            elif choice == "3":
+                self.prune_library()
+            elif choice == "4":
+                self.dedupe_library()
             else:
                 rprint("[red]Invalid choice[/red]")
                 return
@@ -398,6 +579,7 @@ class Tool():
         self.mover = LoRaMover()
         self.mover.base_path = self.workspace_path / 'SimpleTuner/output'
         self.mover.destination_base = self.workspace_path / 'ComfyUI/models/loras/flux'
+        self.mover.config_base = self.workspace_path / 'SimpleTuner/config'
         
     def run(self):
         """Main process implementation."""
@@ -407,17 +589,22 @@ class Tool():
         rprint("\n[cyan]Select processing mode:[/cyan]")
         rprint("[yellow]1. Process single version[/yellow]")
         rprint("[yellow]2. Process all versions of a model[/yellow]")
+        rprint("[yellow]3. Prune checkpoints in LoRA library[/yellow]")
+        rprint("[yellow]4. Deduplicate LoRA library[/yellow]")
         rprint("[cyan]Press Enter to return to main menu[/cyan]")
         
         choice = Prompt.ask("\nEnter choice").strip()
         if not choice:
-            self.exit_tool()
             return
         
         if choice == "1":
             self.mover.process_single_version()
         elif choice == "2":
             self.mover.process_all_versions()
+        elif choice == "3":
+            self.mover.prune_library()
+        elif choice == "4":
+            self.mover.dedupe_library()
         else:
             rprint("[red]Invalid choice[/red]")
             time.sleep(1)
@@ -0,0 +1,125 @@
+import json
+import shutil
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+from rich.console import Console
+from rich.table import Table
+from rich import print as rprint
+
+PINS_FILE = "pinned_steps.json"
+
+
+def parse_step(file_name: str) -> Optional[int]:
+    """Extract the step from a `<model>-<version>-<step>.safetensors` name."""
+    if not file_name.endswith(".safetensors"):
+        return None
+    stem = file_name[:-len(".safetensors")]
+    step = stem.rsplit("-", 1)[-1]
+    return int(step) if step.isdigit() else None
+
+
+def format_bytes(size: float) -> str:
+    """Human readable byte size."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class RetentionPolicy:
+    def __init__(self, keep_every: int = 0, keep_last: int = 1, pinned: Optional[Set[int]] = None):
+        self.keep_every = keep_every
+        self.keep_last = keep_last
+        self.pinned = set(pinned or [])
+
+    def select(self, steps: List[int], pinned: Optional[Set[int]] = None) -> Set[int]:
+        """Return the steps that the policy keeps."""
+        pinned = self.pinned | set(pinned or [])
+        ordered = sorted(steps)
+        keep = {step for step in ordered if step in pinned}
+        if self.keep_every > 0:
+            keep.update(step for step in ordered if step % self.keep_every == 0)
+        if self.keep_last > 0:
+            keep.update(ordered[-self.keep_last:])
+        return keep
+
+
+class LoraRetention:
+    def __init__(self, library_path: Path, archive_path: Optional[Path] = None):
+        self.console = Console()
+        self.library_path = Path(library_path)
+        self.archive_path = Path(archive_path) if archive_path else None
+
+    def load_pins(self, version_dir: Path) -> Set[int]:
+        """Read the steps pinned during validation review."""
+        pins_file = version_dir / PINS_FILE
+        if not pins_file.exists():
+            return set()
+        try:
+            with open(pins_file, "r", encoding="utf-8") as f:
+                return {int(step) for step in json.load(f)}
+        except (OSError, ValueError) as e:
+            rprint(f"[yellow]Warning: Could not read {pins_file}: {str(e)}[/yellow]")
+            return set()
+
+    def pin_steps(self, version_dir: Path, steps: Set[int]) -> None:
+        """Add steps to the version's pin list."""
+        pins = self.load_pins(version_dir) | set(steps)
+        version_dir.mkdir(parents=True, exist_ok=True)
+        with open(version_dir / PINS_FILE, "w", encoding="utf-8") as f:
+            json.dump(sorted(pins), f, indent=4)
+
+    def plan_version(self, version_dir: Path, policy: RetentionPolicy) -> Tuple[List[Path], List[Path]]:
+        """Split a version's checkpoints into (keep, drop)."""
+        checkpoints = {}
+        for file_path in version_dir.glob("*.safetensors"):
+            step = parse_step(file_path.name)
+            if step is not None:
+                checkpoints[step] = file_path
+
+        keep_steps = policy.select(list(checkpoints), self.load_pins(version_dir))
+        keep = [checkpoints[step] for step in sorted(checkpoints) if step in keep_steps]
+        drop = [checkpoints[step] for step in sorted(checkpoints) if step not in keep_steps]
+        return keep, drop
+
+    def plan_model(self, model: str, policy: RetentionPolicy) -> Dict[str, Tuple[List[Path], List[Path]]]:
+        """Plan every version of a model."""
+        model_dir = self.library_path / model
+        return {
+            version_dir.name: self.plan_version(version_dir, policy)
+            for version_dir in sorted(model_dir.iterdir())
+            if version_dir.is_dir() and not version_dir.name.startswith('.')
+        }
+
+    def apply(self, drop: List[Path], archive: bool = False) -> int:
+        """Delete or archive the given checkpoints, returning the bytes reclaimed."""
+        reclaimed = 0
+        for file_path in drop:
+            size = file_path.stat().st_size
+            if archive and self.archive_path:
+                target = self.archive_path / file_path.relative_to(self.library_path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(file_path), str(target))
+            else:
+                file_path.unlink()
+            reclaimed += size
+        return reclaimed
+
+    def display_plan(self, model: str, plan: Dict[str, Tuple[List[Path], List[Path]]]) -> int:
+        """Print a per-version summary of what pruning would reclaim."""
+        table = Table(title=f"Retention plan for {model}")
+        table.add_column("Version", style="magenta")
+        table.add_column("Keep", justify="right", style="green")
+        table.add_column("Remove", justify="right", style="yellow")
+        table.add_column("Reclaimed", justify="right", style="cyan")
+
+        total = 0
+        for version, (keep, drop) in plan.items():
+            size = sum(f.stat().st_size for f in drop)
+            total += size
+            table.add_row(version, str(len(keep)), str(len(drop)), format_bytes(size))
+
+        table.add_row("[bold]total[/bold]", "", "", f"[bold]{format_bytes(total)}[/bold]")
+        self.console.print(table)
+        return total
@@ -0,0 +1,270 @@
+import os
+import csv
+import traceback
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from rich.console import Console
+from rich.prompt import Prompt
+from rich.table import Table
+from rich.panel import Panel
+from rich.columns import Columns
+
+try:
+    from .safetensors_io import read_header
+except ImportError:
+    from safetensors_io import read_header
+
+LORA_PAIRS = ((".lora_A.weight", ".lora_B.weight"), (".lora_down.weight", ".lora_up.weight"))
+
+NUMPY_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8, "U8": np.uint8,
+}
+
+
+class LazyCheckpoint:
+    """Memory-mapped view of a safetensors file that materializes one tensor at a time."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        header, self.data_start = read_header(self.path)
+        self.metadata = header.pop("__metadata__", {})
+        self.header = header
+        self.data = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+    def keys(self) -> List[str]:
+        return list(self.header.keys())
+
+    def get(self, name: str) -> np.ndarray:
+        """Return a tensor as float32; BF16 is widened by bit shifting."""
+        info = self.header[name]
+        begin, end = info["data_offsets"]
+        raw = self.data[self.data_start + begin:self.data_start + end]
+        if info["dtype"] == "BF16":
+            tensor = (raw.view(np.uint16).astype(np.uint32) << 16).view(np.float32)
+        else:
+            tensor = raw.view(NUMPY_DTYPES[info["dtype"]]).astype(np.float32)
+        return tensor.reshape(info["shape"])
+
+    def lora_modules(self) -> Dict[str, Tuple[str, str]]:
+        """Map each LoRA module to its (down/A, up/B) tensor names."""
+        modules = {}
+        for name in self.header:
+            for down_suffix, up_suffix in LORA_PAIRS:
+                if name.endswith(down_suffix):
+                    module = name[:-len(down_suffix)]
+                    if module + up_suffix in self.header:
+                        modules[module] = (name, module + up_suffix)
+        return modules
+
+
+def product_norm_sq(B: np.ndarray, A: np.ndarray) -> float:
+    """Squared Frobenius norm of B @ A without forming the full matrix."""
+    return float(np.sum((B.T @ B) * (A @ A.T)))
+
+
+def effective_rank(B: np.ndarray, A: np.ndarray) -> float:
+    """Entropy-based effective rank of B @ A, computed from the r x r core."""
+    _, r_b = np.linalg.qr(B)
+    _, r_a = np.linalg.qr(A.T)
+    singular_values = np.linalg.svd(r_b @ r_a.T, compute_uv=False)
+    total = singular_values.sum()
+    if total <= 0:
+        return 0.0
+    p = singular_values / total
+    p = p[p > 0]
+    return float(np.exp(-np.sum(p * np.log(p))))
+
+
+def analyze_step(current: LazyCheckpoint, previous: Optional[LazyCheckpoint]) -> List[Dict]:
+    """Per-layer norm, effective rank and delta versus the previous checkpoint."""
+    rows = []
+    previous_modules = previous.lora_modules() if previous else {}
+    for module, (down_name, up_name) in sorted(current.lora_modules().items()):
+        A = current.get(down_name)
+        B = current.get(up_name)
+        if A.ndim != 2 or B.ndim != 2:
+            continue
+
+        row = {
+            "layer": module,
+            "norm": product_norm_sq(B, A) ** 0.5,
+            "effective_rank": effective_rank(B, A),
+            "delta": None,
+        }
+
+        if module in previous_modules:
+            prev_down, prev_up = previous_modules[module]
+            A_prev = previous.get(prev_down)
+            B_prev = previous.get(prev_up)
+            if A_prev.shape == A.shape and B_prev.shape == B.shape:
+                # B A - B' A' == [B, -B'] @ [A; A'], so the delta stays low rank
+                row["delta"] = product_norm_sq(np.hstack([B, -B_prev]),
+                                               np.vstack([A, A_prev])) ** 0.5
+        rows.append(row)
+    return rows
+
+
+def summarize_step(step: int, layers: List[Dict]) -> Dict:
+    """Collapse per-layer rows into one compact per-step row."""
+    norm = sum(row["norm"] ** 2 for row in layers) ** 0.5
+    deltas = [row["delta"] for row in layers if row["delta"] is not None]
+    delta = sum(d ** 2 for d in deltas) ** 0.5 if deltas else None
+    top = max(layers, key=lambda row: row["norm"]) if layers else None
+    return {
+        "step": step,
+        "norm": norm,
+        "delta": delta,
+        "relative_delta": delta / norm if delta is not None and norm else None,
+        "mean_effective_rank": float(np.mean([row["effective_rank"] for row in layers])) if layers else 0.0,
+        "top_layer": top["layer"] if top else "",
+    }
+
+
+class LoraStatsTool:
+    def __init__(self):
+        self.console = Console()
+        self.workspace_path = Path('/workspace/SimpleTuner')
+        self.output_path = self.workspace_path / 'output'
+        self.config_path = self.workspace_path / 'config'
+
+    def find_checkpoints(self, model: str, version: str) -> List[Tuple[int, Path]]:
+        """Checkpoint weights of a version, ordered by step."""
+        version_path = self.output_path / model / version
+        checkpoints = []
+        for checkpoint_dir in version_path.glob('checkpoint-*'):
+            weights = checkpoint_dir / "pytorch_lora_weights.safetensors"
+            step = checkpoint_dir.name.split('-')[-1]
+            if weights.exists() and step.isdigit():
+                checkpoints.append((int(step), weights))
+        return sorted(checkpoints)
+
+    def analyze_version(self, model: str, version: str) -> Tuple[List[Dict], List[Dict]]:
+        """Walk successive checkpoints, keeping at most two mapped at a time."""
+        summary = []
+        layers = []
+        previous = None
+        for step, weights in self.find_checkpoints(model, version):
+            self.console.print(f"[cyan]Analyzing step {step}...[/cyan]")
+            current = LazyCheckpoint(weights)
+            step_layers = analyze_step(current, previous)
+            layers.extend({"step": step, **row} for row in step_layers)
+            summary.append(summarize_step(step, step_layers))
+            previous = current
+        return summary, layers
+
+    def save_stats(self, model: str, version: str, summary: List[Dict], layers: List[Dict]) -> Path:
+        """Write the per-step and per-layer tables next to the validation grid."""
+        save_dir = self.config_path / f"{model}_{version}"
+        save_dir.mkdir(parents=True, exist_ok=True)
+
+        summary_path = save_dir / f"{model}_{version}-lora-stats.csv"
+        with open(summary_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()))
+            writer.writeheader()
+            writer.writerows(summary)
+
+        layers_path = save_dir / f"{model}_{version}-lora-layers.csv"
+        with open(layers_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["step", "layer", "norm", "effective_rank", "delta"])
+            writer.writeheader()
+            writer.writerows(layers)
+
+        return summary_path
+
+    def display_stats(self, model: str, version: str, summary: List[Dict]) -> None:
+        table = Table(title=f"{model}-{version} LoRA statistics")
+        table.add_column("Step", justify="right", style="yellow")
+        table.add_column("Norm", justify="right")
+        table.add_column("Δ prev", justify="right")
+        table.add_column("Δ / norm", justify="right")
+        table.add_column("Eff. rank", justify="right")
+        table.add_column("Largest layer", style="magenta", overflow="fold")
+
+        for row in summary:
+            table.add_row(
+                str(row["step"]),
+                f"{row['norm']:.4f}",
+                f"{row['delta']:.4f}" if row["delta"] is not None else "-",
+                f"{row['relative_delta']:.2%}" if row["relative_delta"] is not None else "-",
+                f"{row['mean_effective_rank']:.2f}",
+                row["top_layer"],
+            )
+        self.console.print(table)
+
+    def select(self, items: List[str], title: str, prompt: str) -> Optional[str]:
+        """Show a numbered two-column list and return the chosen item."""
+        table1 = Table(show_header=False, box=None, show_edge=False, padding=(1, 1))
+        table1.add_column(title, style="white", no_wrap=True)
+        table2 = Table(show_header=False, box=None, show_edge=False, padding=(1, 1))
+        table2.add_column(title, style="white", no_wrap=True)
+
+        mid_point = (len(items) + 1) // 2
+        for idx, item in enumerate(items[:mid_point], 1):
+            table1.add_row(f"[yellow]{idx}.[/yellow] {item}")
+        for idx, item in enumerate(items[mid_point:], mid_point + 1):
+            table2.add_row(f"[yellow]{idx}.[/yellow] {item}")
+
+        self.console.print(Panel(Columns([table1, table2], equal=True, expand=True),
+                                 title=f"[gold1]{title}[/gold1]", border_style="blue"))
+
+        selection = Prompt.ask(prompt).strip()
+        if not selection:
+            return None
+        try:
+            idx = int(selection) - 1
+            if 0 <= idx < len(items):
+                return items[idx]
+        except ValueError:
+            pass
+        self.console.print("[red]Invalid selection.[/red]")
+        return None
+
+    def run(self):
+        os.system('clear' if os.name == 'posix' else 'cls')
+        self.console.print("[cyan]Loading tool: lora_stats[/cyan]")
+        print()
+
+        if not self.output_path.exists():
+            self.console.print(f"[red]Output path does not exist: {self.output_path}[/red]")
+            return
+
+        try:
+            models = sorted(p.name for p in self.output_path.iterdir()
+                            if p.is_dir() and p.name != '.ipynb_checkpoints')
+            model = self.select(models, "Available Models", "Select model number")
+            if not model:
+                return
+
+            versions = sorted(p.name for p in (self.output_path / model).iterdir()
+                              if p.is_dir() and p.name != '.ipynb_checkpoints')
+            version = self.select(versions, f"{model} Versions", "Select version number")
+            if not version:
+                return
+
+            summary, layers = self.analyze_version(model, version)
+            if not summary:
+                self.console.print("[red]No checkpoints found for selected version.[/red]")
+                return
+
+            self.display_stats(model, version, summary)
+            saved = self.save_stats(model, version, summary, layers)
+            self.console.print(f"[green]Statistics saved to: {saved}[/green]")
+
+        except Exception as e:
+            self.console.print(f"[red]An error occurred: {str(e)}[/red]")
+            traceback.print_exc()
+
+
+class Tool:
+    def __init__(self):
+        self.tool = LoraStatsTool()
+
+    def run(self):
+        self.tool.run()
+
+
+if __name__ == "__main__":
+    tool = Tool()
+    tool.run()
@@ -0,0 +1,158 @@
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    from .checksums import load_sidecar, update_sidecar, new_hasher, default_algorithm, MultiHasher, ContentHasher
+    from .checksums import READ_CHUNK_SIZE
+    from .lora_retention import parse_step
+except ImportError:
+    from checksums import load_sidecar, update_sidecar, new_hasher, default_algorithm, MultiHasher, ContentHasher
+    from checksums import READ_CHUNK_SIZE
+    from lora_retention import parse_step
+
+STORE_DIR = ".store"
+# Sidecar fields describing a stored object; the rest is per-path provenance
+OBJECT_FIELDS = ("size", "mtime", "algorithm", "hash", "content_hash")
+
+
+def hash_checkpoint(path: Path, algorithm: str) -> Dict[str, str]:
+    """Whole-file and Dropbox content hashes of a checkpoint in one read."""
+    file_hasher, content_hasher = new_hasher(algorithm), ContentHasher()
+    with open(path, "rb") as f:
+        both = MultiHasher(file_hasher, content_hasher)
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            both.update(chunk)
+    return {"hash": file_hasher.hexdigest(), "content_hash": content_hasher.hexdigest()}
+
+
+class LoraStore:
+    """Content-addressed store for LoRA checkpoints.
+
+    Every unique checkpoint is kept once under `<library>/.store/<aa>/<hash>`
+    and hard linked into each `<model>/<version>` path that uses it, so
+    byte-identical files from reruns, resumed runs and versions trained
+    from the same config only take space once. Objects are keyed by the
+    whole-file hash, header included, so a linked path always carries its
+    own training config; version and step live in the file name and the
+    directory's checksums.json rather than the header.
+    """
+
+    def __init__(self, library_path: Path):
+        self.library_path = Path(library_path)
+        self.store_path = self.library_path / STORE_DIR
+
+    def object_path(self, digest: str) -> Path:
+        return self.store_path / digest[:2] / f"{digest}.safetensors"
+
+    def add(self, file_path: Path, entry: Dict) -> Tuple[bool, Dict]:
+        """Move a file into the store and link it back.
+
+        `entry` is the file's sidecar entry and needs a `hash`. Returns
+        whether the file was replaced by a link to an object another path
+        already uses, and the sidecar fields of what is now at `file_path`.
+        """
+        file_path = Path(file_path)
+        obj = self.object_path(entry["hash"])
+        fields = {key: entry[key] for key in OBJECT_FIELDS if key in entry}
+
+        if obj.exists() and os.path.samefile(obj, file_path):
+            return False, fields
+
+        stored = load_sidecar(obj.parent).get(obj.name)
+        # An object only the store links to is left over from an earlier move of
+        # this same path (or a pruned one); the new file takes its place
+        shared = obj.exists() and obj.stat().st_nlink > 1 and stored is not None
+        if not shared:
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            temp_link = obj.with_name(obj.name + ".link")
+            try:
+                os.link(file_path, temp_link)
+            except OSError:
+                # Filesystem without hard links: leave the file where it is
+                return False, fields
+            os.replace(temp_link, obj)
+            update_sidecar(obj.parent, {obj.name: fields})
+            return False, fields
+
+        temp_link = file_path.with_name(file_path.name + ".link")
+        try:
+            os.link(obj, temp_link)
+        except OSError:
+            return False, fields
+        os.replace(temp_link, file_path)
+        return True, stored
+
+    def collect_garbage(self) -> int:
+        """Remove store objects no library path links to any more; returns bytes freed."""
+        freed = 0
+        if not self.store_path.exists():
+            return freed
+        for obj in self.store_path.glob("*/*.safetensors"):
+            stat = obj.stat()
+            if stat.st_nlink == 1:
+                freed += stat.st_size
+                obj.unlink()
+        return freed
+
+    def dedupe_tree(self, root: Path) -> Tuple[int, int]:
+        """Add every checkpoint under `root` to the store.
+
+        Hashes are taken from the checksum sidecars when size and mtime still
+        match, so only files moved before sidecars existed are re-read. The
+        sidecar entry of every linked duplicate is rewritten to describe the
+        stored object. Returns (files seen, duplicates linked).
+        """
+        seen = duplicates = 0
+        algorithm = default_algorithm()
+        for directory, _, files in os.walk(root):
+            directory = Path(directory)
+            if STORE_DIR in directory.relative_to(self.library_path).parts:
+                continue
+            sidecar = load_sidecar(directory)
+            updates = {}
+            for name in files:
+                if not name.endswith(".safetensors"):
+                    continue
+                file_path = directory / name
+                stat = file_path.stat()
+                entry = sidecar.get(name)
+                if not (entry and entry.get("size") == stat.st_size
+                        and entry.get("mtime") == int(stat.st_mtime)
+                        and entry.get("algorithm") == algorithm and entry.get("hash")):
+                    try:
+                        hashes = hash_checkpoint(file_path, algorithm)
+                    except OSError:
+                        continue
+                    entry = {**(entry or {}), "size": stat.st_size, "mtime": int(stat.st_mtime),
+                             "algorithm": algorithm, **hashes,
+                             "version": directory.name, "step": parse_step(name)}
+                    updates[name] = entry
+                seen += 1
+                linked, fields = self.add(file_path, entry)
+                if linked:
+                    duplicates += 1
+                    updates[name] = {**entry, **fields}
+            if updates:
+                update_sidecar(directory, updates)
+        return seen, duplicates
+
+
+def disk_usage(root: Path) -> Dict[str, int]:
+    """Apparent bytes (every library path counted) versus actual bytes (each inode once)."""
+    apparent = actual = 0
+    inodes = set()
+    for directory, _, files in os.walk(root):
+        in_store = STORE_DIR in Path(directory).parts
+        for name in files:
+            stat = os.lstat(os.path.join(directory, name))
+            if not in_store:
+                apparent += stat.st_size
+            key = (stat.st_dev, stat.st_ino)
+            if key not in inodes:
+                inodes.add(key)
+                actual += stat.st_size
+    return {"apparent": apparent, "actual": actual}
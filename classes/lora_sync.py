@@ -1,7 +1,7 @@
 import os
-import subprocess
+import traceback
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from rich.console import Console
 from rich.progress import Progress, TextColumn, BarColumn, TaskProgressColumn
 from rich.table import Table
@@ -11,11 +11,33 @@ from rich import print as rprint
 from rich.prompt import Prompt
 import logging
 
+try:
+    from .rclone import RemoteListingCache, LARGE_FILE_FLAGS
+    from .rclone import write_manifest
+    from .remote_store import get_store, check_cached
+    from .sync_journal import SyncJournal, DELETED
+    from .transfer_queue import TransferQueue, ask_background
+    from .transfer_progress import TransferProgress
+    from .hydrate import ensure_local
+    from .catalog import Catalog
+except ImportError:
+    from rclone import RemoteListingCache, LARGE_FILE_FLAGS
+    from rclone import write_manifest
+    from remote_store import get_store, check_cached
+    from sync_journal import SyncJournal, DELETED
+    from transfer_queue import TransferQueue, ask_background
+    from transfer_progress import TransferProgress
+    from hydrate import ensure_local
+    from catalog import Catalog
+
 class LoraSync:
     def __init__(self):
         self.console = Console()
         self.base_path = Path('/workspace/ComfyUI/models/loras/flux')
-        self.dropbox_path = "dbx:/studio/ai/libs/diffusion-models/models/loras/flux"
+        self.store = get_store()
+        self.dropbox_path = self.store.path("studio/ai/libs/diffusion-models/models/loras/flux")
+        self.listing_cache = RemoteListingCache(self.store)
+        self.journal = SyncJournal(self.base_path, self.dropbox_path)
 
     def verify_paths(self) -> bool:
         """Verify that required paths exist and Dropbox is accessible."""
@@ -24,21 +46,12 @@ class LoraSync:
                 rprint(f"[red]Error: Local path {self.base_path} does not exist[/red]")
                 return False
             
-            # Quick dbx connection check
-            result = subprocess.run(
-                ["rclone", "lsf", "dbx:/", "--max-depth", "1"],
-                check=True,
-                capture_output=True,
-                timeout=10
-            )
+            # Quick dbx connection check, shared with other tools for a short while
+            if not check_cached(self.store, timeout=10):
+                rprint(f"[red]Error: Cannot connect to Dropbox ({self.store.last_error}). Please check your rclone configuration.[/red]")
+                return False
             return True
             
-        except subprocess.TimeoutExpired:
-            rprint("[red]Error: Dropbox connection check timed out.[/red]")
-            return False
-        except subprocess.CalledProcessError:
-            rprint("[red]Error: Cannot connect to Dropbox. Please check your rclone configuration.[/red]")
-            return False
         except Exception as e:
             rprint(f"[red]Error checking paths: {str(e)}[/red]")
             return False
@@ -46,8 +59,7 @@ class LoraSync:
     def list_model_families(self) -> List[str]:
         """List available model families in the flux directory."""
         try:
-            families = [f.name for f in self.base_path.iterdir() 
-                       if f.is_dir() and not f.name.startswith('.')]
+            families = Catalog(lora_base=self.base_path, lora_remote=self.dropbox_path).library_families()
             if not families:
                 rprint("[yellow]No model families found[/yellow]")
                 return []
@@ -59,9 +71,8 @@ class LoraSync:
     def list_versions(self, family: str) -> List[str]:
         """List available versions for a model family."""
         try:
-            family_path = self.base_path / family
-            versions = [f.name for f in family_path.iterdir() 
-                       if f.is_dir() and not f.name.startswith('.')]
+            catalog = Catalog(lora_base=self.base_path, lora_remote=self.dropbox_path)
+            versions = [row["version"] for row in catalog.library_versions(family)]
             if not versions:
                 rprint(f"[yellow]No versions found for {family}[/yellow]")
                 return []
@@ -121,43 +132,133 @@ class LoraSync:
 
             return ordered_items
 
-    def sync_to_dropbox(self, path: str) -> bool:
-        """Sync a model family or version to Dropbox."""
+    def push_changes(self, scopes: List[str], background: bool = False) -> bool:
+        """Push only the paths the journal recorded since the last sync."""
+        changes = self.journal.scan(scopes)
+        if not changes:
+            rprint("\n[green]Nothing changed since the last sync[/green]")
+            return True
+
+        uploads = [rel for rel, kind in changes.items() if kind != DELETED]
+        deletes = [rel for rel, kind in changes.items() if kind == DELETED]
+        rprint(f"\n[cyan]Pushing {len(uploads)} changed and {len(deletes)} deleted file(s)[/cyan]")
+
+        if background:
+            queue = TransferQueue()
+            invalidate = [f"{self.dropbox_path}/{scope}" for scope in scopes]
+            label = ", ".join(scopes)
+            if uploads:
+                job_id = queue.enqueue(
+                    "ls", label, "copy",
+                    source=str(self.base_path),
+                    remote=self.dropbox_path,
+                    names=uploads,
+                    flags=["--no-traverse", "-v", *LARGE_FILE_FLAGS],
+                    journal={"root": str(self.base_path), "remote": self.dropbox_path, "rels": uploads},
+                    invalidate=invalidate
+                )
+                rprint(f"[green]Queued upload job {job_id}[/green]")
+            if deletes:
+                job_id = queue.enqueue(
+                    "ls", label, "delete",
+                    remote=self.dropbox_path,
+                    names=deletes,
+                    journal={"root": str(self.base_path), "remote": self.dropbox_path, "rels": deletes},
+                    invalidate=invalidate
+                )
+                rprint(f"[green]Queued delete job {job_id}[/green]")
+            rprint("[cyan]Check progress with: easy tq[/cyan]")
+            return True
+
+        pushed = True
+        if uploads:
+            manifest = write_manifest(uploads)
+            try:
+                with TransferProgress(self.console, "Uploading changes") as progress:
+                    pushed = self.store.copy(
+                        self.base_path,
+                        self.dropbox_path,
+                        files_from=manifest,
+                        flags=["--no-traverse", *LARGE_FILE_FLAGS],
+                        on_output=progress.line,
+                        on_stats=progress.stats
+                    )
+            finally:
+                manifest.unlink()
+        if pushed and deletes:
+            pushed = self.store.delete(self.dropbox_path, deletes,
+                                       on_output=lambda line: print(line.strip()) if line.strip() else None)
+
+        for scope in scopes:
+            self.listing_cache.invalidate(f"{self.dropbox_path}/{scope}")
+        if not pushed:
+            rprint(f"\n[red]Error during sync process: {self.store.last_error}[/red]")
+            return False
+
+        self.journal.mark_synced(changes.keys())
+        rprint("\n[green]Sync completed successfully![/green]")
+        return True
+
+    def sync_to_dropbox(self, path: str, versions: Optional[List[str]] = None, full: bool = False,
+                        background: bool = False) -> bool:
+        """Sync a model family or version to Dropbox.
+
+        With `versions`, `path` is the family and only those version folders
+        are synced, all in one rclone invocation. Once a path has been fully
+        synced, later syncs push only the journal's changes unless `full`.
+        With `background`, the transfer is handed to the transfer queue.
+        """
         try:
             source = str(self.base_path / path)
             destination = f"{self.dropbox_path}/{path}"
+            scopes = [f"{path}/{version}" for version in versions] if versions else [path]
             
             rprint(f"\n[cyan]Starting sync from:[/cyan] {source}")
             rprint(f"[cyan]To:[/cyan] {destination}")
             
-            cmd = [
-                "rclone",
-                "sync",
-                "--progress",
-                source,
-                destination
-            ]
-            
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True
-            )
-            
-            # Show output in real-time
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    print(output.strip())
+            if versions:
+                rprint(f"[cyan]Versions:[/cyan] {', '.join(versions)}")
+
+            if not full and all(self.journal.is_tracked(scope) for scope in scopes):
+                return self.push_changes(scopes, background=background)
+
+            # A mirror sync would delete weights that a lazy pull left on Dropbox only
+            if not ensure_local(self.base_path, scopes):
+                rprint(f"[red]Some files in this selection are still only on Dropbox (lazy pull); "
+                       f"not syncing. Retry, or fetch them with: easy pull fetch {' '.join(scopes)}[/red]")
+                return False
+
+            if background:
+                job_id = TransferQueue().enqueue(
+                    "ls", path if not versions else f"{path}: {', '.join(versions)}", "sync",
+                    source=source,
+                    remote=destination,
+                    include=versions,
+                    flags=["-v", *LARGE_FILE_FLAGS],
+                    journal={"root": str(self.base_path), "remote": self.dropbox_path, "scopes": scopes},
+                    invalidate=[destination]
+                )
+                rprint(f"[green]Queued sync job {job_id}. Check progress with: easy tq[/green]")
+                return True
+
+            with TransferProgress(self.console, f"Syncing {path}") as progress:
+                synced = self.store.sync(
+                    source,
+                    destination,
+                    include=versions,
+                    flags=list(LARGE_FILE_FLAGS),
+                    on_output=progress.line,
+                    on_stats=progress.stats
+                )
                     
-            if process.returncode == 0:
+            # Whatever was listed under the destination is stale now
+            self.listing_cache.invalidate(destination)
+            if synced:
+                self.journal.mark_scopes_synced(scopes)
                 rprint("\n[green]Sync completed successfully![/green]")
                 return True
             else:
-                rprint("\n[red]Error during sync process[/red]")
+                rprint(f"\n[red]Error during sync process: {self.store.last_error}[/red]")
                 return False
                 
         except Exception as e:
@@ -172,8 +273,9 @@ class LoraSync:
         while True:
             rprint("[magenta]=== LoRA Sync Tool ===[/magenta]")
             rprint("\n[cyan]Select sync mode:[/cyan]")
-            rprint("[yellow]1. Sync single version[/yellow]")
+            rprint("[yellow]1. Sync selected versions[/yellow]")
             rprint("[yellow]2. Sync all versions of a model family[/yellow]")
+            rprint("[yellow]3. Full sync of a model family (compare everything)[/yellow]")
             rprint("[cyan]Press Enter to exit[/cyan]")
             
             choice = Prompt.ask("\nEnter choice").strip()
@@ -200,21 +302,25 @@ class LoraSync:
                 if not versions:
                     continue
                     
-                version_num = Prompt.ask("\nEnter number to select version (or press Enter to return)").strip()
+                version_num = Prompt.ask("\nEnter number(s) to select version, comma separated (or press Enter to return)").strip()
                 if not version_num:
                     continue
                     
                 try:
-                    selected_version = versions[int(version_num) - 1]
-                    sync_path = f"{selected_family}/{selected_version}"
+                    selected_versions = [versions[int(num) - 1] for num in version_num.split(",") if num.strip()]
                 except (ValueError, IndexError):
                     rprint("[red]Invalid selection[/red]")
                     continue
+
+                background = ask_background()
+                if len(selected_versions) == 1:
+                    self.sync_to_dropbox(f"{selected_family}/{selected_versions[0]}", background=background)
+                else:
+                    self.sync_to_dropbox(selected_family, versions=selected_versions, background=background)
                     
             else:  # Sync entire family
-                sync_path = selected_family
+                self.sync_to_dropbox(selected_family, full=(choice == "3"), background=ask_background())
                 
-            self.sync_to_dropbox(sync_path)
             input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+import os
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .config import divide_by_batch_size, preset_folder_names
+    from .multidatabackend import DEFAULT_REPEATS, parse_value
+    from .generate import init_config, reinit_config
+    from .lookup import ConfigLookup
+    from .sweep import ALIASES
+    from .response import Response
+except ImportError:
+    from config import divide_by_batch_size, preset_folder_names
+    from multidatabackend import DEFAULT_REPEATS, parse_value
+    from generate import init_config, reinit_config
+    from lookup import ConfigLookup
+    from sweep import ALIASES
+    from response import Response
+
+# YAML manifests need PyYAML; JSON and CSV always work
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+FIELDS = ["instance_prompt", "version", "dataset", "scenario", "naming_preset", "id_base", "resolutions",
+          "prompt_file"]
+# A row with `source` is a reinit of that config; scenario and prompt file come from it
+REINIT_FIELDS = ["source", "instance_prompt", "version", "dataset", "naming_preset", "id_base", "resolutions"]
+
+
+def load_manifest(path: Path) -> List[Dict]:
+    """Rows of a .json/.yaml/.yml/.csv manifest.
+
+    JSON and YAML take a list of rows, or `{"defaults": {...}, "configs":
+    [...]}` where every row starts from the defaults. CSV columns are the
+    row fields; other columns (`lr`, `--lora_rank`, ...) become config
+    overrides, like in a sweep.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            data = [{key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+                    for row in csv.DictReader(f)]
+        elif suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError("YAML manifests need PyYAML (pip install pyyaml); use JSON or CSV instead")
+            data = yaml.safe_load(f)
+        elif suffix == ".json":
+            data = json.load(f)
+        else:
+            raise ValueError(f"Unknown manifest type {suffix}; use .json, .yaml, .yml or .csv")
+
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        data = data.get("configs") or []
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError("A manifest is a list of rows, or defaults plus a 'configs' list")
+    return [normalize_row({**defaults, **row}) for row in data]
+
+
+def normalize_row(row: Dict) -> Dict:
+    """Fields as init/reinit take them; every unknown key is a config override."""
+    normalized = {"overrides": dict(row.get("overrides") or {}), "backend_edits": row.get("backend_edits") or []}
+    for key, value in row.items():
+        if key in ("overrides", "backend_edits"):
+            continue
+        if key in FIELDS or key in REINIT_FIELDS:
+            normalized[key] = str(value).strip() if key != "resolutions" else value
+        else:
+            option = ALIASES.get(key, key if key.startswith("--") else f"--{key}")
+            normalized["overrides"][option] = parse_value(value.strip()) if isinstance(value, str) else value
+
+    resolutions = normalized.get("resolutions")
+    if isinstance(resolutions, (int, float)):
+        resolutions = [resolutions]
+    elif isinstance(resolutions, str):
+        resolutions = [value for value in resolutions.replace(";", ",").split(",") if value.strip()]
+    if resolutions is not None:
+        try:
+            normalized["resolutions"] = [int(str(value).strip()) for value in resolutions]
+        except ValueError:
+            normalized["resolutions"] = resolutions
+    if isinstance(normalized["backend_edits"], str):
+        normalized["backend_edits"] = [edit.strip() for edit in normalized["backend_edits"].split(";") if edit.strip()]
+    return normalized
+
+
+def _listing(path: str, suffix: str = "") -> set:
+    """Names in a folder (without `suffix`), read once per batch."""
+    try:
+        entries = os.listdir(path)
+    except OSError:
+        return set()
+    return {entry[:-len(suffix)] if suffix else entry for entry in entries if entry.endswith(suffix)}
+
+
+class Batch:
+    """Validate every manifest row up front, then generate all config folders.
+
+    Validation reads the dataset, scenario, naming preset and prompt
+    folders once and resolves reinit sources through the catalog, so every
+    problem in the manifest is reported before anything is written. The
+    folder each row will produce is worked out from the scenario and naming
+    preset, so two rows writing the same folder are caught as well.
+    """
+
+    def __init__(self, settings: Dict, rows: List[Dict]):
+        self.settings = settings
+        self.rows = rows
+        self.datasets = _listing(settings["dataset_folder_path"])
+        self.scenarios = _listing(settings["scenario_folder_path"])
+        self.presets = _listing(settings["names_folder_path"], ".json")
+        self.prompts = _listing(settings["prompt_folder_path"], ".json")
+        self.existing = _listing(settings["config_folder_path"])
+        self.lookup: Optional[ConfigLookup] = None
+        self._json_cache: Dict[str, object] = {}
+
+    def _json(self, path: str):
+        if path not in self._json_cache:
+            with open(path, "r", encoding="utf-8") as f:
+                self._json_cache[path] = json.load(f)
+        return self._json_cache[path]
+
+    def _source(self, name: str) -> Optional[str]:
+        if self.lookup is None:
+            self.lookup = ConfigLookup(config_base=self.settings["config_folder_path"])
+        return self.lookup.best(name)
+
+    def _folder(self, row: Dict, template: str) -> str:
+        config = dict(self._json(template))
+        config["--instance_prompt"] = row["instance_prompt"]
+        config.update(row["overrides"])
+        if "--train_batch_size" in row["overrides"]:
+            divided = divide_by_batch_size(config, {}, row["overrides"]["--train_batch_size"])
+            config.update({key: value for key, value in divided.items() if key not in row["overrides"]})
+        keys = self._json(f"{self.settings['names_folder_path']}/{row['naming_preset']}.json")
+        missing = [key for key in keys if key not in config]
+        if missing:
+            raise ValueError(f"naming preset {row['naming_preset']} needs {', '.join(missing)}")
+        return preset_folder_names(row["instance_prompt"], row["version"], config, keys)[0]
+
+    def validate(self) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+        """(errors, warnings) as (row number, message); row numbers start at 1."""
+        errors, warnings = [], []
+        folders: Dict[str, int] = {}
+        for number, row in enumerate(self.rows, 1):
+            reinit = "source" in row
+            row_errors = [f"missing {field}" for field in (REINIT_FIELDS if reinit else FIELDS) if not row.get(field)]
+            if row.get("dataset") and row["dataset"] not in self.datasets:
+                row_errors.append(f"dataset {row['dataset']} not found")
+            if row.get("naming_preset") and row["naming_preset"] not in self.presets:
+                row_errors.append(f"naming preset {row['naming_preset']} not found")
+            if not reinit and row.get("scenario") and row["scenario"] not in self.scenarios:
+                row_errors.append(f"scenario {row['scenario']} not found")
+            if not reinit and row.get("prompt_file") and row["prompt_file"] not in self.prompts:
+                row_errors.append(f"prompt file {row['prompt_file']} not found")
+            bad = [str(value) for value in row.get("resolutions") or [] if str(value) not in DEFAULT_REPEATS]
+            if bad:
+                row_errors.append(f"resolutions {', '.join(bad)} not one of {', '.join(DEFAULT_REPEATS)}")
+
+            template = None
+            if reinit and row.get("source"):
+                source = self._source(row["source"])
+                if source:
+                    row["source_folder"] = source
+                    template = f"{self.settings['config_folder_path']}/{source}/config.json"
+                else:
+                    row_errors.append(f"no config matches source {row['source']}")
+            elif not row_errors:
+                template = f"{self.settings['scenario_folder_path']}/{row['scenario']}/config.json"
+
+            if template and not row_errors:
+                try:
+                    folder = self._folder(row, template)
+                except (OSError, ValueError, KeyError) as e:
+                    row_errors.append(str(e))
+                else:
+                    row["folder"] = folder
+                    if folder in folders:
+                        row_errors.append(f"writes the same folder as row {folders[folder]} ({folder})")
+                    folders.setdefault(folder, number)
+                    if folder in self.existing:
+                        warnings.append((number, f"{folder} exists and will be overwritten"))
+
+            errors.extend((number, error) for error in row_errors)
+        return errors, warnings
+
+    def run(self, workers: int = 1, on_result=None) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """Generate every row; returns (row number, folder, error) in row order."""
+        results = []
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(generate_row, self.settings, row): number
+                           for number, row in enumerate(self.rows, 1)}
+                for future in as_completed(futures):
+                    results.append((futures[future],) + future.result())
+                    if on_result:
+                        on_result(*results[-1])
+        else:
+            for number, row in enumerate(self.rows, 1):
+                results.append((number,) + generate_row(self.settings, row))
+                if on_result:
+                    on_result(*results[-1])
+        return sorted(results, key=lambda result: result[0])
+
+
+def generate_row(settings: Dict, row: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """(folder, None) or (None, error) for one validated row; runs in pool workers."""
+    arguments = dict(
+        instance_prompt=row["instance_prompt"], version=row["version"], dataset=row["dataset"],
+        naming_preset=row["naming_preset"], id_base=row["id_base"], resolutions=row["resolutions"],
+        overrides=row["overrides"], backend_edits=row["backend_edits"], headless=True
+    )
+    try:
+        if "source" in row:
+            result = reinit_config(settings, row["source"], source_folder=row.get("source_folder"), **arguments)
+        else:
+            result = init_config(settings, scenario=row["scenario"], prompt_file=row["prompt_file"], **arguments)
+    except Exception as e:
+        return None, str(e)
+    return result["folder"], None
+
+
+def main(settings: Dict, args: List[str]) -> None:
+    """`easy batch <manifest> [--dry-run] [--workers N]`"""
+    response = Response(headless=True)
+    paths, workers, idx = [], 1, 0
+    while idx < len(args):
+        if args[idx] == "--workers" and idx + 1 < len(args):
+            workers = int(args[idx + 1])
+            idx += 2
+        elif args[idx].startswith("--"):
+            idx += 1
+        else:
+            paths.append(args[idx])
+            idx += 1
+    if len(paths) != 1:
+        response.print("Usage: easy batch <manifest.json|yaml|csv> [--dry-run] [--workers N]", "e")
+        return
+
+    started = time.perf_counter()
+    batch = Batch(settings, load_manifest(Path(paths[0])))
+    errors, warnings = batch.validate()
+    for number, message in warnings:
+        response.print(f"row {number}: {message}", "n")
+    if errors:
+        for number, message in errors:
+            response.print(f"row {number}: {message}", "e")
+        response.print(f"\n{len(errors)} problem(s) in {len(batch.rows)} row(s); nothing was written", "e")
+        return
+
+    if "--dry-run" in args:
+        for number, row in enumerate(batch.rows, 1):
+            kind = f"reinit from {row['source_folder']}" if "source" in row else f"init from {row['scenario']}"
+            response.print(f"row {number}: {row['folder']}  ({kind})", "n")
+        response.print(f"\n{len(batch.rows)} config(s) would be written", "i")
+        return
+
+    def report(number, folder, error):
+        if error:
+            response.print(f"row {number}: {error}", "e")
+
+    results = batch.run(workers, report)
+    failed = sum(1 for _, _, error in results if error)
+    response.print(f"Easy batch wrote {len(results) - failed} config(s)"
+                   f"{f', {failed} failed' if failed else ''} in {time.perf_counter() - started:.2f}s",
+                   "e" if failed else "s")
@@ -1,9 +1,16 @@
 import os
-import time
 import json
 import ast
 from .response import Response
 
+# Resolutions a backend can be built for, with their dataset repeats
+DEFAULT_REPEATS = {
+    "512" : 5,
+    "768" : 4,
+    "1024": 3,
+    "1536": 1
+}
+
 def parse_value(value):
     """
     Attempt to parse the input into its most appropriate data type.
@@ -51,7 +58,7 @@ def parse_value(value):
 
 class MultiDataBackend:
 
-    def __init__(self):
+    def __init__(self, headless=None):
 
         self.dataset_folder = None
         self.config_folder = None
@@ -60,7 +67,7 @@ class MultiDataBackend:
 
         self.subset_mode = 0
 
-        self.response = Response()
+        self.response = Response(headless)
         self.multidatabackend = {}
 
     def get_text_embeds(self, idx, folder):
@@ -112,8 +119,8 @@ class MultiDataBackend:
 
     def add_backend_block(self, key, block):
         self.multidatabackend[key] = block
-        self.response.print(f"Updated block {key}",'s')   
-        time.sleep(0.5)
+        self.response.status(f"Updated block {key}")   
+        self.response.pause(0.5)
 
     def remove_backend_block(self, key):    
         if key in self.multidatabackend:
@@ -122,8 +129,8 @@ class MultiDataBackend:
 
     def add_backend_block_data(self, block_id, key, value):
         self.multidatabackend[block_id][key] = parse_value(value)
-        self.response.print(f"Updated key {key} in block {block_id}: {value}",'s')   
-        time.sleep(0.5)
+        self.response.status(f"Updated key {key} in block {block_id}: {value}")   
+        self.response.pause(0.5)
 
     def remove_backend_block_data(self, block_id, key):    
         if block_id in self.multidatabackend:
@@ -162,23 +169,7 @@ class MultiDataBackend:
         return True
     
         
-    def resolve(self):
-
-        default_resolutions = {
-            "512" : 5,
-            "768" : 4,
-            "1024": 3,
-            "1536": 1
-        }
-
-        default_disabled = {
-            "512" : "false",
-            "768" : "false",
-            "1024": "false",
-            "1536": "false"
-        }
-
-        self.response.print(f"Testing database folder: [white]{self.dataset_folder}[/white]",'i')
+    def scan_sub_folders(self):
 
         self.sub_folders = []
 
@@ -189,41 +180,67 @@ class MultiDataBackend:
             if os.path.isdir(full_path):
                 self.subset_mode = 1
                 self.sub_folders.append(os.path.basename(full_path))
-            
-        if self.subset_mode:     
-            self.response.print(f"Database folder is a subset folder: {(','.join(self.sub_folders))} ",'i')
-        else:
-            self.response.print(f"Database folder is a normal folder.",'i')
 
-        self.response.print(f"Creating resolutions: [white]{self.resolutions}[/white]",'i')
+        return self.sub_folders
+
+    def build_blocks(self):
+        """Backend blocks for the dataset and resolutions, without printing."""
+
+        default_resolutions = DEFAULT_REPEATS
+
+        default_disabled = {
+            "512" : "false",
+            "768" : "false",
+            "1024": "false",
+            "1536": "false"
+        }
+
+        blocks = {}
+        dataset_name = os.path.basename(self.dataset_folder)
 
         if len(self.sub_folders) > 0:
 
             for resolution in self.resolutions:
                 for folder in self.sub_folders:
                     backend_id = f"{self.id_base}_{folder}_{resolution}"
-                    folder = f"{os.path.basename(self.dataset_folder)}/{folder}"
-                    self.add_backend_block(backend_id, self.create_block(backend_id, folder, resolution))
-                    self.add_backend_block_data(backend_id, "repeats", default_resolutions[str(resolution)])
-                    self.add_backend_block_data(backend_id, "disabled", default_disabled[str(resolution)])
+                    block = self.create_block(backend_id, f"{dataset_name}/{folder}", resolution)
+                    block["repeats"] = parse_value(default_resolutions[str(resolution)])
+                    block["disabled"] = parse_value(default_disabled[str(resolution)])
+                    blocks[backend_id] = block
 
-                    
             for folder in self.sub_folders:
                 embed_id = f"text_embed_{folder}"
-                folder = f"{os.path.basename(self.dataset_folder)}/{folder}"
-                self.add_backend_block(embed_id, self.get_text_embeds(embed_id, folder))
+                blocks[embed_id] = self.get_text_embeds(embed_id, f"{dataset_name}/{folder}")
 
         else:
 
             for resolution in self.resolutions:
                 backend_id = f"{self.id_base}_{resolution}"
-                folder = os.path.basename(self.dataset_folder)
-                self.add_backend_block(backend_id, self.create_block(backend_id, folder, resolution))
-                self.add_backend_block_data(backend_id, "repeats", default_resolutions[str(resolution)])
-                self.add_backend_block_data(backend_id, "disabled", default_disabled[str(resolution)])
+                block = self.create_block(backend_id, dataset_name, resolution)
+                block["repeats"] = parse_value(default_resolutions[str(resolution)])
+                block["disabled"] = parse_value(default_disabled[str(resolution)])
+                blocks[backend_id] = block
+
+            embed_id = f"text_embed_{dataset_name}"
+            blocks[embed_id] = self.get_text_embeds(embed_id, dataset_name)
+
+        return blocks
 
-            embed_id = f"text_embed_{os.path.basename(self.dataset_folder)}"
-            self.add_backend_block(embed_id, self.get_text_embeds(embed_id, folder))
+    def resolve(self):
+
+        self.response.print(f"Testing database folder: [white]{self.dataset_folder}[/white]",'i')
+
+        self.scan_sub_folders()
+            
+        if self.subset_mode:     
+            self.response.print(f"Database folder is a subset folder: {(','.join(self.sub_folders))} ",'i')
+        else:
+            self.response.print(f"Database folder is a normal folder.",'i')
+
+        self.response.print(f"Creating resolutions: [white]{self.resolutions}[/white]",'i')
+
+        for backend_id, block in self.build_blocks().items():
+            self.add_backend_block(backend_id, block)
         
 
     def edit(self, line):
@@ -257,6 +274,9 @@ class MultiDataBackend:
 
     def editor(self):
 
+        if self.response.headless:
+            return
+
         while True:
             
             line = self.response.input("Enter edit line or [white]q[/white] to quit", "i")
@@ -336,6 +356,8 @@ class MultiDataBackend:
 
         for bid, data in self.multidatabackend.items():
             multidatabackend.append(data)
+
+        self.response.flush_status("Backend")
         
         with open(f"{self.config_folder}/multidatabackend.json", "w", encoding="utf-8") as f:
             f.write(json.dumps(multidatabackend, indent=4))
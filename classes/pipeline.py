@@ -0,0 +1,369 @@
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from rich.console import Console
+from rich.prompt import Prompt
+
+try:
+    from .catalog import Catalog, family_name, CONFIG_BASE, OUTPUT_BASE, DATASETS_BASE
+    from .dataset_grid import read_dataset_paths
+    from .transfer_queue import ask_background
+except ImportError:
+    from catalog import Catalog, family_name, CONFIG_BASE, OUTPUT_BASE, DATASETS_BASE
+    from dataset_grid import read_dataset_paths
+    from transfer_queue import ask_background
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Target:
+    """A selected config and what the scan found for it under output/ and datasets/."""
+
+    def __init__(self, config_dir: Path, model: str, version: str, output_dir: Path):
+        self.config_dir = config_dir
+        self.model = model
+        self.version = version
+        self.output_dir = output_dir
+        self.checkpoints: List[Path] = []
+        self.validation_images: List[Path] = []
+        self.dataset_paths: List[Path] = []
+        self.missing_datasets: List[Path] = []
+
+    @property
+    def family(self) -> str:
+        return family_name(self.config_dir.name)
+
+
+class WorkspaceScan:
+    """One catalog lookup over config/, output/ and datasets/ shared by every stage.
+
+    Configs, their model/version and checkpoints come from the catalog;
+    validation images and dataset folders are only read for the configs
+    that get selected.
+    """
+
+    def __init__(self, config_base: Path = CONFIG_BASE, output_base: Path = OUTPUT_BASE,
+                 datasets_base: Path = DATASETS_BASE, catalog: Optional[Catalog] = None):
+        self.config_base = Path(config_base)
+        self.output_base = Path(output_base)
+        self.datasets_base = Path(datasets_base)
+        self.catalog = catalog or Catalog(config_base=self.config_base, output_base=self.output_base)
+        self.families: Dict[str, List[Path]] = self.catalog.families()
+
+    def configs(self) -> List[Path]:
+        return [config for configs in self.families.values() for config in configs]
+
+    def resolve(self, names: Iterable[str]) -> List[Path]:
+        """Config folders for family names, exact config names or partial names."""
+        selected = []
+        for name in names:
+            if name in self.families:
+                matches = self.families[name]
+            else:
+                matches = [config for config in self.configs() if config.name == name] or \
+                          [config for config in self.configs() if name in config.name]
+            selected.extend(config for config in matches if config not in selected)
+        return selected
+
+    def target(self, config_dir: Path) -> Target:
+        row = self.catalog.config(config_dir.name)
+        model, version = row["model"], row["version"]
+        target = Target(config_dir, model, version, self.output_base / model / version)
+
+        target.checkpoints = [target.output_dir / checkpoint["name"]
+                              for checkpoint in self.catalog.checkpoints(model, version)]
+        output = self.catalog.output(model, version)
+        if output and output["validation_images"]:
+            target.validation_images = sorted((target.output_dir / 'validation_images').glob('*.png'))
+
+        try:
+            target.dataset_paths, target.missing_datasets = read_dataset_paths(config_dir, self.datasets_base)
+        except (OSError, ValueError):
+            pass
+        return target
+
+
+class Pipeline:
+    """Stages run as a small DAG on a thread pool.
+
+    A stage starts as soon as every stage it runs `after` has succeeded, so
+    independent stages (grids, LoRA uploads) overlap. A stage that raises or
+    returns False skips the stages depending on it and nothing else.
+    """
+
+    def __init__(self, console: Optional[Console] = None, workers: int = 3):
+        self.console = console or Console()
+        self.workers = workers
+        self.stages: Dict[str, Tuple[Callable[[], Optional[bool]], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[[], Optional[bool]], after: Iterable[str] = ()) -> None:
+        after = tuple(after)
+        # Dependencies must exist already, which also rules out cycles
+        for dep in after:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name} runs after unknown stage {dep}")
+        self.stages[name] = (func, after)
+
+    def _run_stage(self, name: str) -> bool:
+        self.console.print(f"[cyan]>> {name} started[/cyan]")
+        try:
+            ok = self.stages[name][0]() is not False
+        except Exception as e:
+            self.console.print(f"[red]Error in {name}: {str(e)}[/red]")
+            traceback.print_exc()
+            ok = False
+        self.console.print(f"[green]>> {name} done[/green]" if ok else f"[red]>> {name} failed[/red]")
+        return ok
+
+    def run(self) -> Dict[str, str]:
+        status: Dict[str, str] = {}
+        pending = list(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pp") as pool:
+            while pending or running:
+                # Stages are in dependency order, so one pass settles a whole chain
+                for name in list(pending):
+                    after = self.stages[name][1]
+                    if any(status.get(dep) in (FAILED, SKIPPED) for dep in after):
+                        status[name] = SKIPPED
+                        pending.remove(name)
+                        self.console.print(f"[yellow]>> {name} skipped[/yellow]")
+                    elif all(status.get(dep) == OK for dep in after):
+                        running[pool.submit(self._run_stage, name)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    status[running.pop(future)] = OK if future.result() else FAILED
+        return status
+
+
+class PostProcess:
+    """`easy pp`: move checkpoints, upload them, build grids and upload configs.
+
+    The selection is resolved once against one `WorkspaceScan` and every
+    stage works from the same targets:
+
+        lm -> upload
+        vg ----+
+               +-> dc   (so the grids go up with the configs)
+        dg ----+
+
+    `upload` without `lm` pushes the selected versions that are already in
+    the LoRA library.
+    """
+
+    def __init__(self, scan: Optional[WorkspaceScan] = None, console: Optional[Console] = None):
+        self.console = console or Console()
+        self.scan = scan or WorkspaceScan()
+        self.targets: List[Target] = []
+        self.moved: List[Target] = []
+        self.mover = None
+
+    def select(self, names: Iterable[str]) -> List[Target]:
+        self.targets = [self.scan.target(config) for config in self.scan.resolve(names)]
+        return self.targets
+
+    def select_interactive(self) -> List[Target]:
+        family_names = sorted(self.scan.families)
+        if not family_names:
+            self.console.print("[yellow]No config directories found to process[/yellow]")
+            return []
+        for idx, family in enumerate(family_names, 1):
+            self.console.print(f"[yellow]{idx}.[/yellow] {family}")
+        selection = Prompt.ask("\nEnter config family number (or press Enter to exit)", default="").strip()
+        if not selection:
+            return []
+        try:
+            family = family_names[int(selection) - 1]
+        except (ValueError, IndexError):
+            self.console.print("[red]Invalid selection[/red]")
+            return []
+
+        configs = self.scan.families[family]
+        self.console.print("\n[yellow]1.[/yellow] all")
+        for idx, config in enumerate(configs, 2):
+            self.console.print(f"[yellow]{idx}.[/yellow] {config.name}")
+        selection = Prompt.ask(f"\nEnter config number from {family} (or press Enter to exit)", default="").strip()
+        if not selection:
+            return []
+        try:
+            idx = int(selection)
+            if idx < 1:
+                raise IndexError
+            names = [family] if idx == 1 else [configs[idx - 2].name]
+        except (ValueError, IndexError):
+            self.console.print("[red]Invalid selection[/red]")
+            return []
+        return self.select(names)
+
+    def lora_mover(self):
+        if self.mover is None:
+            try:
+                from .lora_mover import LoRaMover
+            except ImportError:
+                from lora_mover import LoRaMover
+
+            self.mover = LoRaMover()
+            self.mover.base_path = self.scan.output_base
+            self.mover.config_base = self.scan.config_base
+        return self.mover
+
+    def move_loras(self) -> bool:
+        mover = self.lora_mover()
+        for target in self.targets:
+            if not target.checkpoints:
+                self.console.print(f"[yellow]No checkpoints for {target.config_dir.name}[/yellow]")
+                continue
+            dest_path = mover.destination_base / target.model / target.version
+            self.console.print(f"[cyan]Processing version {target.version} of {target.model}...[/cyan]")
+            if mover.process_safetensors(target.output_dir, dest_path, target.model, target.version):
+                self.moved.append(target)
+        return True
+
+    def upload_loras(self, background: bool, moved_only: bool = True) -> bool:
+        mover = self.lora_mover()
+        targets = self.moved
+        if not moved_only:
+            targets = []
+            for target in self.targets:
+                if (mover.destination_base / target.model / target.version).is_dir():
+                    targets.append(target)
+                else:
+                    self.console.print(f"[yellow]{target.model}/{target.version} is not in the LoRA library; "
+                                       "run the lm stage first[/yellow]")
+        for target in targets:
+            mover.sync_to_dropbox(f"{target.model}/{target.version}", is_single_version=True,
+                                  background=background)
+        return True
+
+    def validation_grids(self) -> bool:
+        try:
+            from .validation_grid import ValidationGridTool
+        except ImportError:
+            from validation_grid import ValidationGridTool
+
+        tool = ValidationGridTool()
+        tool.output_path = self.scan.output_base
+        tool.config_path = self.scan.config_base
+        ok = True
+        for target in self.targets:
+            if not target.validation_images:
+                self.console.print(f"[yellow]No validation images for {target.config_dir.name}[/yellow]")
+                continue
+            grid_image = tool.create_grid(target.validation_images, target.model, target.version)
+            ok = bool(grid_image and tool.save_grid(grid_image, target.model, target.version)) and ok
+        return ok
+
+    def dataset_grids(self) -> bool:
+        try:
+            from .dataset_grid import DatasetGridTool
+        except ImportError:
+            from dataset_grid import DatasetGridTool
+
+        tool = DatasetGridTool()
+        tool.config_path = self.scan.config_base
+        tool.datasets_path = self.scan.datasets_base
+        for target in self.targets:
+            for dataset_path in target.missing_datasets:
+                self.console.print(f"[yellow]Warning: Path not found: {dataset_path}[/yellow]")
+            if not target.dataset_paths:
+                self.console.print(f"[yellow]No dataset paths for {target.config_dir.name}[/yellow]")
+                continue
+            tool.process_single_config(target.config_dir, target.dataset_paths)
+        return True
+
+    def upload_configs(self, background: bool, bundle: bool) -> bool:
+        try:
+            from .download_configs import Tool as ConfigTool
+        except ImportError:
+            from download_configs import Tool as ConfigTool
+
+        tool = ConfigTool()
+        tool.base_path = self.scan.config_base
+        if not tool.verify_paths():
+            return False
+        families: Dict[str, List[Path]] = {}
+        for target in self.targets:
+            families.setdefault(target.family, []).append(target.config_dir)
+        ok = True
+        for family, configs in families.items():
+            ok = tool.upload_configs(configs, family, background=background, bundle=bundle) and ok
+        return ok
+
+    def pipeline(self, background: bool = False, bundle: bool = False,
+                 stages: Optional[Iterable[str]] = None) -> Pipeline:
+        stages = set(stages or ("lm", "upload", "vg", "dg", "dc"))
+        pipeline = Pipeline(self.console)
+        if "lm" in stages:
+            pipeline.add("lm", self.move_loras)
+            if "upload" in stages:
+                pipeline.add("upload", lambda: self.upload_loras(background), after=["lm"])
+        elif "upload" in stages:
+            pipeline.add("upload", lambda: self.upload_loras(background, moved_only=False))
+        if "vg" in stages:
+            pipeline.add("vg", self.validation_grids)
+        if "dg" in stages:
+            pipeline.add("dg", self.dataset_grids)
+        if "dc" in stages:
+            pipeline.add("dc", lambda: self.upload_configs(background, bundle),
+                         after=[name for name in ("vg", "dg") if name in stages])
+        return pipeline
+
+    def run(self, background: bool = False, bundle: bool = False,
+            stages: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        names = ", ".join(target.config_dir.name for target in self.targets)
+        self.console.print(f"[cyan]Post-processing {len(self.targets)} config(s): {names}[/cyan]")
+        status = self.pipeline(background, bundle, stages).run()
+        self.console.print("  ".join(f"{name}: {result}" for name, result in status.items()))
+        return status
+
+
+def main(args: List[str]) -> Dict[str, str]:
+    """`easy pp [--background] [--bundle] [--stages lm,upload,vg,dg,dc] [family|config ...]`.
+
+    Without names the family and config are picked interactively and the
+    background/bundle questions are asked once for the whole run.
+    """
+    flags = {arg for arg in args if arg.startswith("--")}
+    stages = None
+    names = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--stages" and args:
+            stages = [stage.strip() for stage in args.pop(0).split(",") if stage.strip()]
+        elif not arg.startswith("--"):
+            names.append(arg)
+
+    post = PostProcess()
+    if names:
+        targets = post.select(names)
+        background = "--background" in flags
+        bundle = "--bundle" in flags
+    else:
+        targets = post.select_interactive()
+        if not targets:
+            return {}
+        background = ask_background()
+        bundle = Prompt.ask("Upload configs as one compressed bundle?", choices=["y", "n"], default="n") == "y"
+
+    if not targets:
+        post.console.print(f"[yellow]No configs found matching {', '.join(names)}[/yellow]")
+        return {}
+    return post.run(background=background, bundle=bundle, stages=stages)
+
+
+if __name__ == "__main__":
+    try:
+        main(sys.argv[1:])
+    except Exception as e:
+        console = Console(stderr=True)
+        console.print("[red]Fatal error:[/red]")
+        console.print(f"[red]{str(e)}[/red]")
+        console.print(traceback.format_exc())
@@ -0,0 +1,383 @@
+import os
+import re
+import json
+import time
+import fcntl
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Iterable, Optional, Sequence, Tuple
+
+CACHE_DIR = Path(os.environ.get("EASY_CACHE_DIR", "/workspace/easy/.cache"))
+# Short-lived state (health checks, the rcd daemon) lives outside the workspace
+RUNTIME_DIR = Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()) / f"easy-{os.getuid()}"
+RCD_ADDR = os.environ.get("EASY_RCD_ADDR", "127.0.0.1:5572")
+LISTING_TTL = 15 * 60
+METRICS_FILE = CACHE_DIR / "transfer_metrics.jsonl"
+
+# Many small files (configs, grids) are latency bound, so run lots in parallel;
+# LoRA checkpoints are bandwidth bound and fewer streams avoid throttling.
+SMALL_FILE_FLAGS = ["--transfers", "32", "--checkers", "32"]
+LARGE_FILE_FLAGS = ["--transfers", "8", "--checkers", "16"]
+
+COPIED_LINE = re.compile(r"INFO\s*:\s*(.+?): Copied \(")
+
+# Stats are logged at NOTICE so they arrive even without -v
+JSON_LOG_FLAGS = ["--use-json-log", "--stats", "1s", "--stats-log-level", "NOTICE"]
+
+
+def temp_path_for(path: Path) -> Path:
+    """Temp file next to `path`, unique per process and thread, for atomic replaces."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def state_lock(path: Path):
+    """Hold an exclusive lock on a shared state file while it is re-read and rewritten.
+
+    The lock is an flock on `.<name>.lock` beside the file, so it covers the
+    transfer worker's job threads (each opens its own handle) as well as
+    tools running in other processes.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f".{path.name}.lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def run_rclone(args: Sequence[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Run rclone with captured text output."""
+    return subprocess.run(["rclone"] + list(args), capture_output=True, text=True, timeout=timeout)
+
+
+def rc_call(command: str, params: Optional[Dict] = None, timeout: float = 30) -> Dict:
+    """Call the rclone remote control API of the running `rclone rcd`.
+
+    Raises RuntimeError with rclone's message when the call fails.
+    """
+    request = urllib.request.Request(
+        f"http://{RCD_ADDR}/{command}",
+        data=json.dumps(params or {}).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        raise RuntimeError(message) from e
+    except (urllib.error.URLError, OSError) as e:
+        raise RuntimeError(f"rclone rcd not reachable at {RCD_ADDR}: {e}") from e
+
+
+def rcd_pid() -> Optional[int]:
+    """PID of the rcd daemon started by `start_rcd`, if it is still alive."""
+    try:
+        pid = int((RUNTIME_DIR / "rcd.pid").read_text())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+    return pid
+
+
+def start_rcd() -> int:
+    """Start a detached `rclone rcd` that every tool can share; returns its PID."""
+    pid = rcd_pid()
+    if pid:
+        return pid
+    RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+    with open(RUNTIME_DIR / "rcd.log", "a") as log:
+        process = subprocess.Popen(
+            ["rclone", "rcd", "--rc-addr", RCD_ADDR, "--rc-no-auth", "--rc-job-expire-duration", "10m"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True
+        )
+    (RUNTIME_DIR / "rcd.pid").write_text(str(process.pid))
+    # Wait until the API answers so the first tool call doesn't race startup
+    for _ in range(50):
+        try:
+            rc_call("rc/noop", timeout=1)
+            break
+        except RuntimeError:
+            time.sleep(0.1)
+    return process.pid
+
+
+def stop_rcd() -> bool:
+    pid = rcd_pid()
+    (RUNTIME_DIR / "rcd.pid").unlink(missing_ok=True)
+    if not pid:
+        return False
+    try:
+        rc_call("core/quit", timeout=5)
+    except RuntimeError:
+        os.kill(pid, 15)
+    return True
+
+
+def copied_name(line: str) -> Optional[str]:
+    """Relative path from an rclone `-v` "Copied" log line, else None."""
+    match = COPIED_LINE.search(line)
+    return match.group(1) if match else None
+
+
+def format_log_record(record: Dict) -> str:
+    """Plain rclone-style log text for a `--use-json-log` record."""
+    level = record.get("level", "info").upper()
+    if record.get("object"):
+        return f"{level:<6}: {record['object']}: {record.get('msg', '')}"
+    return f"{level:<6}: {record.get('msg', '')}"
+
+
+class TransferMetrics:
+    """Per-file transfer timings taken from rclone stats records.
+
+    Every finished file and a summary of the whole run are appended to a
+    JSON lines log, tagged with the destination and `--transfers` setting,
+    so slow links and over- or under-parallelized runs stand out.
+    """
+
+    def __init__(self, args: Sequence[str], metrics_file: Optional[Path] = None):
+        self.metrics_file = Path(metrics_file) if metrics_file else METRICS_FILE
+        args = list(args)
+        self.operation = args[0] if args else ""
+        self.destination = args[2] if len(args) > 2 else ""
+        self.transfers = int(args[args.index("--transfers") + 1]) if "--transfers" in args else 4
+        self.started = time.time()
+        self.active: Dict[str, Dict] = {}
+        self.records: List[Dict] = []
+        self.last_stats: Dict = {}
+
+    def stats(self, stats: Dict) -> None:
+        self.last_stats = stats
+        now = time.time()
+        for item in stats.get("transferring") or []:
+            entry = self.active.setdefault(item["name"], {"start": now})
+            entry.update(size=item.get("size"), bytes=item.get("bytes"), speed_avg=item.get("speedAvg"))
+
+    def completed(self, name: str) -> None:
+        entry = self.active.pop(name, None)
+        if entry is None:
+            # Finished between two stats records; no timing available
+            self.records.append({"file": name})
+            return
+        seconds = time.time() - entry["start"]
+        self.records.append({
+            "file": name,
+            "bytes": entry.get("size"),
+            "seconds": round(seconds, 2),
+            "rate": entry.get("speed_avg") or (entry.get("size") or 0) / max(seconds, 1e-3),
+        })
+
+    def save(self, ok: bool) -> None:
+        if self.operation not in ("copy", "sync", "move"):
+            return
+        elapsed = time.time() - self.started
+        common = {"time": time.time(), "operation": self.operation,
+                  "destination": self.destination, "transfers": self.transfers}
+        total_bytes = self.last_stats.get("bytes", 0)
+        summary = {
+            **common,
+            "kind": "run",
+            "ok": ok,
+            "files": len(self.records),
+            "bytes": total_bytes,
+            "seconds": round(elapsed, 2),
+            "rate": total_bytes / max(elapsed, 1e-3),
+        }
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_file, "a", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps({**common, "kind": "file", **record}) + "\n")
+            f.write(json.dumps(summary) + "\n")
+
+
+def stream_rclone(args: Sequence[str], on_line: Optional[Callable[[str], None]] = None,
+                  on_stats: Optional[Callable[[Dict], None]] = None,
+                  metrics_file: Optional[Path] = None) -> Tuple[int, Optional[str]]:
+    """Run a transfer with JSON logging, parsing records as they arrive.
+
+    Stats records (once a second) go to `on_stats`; every other record is
+    turned back into a plain log line for `on_line`. Per-file throughput is
+    appended to the metrics log. Returns (exit code, last error message).
+    """
+    args = [arg for arg in args if arg != "--progress"]
+    if "-v" not in args and "--verbose" not in args:
+        args.append("-v")
+    args += JSON_LOG_FLAGS
+
+    metrics = TransferMetrics(args, metrics_file)
+    last_error = None
+    process = subprocess.Popen(
+        ["rclone"] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True
+    )
+    for raw in process.stdout:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            if on_line:
+                on_line(raw)
+            continue
+
+        if "stats" in record:
+            metrics.stats(record["stats"])
+            if on_stats:
+                on_stats(record["stats"])
+            continue
+
+        line = format_log_record(record)
+        if record.get("level") in ("error", "critical"):
+            last_error = line
+        if record.get("object") and record.get("msg", "").startswith("Copied"):
+            metrics.completed(record["object"])
+        if on_line:
+            on_line(line)
+    process.wait()
+    metrics.save(process.returncode == 0)
+    return process.returncode, last_error
+
+
+def write_files_from(root: Path, sources: Iterable[Path], excluded_dirs: Iterable[str] = ()) -> Path:
+    """Write an rclone `--files-from` manifest of every file under `sources`.
+
+    Paths are relative to `root`, so one `rclone copy root dest --files-from`
+    reproduces each source's layout below `dest`. The caller removes the file.
+    """
+    root = Path(root)
+    excluded = set(excluded_dirs)
+    manifest = tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="easy-files-from-",
+                                           delete=False, encoding="utf-8")
+    with manifest:
+        for source in sources:
+            source = Path(source)
+            if source.is_file():
+                manifest.write(f"{source.relative_to(root)}\n")
+                continue
+            for directory, dirs, files in os.walk(source):
+                dirs[:] = [d for d in dirs if d not in excluded]
+                for name in sorted(files):
+                    manifest.write(f"{(Path(directory) / name).relative_to(root)}\n")
+    return Path(manifest.name)
+
+
+def write_manifest(names: Iterable[str]) -> Path:
+    """Write relative paths as an rclone `--files-from` manifest. The caller removes the file."""
+    manifest = tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="easy-files-from-",
+                                           delete=False, encoding="utf-8")
+    with manifest:
+        for name in names:
+            manifest.write(f"{name}\n")
+    return Path(manifest.name)
+
+
+class RemoteListingCache:
+    """On-disk cache of remote listings shared by every tool that talks to a remote.
+
+    Listings are keyed by remote path and listing options and expire after
+    `ttl` seconds. Tools that write to a remote call `invalidate()` on the
+    written prefix so the next listing is fetched fresh.
+    """
+
+    def __init__(self, store=None, ttl: float = LISTING_TTL, cache_file: Optional[Path] = None):
+        if store is None:
+            try:
+                from .remote_store import get_store
+            except ImportError:
+                from remote_store import get_store
+            store = get_store()
+        self.store = store
+        self.ttl = ttl
+        self.cache_file = Path(cache_file) if cache_file else CACHE_DIR / "remote_listings.json"
+        self.last_error = None
+        self._entries = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_path_for(self.cache_file)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        temp_path.replace(self.cache_file)
+
+    @staticmethod
+    def _key(remote: str, options: Dict) -> str:
+        return " ".join([remote.rstrip("/")] + [f"{k}={v}" for k, v in sorted(options.items()) if v])
+
+    def _fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and time.time() - entry["time"] < self.ttl
+
+    def list(self, remote: str, refresh: bool = False, **options) -> Optional[List[str]]:
+        """Return the store's listing of `remote`, from cache when still fresh.
+
+        `options` are passed through to `RemoteStore.list` (dirs_only, ...).
+        """
+        entries = self._load()
+        key = self._key(remote, options)
+        if not refresh and self._fresh(entries.get(key)):
+            return entries[key]["lines"]
+
+        lines = self.store.list(remote, **options)
+        if lines is None:
+            self.last_error = self.store.last_error
+            return None
+
+        entries[key] = {"remote": remote.rstrip("/"), "time": time.time(), "lines": lines}
+        self._save()
+        return lines
+
+    def ensure_dir(self, remote: str) -> bool:
+        """Create a remote directory unless it was created recently."""
+        entries = self._load()
+        key = self._key(remote, {"mkdir": True})
+        if self._fresh(entries.get(key)):
+            return True
+
+        if not self.store.mkdir(remote):
+            self.last_error = self.store.last_error
+            return False
+
+        entries[key] = {"remote": remote.rstrip("/"), "time": time.time(), "lines": []}
+        self._save()
+        return True
+
+    def invalidate(self, remote_prefix: Optional[str] = None) -> None:
+        """Drop cached listings at or below `remote_prefix` (all when None)."""
+        # Re-read under the lock so concurrent invalidations can't undo each other
+        with state_lock(self.cache_file):
+            self._entries = None
+            entries = self._load()
+            if remote_prefix is None:
+                entries.clear()
+            else:
+                prefix = remote_prefix.rstrip("/")
+                for key, entry in list(entries.items()):
+                    remote = entry.get("remote", "")
+                    if remote == prefix or remote.startswith(prefix + "/"):
+                        del entries[key]
+            self._save()
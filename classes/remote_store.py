@@ -0,0 +1,548 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    from .rclone import run_rclone, stream_rclone, write_manifest
+    from .rclone import RUNTIME_DIR, TransferMetrics, rc_call, rcd_pid
+    from .checksums import hash_file, content_hash
+except ImportError:
+    from rclone import run_rclone, stream_rclone, write_manifest
+    from rclone import RUNTIME_DIR, TransferMetrics, rc_call, rcd_pid
+    from checksums import hash_file, content_hash
+
+DEFAULT_REMOTE = "dbx:"
+HEALTH_TTL = 120
+
+OutputCallback = Optional[Callable[[str], None]]
+StatsCallback = Optional[Callable[[Dict], None]]
+
+
+class RemoteStore:
+    """Interface the sync tools use for every remote read and write.
+
+    Remote locations are plain strings produced by `path()`, so tools can
+    keep treating them as opaque destinations. `flags` arguments carry
+    rclone tuning options and are ignored by stores that don't use rclone.
+    Transfers report rclone-style log lines to `on_output` and rclone
+    stats records (bytes, totalBytes, speed, eta, transferring) to
+    `on_stats`.
+    """
+
+    def __init__(self):
+        self.last_error = None
+        self.url = None
+
+    def path(self, *parts: str) -> str:
+        raise NotImplementedError
+
+    def check(self, timeout: float = 10) -> bool:
+        """Quick connectivity check."""
+        raise NotImplementedError
+
+    def list(self, remote: str, dirs_only: bool = False, files_only: bool = False,
+             recursive: bool = False) -> Optional[List[str]]:
+        """`lsf`-style listing: relative names, directories end with '/'."""
+        raise NotImplementedError
+
+    def file_info(self, remote: str) -> Optional[Dict[str, Dict]]:
+        """Size and content hash (see `checksums.content_hash`) of every file below `remote`.
+
+        Returns relative path -> {"size", "hash"}; an empty dict when `remote`
+        does not exist yet and None on errors. `hash` is None when the
+        backend can't provide one.
+        """
+        raise NotImplementedError
+
+    def mkdir(self, remote: str) -> bool:
+        raise NotImplementedError
+
+    def copy(self, source: Path, remote: str, files_from: Optional[Path] = None,
+             checksum: bool = False, ignore_existing: bool = False,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        """Copy new and changed files from a local folder to `remote`."""
+        raise NotImplementedError
+
+    def download(self, remote: str, dest: Path, files_from: Optional[Path] = None,
+                 include: Optional[Iterable[str]] = None, flags: Sequence[str] = (),
+                 on_output: OutputCallback = None, on_stats: StatsCallback = None) -> bool:
+        """Copy new and changed files from `remote` into a local folder.
+
+        `files_from` limits the copy to listed relative paths, `include` to
+        those top-level subfolders.
+        """
+        raise NotImplementedError
+
+    def sync(self, source: Path, remote: str, include: Optional[Iterable[str]] = None,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        """Make `remote` match a local folder, deleting extra remote files.
+
+        With `include`, only those top-level subfolders are touched.
+        """
+        raise NotImplementedError
+
+    def delete(self, remote: str, names: Iterable[str], on_output: OutputCallback = None) -> bool:
+        """Delete the given relative paths below `remote`."""
+        raise NotImplementedError
+
+
+class RcloneStore(RemoteStore):
+    def __init__(self, remote: str = DEFAULT_REMOTE):
+        super().__init__()
+        self.remote = remote.rstrip("/")
+        self.url = self.remote
+
+    def path(self, *parts: str) -> str:
+        return "/".join([self.remote] + [part.strip("/") for part in parts if part])
+
+    def check(self, timeout: float = 10) -> bool:
+        try:
+            result = run_rclone(["lsf", f"{self.remote}/", "--max-depth", "1"], timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.last_error = "connection check timed out"
+            return False
+        if result.returncode != 0:
+            self.last_error = result.stderr
+            return False
+        return True
+
+    def list(self, remote: str, dirs_only: bool = False, files_only: bool = False,
+             recursive: bool = False) -> Optional[List[str]]:
+        args = ["lsf", remote]
+        if dirs_only:
+            args.append("--dirs-only")
+        if files_only:
+            args.append("--files-only")
+        if recursive:
+            args.append("-R")
+        result = run_rclone(args)
+        if result.returncode != 0:
+            self.last_error = result.stderr
+            return None
+        return result.stdout.splitlines()
+
+    def file_info(self, remote: str) -> Optional[Dict[str, Dict]]:
+        result = run_rclone(["lsjson", remote, "-R", "--files-only", "--hash", "--hash-type", "dropbox"])
+        if result.returncode != 0:
+            if "directory not found" in result.stderr:
+                return {}
+            self.last_error = result.stderr
+            return None
+        return {
+            entry["Path"]: {"size": entry["Size"], "hash": (entry.get("Hashes") or {}).get("dropbox")}
+            for entry in json.loads(result.stdout or "[]")
+        }
+
+    def mkdir(self, remote: str) -> bool:
+        result = run_rclone(["mkdir", remote])
+        if result.returncode != 0:
+            self.last_error = result.stderr
+            return False
+        return True
+
+    def _run(self, args: List[str], on_output: OutputCallback, on_stats: StatsCallback = None) -> bool:
+        returncode, error = stream_rclone(args, on_line=on_output, on_stats=on_stats)
+        if returncode != 0:
+            self.last_error = error or f"rclone exited with code {returncode}"
+        return returncode == 0
+
+    def copy(self, source: Path, remote: str, files_from: Optional[Path] = None,
+             checksum: bool = False, ignore_existing: bool = False,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        args = ["copy", str(source), remote]
+        if files_from:
+            args += ["--files-from", str(files_from)]
+        if checksum:
+            args.append("--checksum")
+        if ignore_existing:
+            args.append("--ignore-existing")
+        return self._run(args + list(flags), on_output, on_stats)
+
+    @staticmethod
+    def _include_filters(include: Optional[Iterable[str]]) -> List[str]:
+        # Filtered-out paths are neither copied nor deleted
+        if not include:
+            return []
+        return [f"+ /{name}/**" for name in include] + ["- **"]
+
+    def download(self, remote: str, dest: Path, files_from: Optional[Path] = None,
+                 include: Optional[Iterable[str]] = None, flags: Sequence[str] = (),
+                 on_output: OutputCallback = None, on_stats: StatsCallback = None) -> bool:
+        args = ["copy", remote, str(dest)]
+        if files_from:
+            args += ["--files-from", str(files_from)]
+        for rule in self._include_filters(include):
+            args += ["--filter", rule]
+        return self._run(args + list(flags), on_output, on_stats)
+
+    def sync(self, source: Path, remote: str, include: Optional[Iterable[str]] = None,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        args = ["sync", str(source), remote]
+        for rule in self._include_filters(include):
+            args += ["--filter", rule]
+        return self._run(args + list(flags), on_output, on_stats)
+
+    def delete(self, remote: str, names: Iterable[str], on_output: OutputCallback = None) -> bool:
+        names = list(names)
+        if not names:
+            return True
+        manifest = write_manifest(names)
+        try:
+            return self._run(["delete", remote, "--files-from", str(manifest), "--no-traverse", "-v"], on_output)
+        finally:
+            manifest.unlink()
+
+
+class RcdStore(RcloneStore):
+    """RcloneStore that sends every operation to the shared `rclone rcd` daemon.
+
+    The daemon keeps remote connections and listings warm between tools, so
+    a chain like `easy pp` pays rclone's startup and authentication once.
+    rclone flags are translated to rc `_config` options; flags without an
+    rc equivalent (`-v`, `--progress`) are dropped. The daemon only has a
+    global bandwidth limit, so the transfer worker runs jobs that carry a
+    `--bwlimit` through RcloneStore instead.
+    """
+
+    VALUE_FLAGS = {"--transfers": "Transfers", "--checkers": "Checkers"}
+    SWITCH_FLAGS = {"--no-traverse": "NoTraverse", "--ignore-times": "IgnoreTimes"}
+
+    def _config(self, flags: Sequence[str], **switches) -> Dict:
+        flags = list(flags)
+        config = {name: True for name, enabled in switches.items() if enabled}
+        for flag, name in self.VALUE_FLAGS.items():
+            if flag in flags:
+                config[name] = int(flags[flags.index(flag) + 1])
+        for flag, name in self.SWITCH_FLAGS.items():
+            if flag in flags:
+                config[name] = True
+        return config
+
+    def _call(self, command: str, params: Dict, timeout: float = 60) -> Optional[Dict]:
+        try:
+            return rc_call(command, params, timeout=timeout)
+        except RuntimeError as e:
+            self.last_error = str(e)
+            return None
+
+    def check(self, timeout: float = 10) -> bool:
+        return self._call("operations/list", {"fs": f"{self.remote}/", "remote": "",
+                                              "opt": {"dirsOnly": True}}, timeout=timeout) is not None
+
+    def list(self, remote: str, dirs_only: bool = False, files_only: bool = False,
+             recursive: bool = False) -> Optional[List[str]]:
+        result = self._call("operations/list", {"fs": remote, "remote": "", "opt": {
+            "recurse": recursive, "dirsOnly": dirs_only, "filesOnly": files_only}})
+        if result is None:
+            return None
+        return [item["Path"] + ("/" if item["IsDir"] else "") for item in result.get("list") or []]
+
+    def file_info(self, remote: str) -> Optional[Dict[str, Dict]]:
+        result = self._call("operations/list", {"fs": remote, "remote": "", "opt": {
+            "recurse": True, "filesOnly": True, "showHash": True, "hashTypes": ["dropbox"]}})
+        if result is None:
+            return {} if "directory not found" in (self.last_error or "") else None
+        return {item["Path"]: {"size": item["Size"], "hash": (item.get("Hashes") or {}).get("dropbox")}
+                for item in result.get("list") or [] if not item.get("IsDir")}
+
+    def mkdir(self, remote: str) -> bool:
+        return self._call("operations/mkdir", {"fs": remote, "remote": ""}) is not None
+
+    def _run_job(self, command: str, params: Dict, on_output: OutputCallback,
+                 on_stats: StatsCallback, metrics: TransferMetrics) -> bool:
+        """Start an async rc job and poll its stats and finished transfers."""
+        group = f"easy-{uuid.uuid4().hex[:8]}"
+        started = self._call(command, {**params, "_async": True, "_group": group})
+        if started is None:
+            return False
+
+        reported = set()
+        while True:
+            status = self._call("job/status", {"jobid": started["jobid"]})
+            if status is None:
+                return False
+            stats = self._call("core/stats", {"group": group}) or {}
+            metrics.stats(stats)
+            if on_stats:
+                on_stats(stats)
+            transferred = self._call("core/transferred", {"group": group}) or {}
+            for item in transferred.get("transferred") or []:
+                key = (item["name"], item.get("completed_at"))
+                if key in reported or not item.get("completed_at"):
+                    continue
+                reported.add(key)
+                if item.get("error"):
+                    line = f"ERROR : {item['name']}: {item['error']}"
+                else:
+                    metrics.completed(item["name"])
+                    line = f"INFO  : {item['name']}: Copied (new)"
+                if on_output:
+                    on_output(line)
+            if status.get("finished"):
+                break
+            time.sleep(1)
+
+        metrics.save(bool(status.get("success")))
+        if not status.get("success"):
+            self.last_error = status.get("error") or "rc job failed"
+        return bool(status.get("success"))
+
+    def copy(self, source: Path, remote: str, files_from: Optional[Path] = None,
+             checksum: bool = False, ignore_existing: bool = False,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        params = {"srcFs": str(source), "dstFs": remote,
+                  "_config": self._config(flags, CheckSum=checksum, IgnoreExisting=ignore_existing)}
+        if files_from:
+            params["_filter"] = {"FilesFrom": [str(files_from)]}
+        return self._run_job("sync/copy", params, on_output, on_stats,
+                             TransferMetrics(["copy", str(source), remote, *flags]))
+
+    def download(self, remote: str, dest: Path, files_from: Optional[Path] = None,
+                 include: Optional[Iterable[str]] = None, flags: Sequence[str] = (),
+                 on_output: OutputCallback = None, on_stats: StatsCallback = None) -> bool:
+        params = {"srcFs": remote, "dstFs": str(dest), "_config": self._config(flags)}
+        if files_from:
+            params["_filter"] = {"FilesFrom": [str(files_from)]}
+        elif include:
+            params["_filter"] = {"FilterRule": self._include_filters(include)}
+        return self._run_job("sync/copy", params, on_output, on_stats,
+                             TransferMetrics(["copy", remote, str(dest), *flags]))
+
+    def sync(self, source: Path, remote: str, include: Optional[Iterable[str]] = None,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        params = {"srcFs": str(source), "dstFs": remote, "_config": self._config(flags)}
+        if include:
+            params["_filter"] = {"FilterRule": self._include_filters(include)}
+        return self._run_job("sync/sync", params, on_output, on_stats,
+                             TransferMetrics(["sync", str(source), remote, *flags]))
+
+    def delete(self, remote: str, names: Iterable[str], on_output: OutputCallback = None) -> bool:
+        for name in names:
+            if self._call("operations/deletefile", {"fs": remote, "remote": name}) is None:
+                return False
+            if on_output:
+                on_output(f"INFO  : {name}: Deleted")
+        return True
+
+
+class LocalStore(RemoteStore):
+    """Stand-in remote backed by a local directory (`file:///some/dir`).
+
+    Mirrors the rclone semantics the tools rely on, so sync paths can be
+    tested and benchmarked on a machine without network access.
+    """
+
+    def __init__(self, root: Path):
+        super().__init__()
+        self.root = Path(root)
+        self.url = f"file://{self.root}"
+
+    def path(self, *parts: str) -> str:
+        return str(self.root.joinpath(*[part.strip("/") for part in parts if part]))
+
+    def check(self, timeout: float = 10) -> bool:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    def list(self, remote: str, dirs_only: bool = False, files_only: bool = False,
+             recursive: bool = False) -> Optional[List[str]]:
+        base = Path(remote)
+        if not base.is_dir():
+            self.last_error = f"directory not found: {remote}"
+            return None
+        entries = base.rglob("*") if recursive else base.iterdir()
+        lines = []
+        for entry in sorted(entries):
+            name = entry.relative_to(base).as_posix()
+            if entry.is_dir() and not files_only:
+                lines.append(f"{name}/")
+            elif entry.is_file() and not dirs_only:
+                lines.append(name)
+        return lines
+
+    def file_info(self, remote: str) -> Optional[Dict[str, Dict]]:
+        base = Path(remote)
+        if not base.is_dir():
+            return {}
+        try:
+            return {
+                entry.relative_to(base).as_posix(): {"size": entry.stat().st_size, "hash": content_hash(entry)}
+                for entry in sorted(base.rglob("*")) if entry.is_file()
+            }
+        except OSError as e:
+            self.last_error = str(e)
+            return None
+
+    def mkdir(self, remote: str) -> bool:
+        try:
+            Path(remote).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    @staticmethod
+    def _source_files(source: Path, files_from: Optional[Path]) -> List[str]:
+        if files_from:
+            with open(files_from, "r", encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return [p.relative_to(source).as_posix() for p in sorted(source.rglob("*")) if p.is_file()]
+
+    @staticmethod
+    def _unchanged(src: Path, dst: Path, checksum: bool) -> bool:
+        if not dst.exists() or src.stat().st_size != dst.stat().st_size:
+            return False
+        if checksum:
+            return hash_file(src) == hash_file(dst)
+        return int(src.stat().st_mtime) == int(dst.stat().st_mtime)
+
+    def _copy_names(self, source: Path, dest: Path, names: Iterable[str], checksum: bool,
+                    ignore_existing: bool, on_output: OutputCallback, force: bool = False,
+                    on_stats: StatsCallback = None) -> None:
+        names = [name for name in names if (source / name).is_file()]
+        total = sum((source / name).stat().st_size for name in names)
+        done = 0
+        started = time.time()
+        for name in names:
+            src = source / name
+            dst = dest / name
+            size = src.stat().st_size
+            if not (ignore_existing and dst.exists()) and (force or not self._unchanged(src, dst, checksum)):
+                existed = dst.exists()
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dst)
+                if on_output:
+                    on_output(f"INFO  : {name}: Copied ({'replaced existing' if existed else 'new'})")
+            done += size
+            if on_stats:
+                # Same shape as rclone's stats records, one per file
+                speed = done / max(time.time() - started, 1e-3)
+                on_stats({"bytes": done, "totalBytes": total, "speed": speed,
+                          "eta": (total - done) / speed if speed else None, "transferring": []})
+
+    def copy(self, source: Path, remote: str, files_from: Optional[Path] = None,
+             checksum: bool = False, ignore_existing: bool = False,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        source = Path(source)
+        try:
+            self._copy_names(source, Path(remote), self._source_files(source, files_from),
+                             checksum, ignore_existing, on_output, force="--ignore-times" in flags,
+                             on_stats=on_stats)
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    def download(self, remote: str, dest: Path, files_from: Optional[Path] = None,
+                 include: Optional[Iterable[str]] = None, flags: Sequence[str] = (),
+                 on_output: OutputCallback = None, on_stats: StatsCallback = None) -> bool:
+        source = Path(remote)
+        try:
+            if files_from or not include:
+                names = self._source_files(source, files_from)
+            else:
+                names = [p.relative_to(source).as_posix() for scope in include
+                         for p in sorted((source / scope).rglob("*")) if p.is_file()]
+            self._copy_names(source, Path(dest), names, False, False, on_output, on_stats=on_stats)
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    def sync(self, source: Path, remote: str, include: Optional[Iterable[str]] = None,
+             flags: Sequence[str] = (), on_output: OutputCallback = None,
+             on_stats: StatsCallback = None) -> bool:
+        source = Path(source)
+        dest = Path(remote)
+        scopes = list(include) if include else [""]
+        try:
+            for scope in scopes:
+                src_scope = source / scope
+                dst_scope = dest / scope
+                if src_scope.is_dir():
+                    names = [p.relative_to(source).as_posix() for p in sorted(src_scope.rglob("*")) if p.is_file()]
+                    self._copy_names(source, dest, names, False, False, on_output, on_stats=on_stats)
+                if not dst_scope.exists():
+                    continue
+                for dst in sorted(dst_scope.rglob("*"), reverse=True):
+                    if not (src_scope / dst.relative_to(dst_scope)).exists():
+                        if dst.is_dir():
+                            shutil.rmtree(dst)
+                        else:
+                            dst.unlink()
+                        if on_output:
+                            on_output(f"INFO  : {dst.relative_to(dest).as_posix()}: Deleted")
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+    def delete(self, remote: str, names: Iterable[str], on_output: OutputCallback = None) -> bool:
+        try:
+            for name in names:
+                target = Path(remote) / name
+                if target.is_file():
+                    target.unlink()
+                    if on_output:
+                        on_output(f"INFO  : {name}: Deleted")
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+        return True
+
+
+def get_store(url: Optional[str] = None) -> RemoteStore:
+    """Store for `url`, `$EASY_REMOTE` or the default rclone remote.
+
+    `file:///some/dir` selects a LocalStore; anything else is an rclone remote
+    name such as `dbx:`, served by the shared rcd daemon when one is running
+    (`easy rcd start`, disable with `EASY_RCD=0`).
+    """
+    url = url or os.environ.get("EASY_REMOTE") or DEFAULT_REMOTE
+    if url.startswith("file://"):
+        return LocalStore(Path(url[len("file://"):]))
+    if os.environ.get("EASY_RCD") != "0" and rcd_pid():
+        return RcdStore(url)
+    return RcloneStore(url)
+
+
+def check_cached(store: RemoteStore, timeout: float = 10, ttl: float = HEALTH_TTL) -> bool:
+    """`store.check()`, skipped when the same remote passed one within `ttl` seconds.
+
+    Results are shared between tool processes through the runtime dir, so
+    chained tools only probe the remote once. Failures are never cached.
+    """
+    health_file = RUNTIME_DIR / "remote_health.json"
+    try:
+        with open(health_file, "r", encoding="utf-8") as f:
+            health = json.load(f)
+    except (OSError, ValueError):
+        health = {}
+    if time.time() - health.get(store.url, 0) < ttl:
+        return True
+
+    if not store.check(timeout=timeout):
+        return False
+    health[store.url] = time.time()
+    RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = health_file.with_name(f".{health_file.name}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(health, f)
+    temp_path.replace(health_file)
+    return True
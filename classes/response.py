@@ -1,10 +1,33 @@
+import os
+import time
 from rich.console import Console
-from rich.table import Table
+
+# EASY_HEADLESS=1 turns off UI pacing and prompts for scripted runs
+HEADLESS = os.environ.get("EASY_HEADLESS", "") not in ("", "0")
 
 class Response:
 
-    def __init__(self):
+    def __init__(self, headless=None):
         self.console = Console()
+        self.headless = HEADLESS if headless is None else headless
+        self.pending = []
+
+    def pause(self, seconds):
+        """UI pacing between steps; skipped when headless."""
+        if not self.headless:
+            time.sleep(seconds)
+
+    def status(self, msg="", mode="s"):
+        """Per-key progress: printed now, or collected for flush_status when headless."""
+        if self.headless:
+            self.pending.append(msg)
+        else:
+            self.print(msg, mode)
+
+    def flush_status(self, label):
+        if self.pending:
+            self.print(f"{label}: {len(self.pending)} update(s)", "s")
+            self.pending = []
 
     def input(self, msg="", mode=""):
         if mode == 'i':
@@ -30,6 +53,7 @@ class Response:
 
     def edit_table(self, title="Table", columns=[], rows=[]):
         # self.console.clear()
+        from rich.table import Table
 
         table = Table(title=title, show_lines=True)
 
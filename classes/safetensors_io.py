@@ -0,0 +1,186 @@
+import os
+import json
+import shutil
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# A safetensors file is laid out as:
+#   8 bytes   little-endian u64 header length N
+#   N bytes   JSON header (tensor dtypes/shapes/offsets + optional "__metadata__")
+#   rest      raw tensor bytes, addressed relative to the end of the header
+# Metadata only lives in the header, so it can be rewritten without ever
+# decoding or re-serializing the tensor region.
+
+HEADER_LENGTH_SIZE = 8
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+DTYPE_SIZES = {
+    "BOOL": 1, "U8": 1, "I8": 1, "F8_E4M3": 1, "F8_E5M2": 1,
+    "U16": 2, "I16": 2, "F16": 2, "BF16": 2,
+    "U32": 4, "I32": 4, "F32": 4,
+    "U64": 8, "I64": 8, "F64": 8,
+}
+
+
+def read_header(path: Path) -> Tuple[Dict, int]:
+    """Return the parsed JSON header and the byte offset where tensor data starts."""
+    with open(path, "rb") as f:
+        raw_length = f.read(HEADER_LENGTH_SIZE)
+        if len(raw_length) != HEADER_LENGTH_SIZE:
+            raise ValueError(f"{path} is too small to be a safetensors file")
+
+        header_length = struct.unpack("<Q", raw_length)[0]
+        if header_length > MAX_HEADER_SIZE:
+            raise ValueError(f"{path} has an implausible header length ({header_length} bytes)")
+
+        raw_header = f.read(header_length)
+        if len(raw_header) != header_length:
+            raise ValueError(f"{path} is truncated inside its header")
+
+    return json.loads(raw_header), HEADER_LENGTH_SIZE + header_length
+
+
+def build_header(header: Dict, metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Serialize a header (length prefix included) with metadata merged in."""
+    header = dict(header)
+    if metadata:
+        merged = dict(header.get("__metadata__") or {})
+        # The format only allows str -> str in __metadata__
+        merged.update({str(k): v if isinstance(v, str) else json.dumps(v) for k, v in metadata.items()})
+        header["__metadata__"] = merged
+
+    raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Keep the tensor region 8-byte aligned; trailing spaces are valid JSON padding
+    raw_header += b" " * (-len(raw_header) % 8)
+    return struct.pack("<Q", len(raw_header)) + raw_header
+
+
+def validate_header(header: Dict, data_start: int, file_size: int) -> None:
+    """Check that the tensor offsets in `header` exactly cover the data region.
+
+    Raises ValueError for truncated files, overlapping/out of range tensors or
+    byte counts that don't match the declared dtype and shape.
+    """
+    data_size = file_size - data_start
+    if data_size < 0:
+        raise ValueError("file is shorter than its declared header")
+
+    spans = []
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        try:
+            begin, end = info["data_offsets"]
+            item_size = DTYPE_SIZES[info["dtype"]]
+            shape = info["shape"]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"tensor {name} has a malformed header entry")
+
+        element_count = 1
+        for dim in shape:
+            element_count *= dim
+        if end - begin != element_count * item_size:
+            raise ValueError(f"tensor {name} spans {end - begin} bytes, expected {element_count * item_size}")
+        spans.append((begin, end, name))
+
+    position = 0
+    for begin, end, name in sorted(spans):
+        if begin != position:
+            raise ValueError(f"tensor {name} starts at {begin}, expected {position}")
+        position = end
+
+    if position != data_size:
+        raise ValueError(f"tensor data covers {position} bytes but file holds {data_size}")
+
+
+def validate_file(path: Path) -> Tuple[Dict, int]:
+    """Read and validate a safetensors header against the file size."""
+    header, data_start = read_header(path)
+    validate_header(header, data_start, Path(path).stat().st_size)
+    return header, data_start
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, count: int, hasher=None) -> None:
+    """Copy `count` bytes from `src_fd` at `offset` to the current position of `dst_fd`.
+
+    Uses copy_file_range (reflink/server-side copy on filesystems that support
+    it), then sendfile, and finally a plain buffered loop. When a `hasher` is
+    given the bytes have to pass through userspace anyway, so the buffered loop
+    is used and the hash is updated as the data moves.
+    """
+    remaining = count
+
+    if hasher is None and hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, min(remaining, 1 << 30), offset)
+                if copied == 0:
+                    break
+                offset += copied
+                remaining -= copied
+        except OSError:
+            pass
+
+    if hasher is None and remaining > 0 and hasattr(os, "sendfile"):
+        try:
+            while remaining > 0:
+                copied = os.sendfile(dst_fd, src_fd, offset, min(remaining, 1 << 30))
+                if copied == 0:
+                    break
+                offset += copied
+                remaining -= copied
+        except OSError:
+            pass
+
+    buffer = bytearray(min(remaining, COPY_CHUNK_SIZE))
+    view = memoryview(buffer)
+    while remaining > 0:
+        read = os.preadv(src_fd, [view[:min(remaining, len(buffer))]], offset)
+        if read == 0:
+            raise IOError(f"Unexpected end of file, {remaining} bytes missing")
+        chunk = view[:read]
+        if hasher is not None:
+            hasher.update(chunk)
+        written = 0
+        while written < read:
+            written += os.write(dst_fd, chunk[written:])
+        offset += read
+        remaining -= read
+
+
+def write_with_metadata(source: Path, dest: Path, metadata: Dict[str, str], hasher=None) -> int:
+    """Copy `source` to `dest`, replacing only the header metadata.
+
+    The tensor bytes are streamed across unchanged. The source header is
+    validated first so a truncated checkpoint is never published, and the
+    result is written to a `.part` file and renamed into place, so an
+    interrupted move never leaves a half-written checkpoint at `dest`. If a
+    `hasher` is given it receives every byte written to `dest`. Returns the
+    bytes written.
+    """
+    source = Path(source)
+    dest = Path(dest)
+    header, data_start = validate_file(source)
+    new_header = build_header(header, metadata)
+    data_size = source.stat().st_size - data_start
+
+    part_path = dest.with_name(dest.name + ".part")
+    try:
+        with open(source, "rb") as src, open(part_path, "wb") as dst:
+            dst.write(new_header)
+            dst.flush()
+            if hasher is not None:
+                hasher.update(new_header)
+            copy_range(src.fileno(), dst.fileno(), data_start, data_size, hasher)
+
+        if part_path.stat().st_size != len(new_header) + data_size:
+            raise IOError(f"Short write while copying {source.name}")
+        shutil.copystat(source, part_path)
+        os.replace(part_path, dest)
+    finally:
+        if part_path.exists():
+            part_path.unlink()
+
+    return len(new_header) + data_size
@@ -0,0 +1,144 @@
+import os
+import json
+import itertools
+from typing import Dict, List, Tuple
+
+try:
+    from .config import ScientificNotationEncoder, divide_by_batch_size, preset_folder_names, preset_paths, format_float
+    from .multidatabackend import MultiDataBackend, parse_value
+    from .userpromptlibrary import fill_prompts
+except ImportError:
+    from config import ScientificNotationEncoder, divide_by_batch_size, preset_folder_names, preset_paths, format_float
+    from multidatabackend import MultiDataBackend, parse_value
+    from userpromptlibrary import fill_prompts
+
+# Short names accepted on the command line; any `--option` works as is
+ALIASES = {
+    "lr": "--learning_rate",
+    "rank": "--lora_rank",
+    "alpha": "--lora_alpha",
+    "bs": "--train_batch_size",
+    "batch": "--train_batch_size",
+    "opt": "--optimizer",
+    "optimizer": "--optimizer",
+    "sched": "--lr_scheduler",
+    "steps": "--max_train_steps",
+    "warmup": "--lr_warmup_steps",
+}
+
+
+def parse_sweep_args(args: List[str]) -> Dict[str, List]:
+    """`lr=1e-4,5e-5 rank=16,32 --optimizer=adamw_bf16` -> option -> values."""
+    params = {}
+    for arg in args:
+        key, sep, values = arg.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Expected key=value[,value...], got {arg}")
+        key = ALIASES.get(key, key if key.startswith("--") else f"--{key}")
+        params[key] = [parse_value(value.strip()) for value in values.split(",") if value.strip()]
+    return params
+
+
+def expand(params: Dict[str, List], zipped: bool = False) -> List[Dict]:
+    """Every combination of the values (grid), or the i-th value of each (zip)."""
+    keys = list(params)
+    if zipped:
+        lengths = {len(values) for values in params.values()}
+        if len(lengths) > 1:
+            raise ValueError("--zip needs the same number of values for every parameter")
+        rows = zip(*params.values())
+    else:
+        rows = itertools.product(*params.values())
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class Sweep:
+    """Write one config folder per parameter combination, without prompts.
+
+    The scenario config, naming preset, prompt library and dataset backend
+    are read once and reused for every combination; only config.json
+    differs between the folders, so the work per config is three small
+    file writes.
+    """
+
+    def __init__(self, instance_prompt, instance_prompt_version, dataset_folder, config_folder, output_folder,
+                 sample_config_file_path, naming_preset_file, id_base, resolutions, sample_prompt_file_path):
+        self.instance_prompt = instance_prompt
+        self.instance_prompt_version = instance_prompt_version
+        self.config_folder = config_folder
+        self.output_folder = output_folder
+
+        for path in (dataset_folder, config_folder, output_folder, sample_config_file_path, sample_prompt_file_path):
+            if not os.path.exists(path):
+                raise ValueError(f"{path} does not exist")
+
+        with open(sample_config_file_path, "r", encoding="utf-8") as f:
+            self.sample_config = json.load(f)
+        self.naming = []
+        if naming_preset_file and os.path.exists(naming_preset_file):
+            with open(naming_preset_file, "r", encoding="utf-8") as f:
+                self.naming = json.load(f)
+
+        # Same dataset for every combination, so one backend and prompt library
+        mdb = MultiDataBackend()
+        mdb.dataset_folder = dataset_folder
+        mdb.id_base = id_base or "lora"
+        mdb.resolutions = resolutions or [512, 768, 1024]
+        mdb.scan_sub_folders()
+        self.backend = json.dumps(list(mdb.build_blocks().values()), indent=4)
+
+        with open(sample_prompt_file_path, "r", encoding="utf-8") as f:
+            prompts = json.load(f)
+        self.prompts = json.dumps(fill_prompts(prompts, "--instance_prompt", instance_prompt), indent=4)
+
+    def _config(self, params: Dict) -> Dict:
+        config = dict(self.sample_config)
+        config["--instance_prompt"] = self.instance_prompt
+        config["--tracker_project_name"] = self.instance_prompt
+        config.update(params)
+        if "--train_batch_size" in params:
+            # Same rule as the interactive editor; explicitly swept steps are kept
+            divided = divide_by_batch_size(self.sample_config, {}, params["--train_batch_size"])
+            config.update({key: value for key, value in divided.items() if key not in params})
+        return config
+
+    def plan(self, combinations: List[Dict]) -> List[Tuple[str, Dict]]:
+        """(config folder name, config) for every combination.
+
+        Names come from the naming preset. Swept options the preset does not
+        cover are appended, so combinations never share a folder.
+        """
+        swept = [key for key in (combinations[0] if combinations else {}) if key not in self.naming]
+        configs = [self._config(params) for params in combinations]
+        names = [preset_folder_names(self.instance_prompt, self.instance_prompt_version, config, self.naming)
+                 for config in configs]
+        if len(set(names)) < len(names) and swept:
+            names = [preset_folder_names(self.instance_prompt, self.instance_prompt_version, config,
+                                         list(self.naming) + swept) for config in configs]
+        if len(set(names)) < len(names):
+            raise ValueError("Sweep produces duplicate folder names; check the parameter values")
+
+        planned = []
+        for (folder_i, folder_v), config in zip(names, configs):
+            config.update(preset_paths(self.config_folder, self.output_folder, self.instance_prompt,
+                                       folder_i, folder_v))
+            planned.append((folder_i, config))
+        return planned
+
+    def write(self, planned: List[Tuple[str, Dict]]) -> List[str]:
+        folders = []
+        for folder_name, config in planned:
+            folder = f"{self.config_folder}/{folder_name}"
+            os.makedirs(folder, exist_ok=True)
+            with open(f"{folder}/config.json", "w", encoding="utf-8") as f:
+                f.write(json.dumps(config, indent=4, cls=ScientificNotationEncoder))
+            with open(f"{folder}/multidatabackend.json", "w", encoding="utf-8") as f:
+                f.write(self.backend)
+            with open(f"{folder}/user_prompt_library.json", "w", encoding="utf-8") as f:
+                f.write(self.prompts)
+            folders.append(folder)
+        return folders
+
+
+def describe(params: Dict) -> str:
+    return " ".join(f"{key.lstrip('-')}={format_float(value)}" for key, value in params.items())
@@ -0,0 +1,191 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .rclone import CACHE_DIR, state_lock, temp_path_for
+except ImportError:
+    from rclone import CACHE_DIR, state_lock, temp_path_for
+
+ADDED = "added"
+CHANGED = "changed"
+DELETED = "deleted"
+
+
+class SyncJournal:
+    """Local record of what changed under a folder since its last successful sync.
+
+    The journal keeps a (size, mtime) snapshot of every file as of the last
+    sync plus a list of pending changes. Pending changes come from tools
+    that write into the folder (`record`) and from a local stat walk
+    (`scan`), so a sync only has to push the listed paths instead of having
+    rclone list and compare both sides. There is one journal per folder and
+    remote, so syncing to one remote never hides changes from another.
+
+    Every change is applied to the journal file as stored, under its lock,
+    so tools and concurrent transfer jobs never overwrite each other's
+    records.
+    """
+
+    def __init__(self, root: Path, remote: str, journal_file: Optional[Path] = None):
+        self.root = Path(root)
+        self.remote = remote.rstrip("/")
+        if journal_file is None:
+            key = f"{self.root.resolve()}|{self.remote}"
+            slug = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            journal_file = CACHE_DIR / "journals" / f"{self.root.name}-{slug}.json"
+        self.journal_file = Path(journal_file)
+        self.snapshot: Dict[str, List[int]] = {}
+        self.pending: Dict[str, str] = {}
+        self.tracked: List[str] = []
+        # Changes noted by `record` and not yet written by `save`
+        self._recorded: List[Tuple[str, Optional[str]]] = []
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.snapshot = data.get("snapshot", {})
+        self.pending = data.get("pending", {})
+        self.tracked = data.get("tracked", [])
+
+    def _save(self) -> None:
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_path_for(self.journal_file)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"snapshot": self.snapshot, "pending": self.pending, "tracked": self.tracked}, f)
+        temp_path.replace(self.journal_file)
+
+    def _update(self, change: Callable[[], None]) -> None:
+        """Re-read the journal, apply `change` and write it back, all under the lock."""
+        with state_lock(self.journal_file):
+            self._load()
+            change()
+            self._save()
+
+    def save(self) -> None:
+        """Write the changes noted with `record`."""
+        recorded, self._recorded = self._recorded, []
+
+        def apply() -> None:
+            for rel, kind in recorded:
+                self._record(rel, kind)
+        self._update(apply)
+
+    @staticmethod
+    def _in_scope(rel: str, scope: str) -> bool:
+        return not scope or rel == scope or rel.startswith(scope.rstrip("/") + "/")
+
+    @staticmethod
+    def _trackable(name: str) -> bool:
+        # Hidden files and in-flight `.part` copies never get synced
+        return not name.startswith('.') and not name.endswith('.part')
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path)
+        return (path.relative_to(self.root) if path.is_absolute() else path).as_posix()
+
+    def is_tracked(self, scope: str) -> bool:
+        """True once `scope` (or a folder above it) has been fully synced."""
+        return any(self._in_scope(scope, tracked) for tracked in self.tracked)
+
+    def record(self, path: Path, kind: Optional[str] = None) -> None:
+        """Note a change made by a tool (written by `save`); the kind is inferred when omitted."""
+        rel = self._relative(path)
+        self._recorded.append((rel, kind))
+        self._record(rel, kind)
+
+    def _record(self, rel: str, kind: Optional[str]) -> None:
+        if kind is None:
+            if not (self.root / rel).exists():
+                kind = DELETED
+            else:
+                kind = CHANGED if rel in self.snapshot else ADDED
+        self.pending[rel] = kind
+
+    def scan(self, scopes: Iterable[str] = ("",)) -> Dict[str, str]:
+        """Compare the folder against the snapshot and record the differences."""
+        # The transfer worker may have marked queued pushes synced meanwhile,
+        # so the walk runs against the journal as stored
+        scopes = list(scopes)
+        self._update(lambda: self._scan(scopes))
+        return self.changes(scopes)
+
+    def _scan(self, scopes: Iterable[str]) -> None:
+        for scope in scopes:
+            scope_path = self.root / scope
+            seen = set()
+            if scope_path.is_dir():
+                for directory, dirs, files in os.walk(scope_path):
+                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                    for name in files:
+                        if not self._trackable(name):
+                            continue
+                        file_path = Path(directory) / name
+                        rel = file_path.relative_to(self.root).as_posix()
+                        seen.add(rel)
+                        stat = file_path.stat()
+                        known = self.snapshot.get(rel)
+                        if known is None:
+                            self.pending[rel] = ADDED
+                        elif known != [stat.st_size, stat.st_mtime_ns]:
+                            self.pending[rel] = CHANGED
+                        elif self.pending.get(rel) == DELETED:
+                            del self.pending[rel]
+
+            for rel in self.snapshot:
+                if self._in_scope(rel, scope) and rel not in seen:
+                    self.pending[rel] = DELETED
+            # Files added and removed again between syncs never reach the remote
+            for rel in [rel for rel in self.pending if self._in_scope(rel, scope)]:
+                if rel not in seen and rel not in self.snapshot:
+                    del self.pending[rel]
+
+    def changes(self, scopes: Iterable[str] = ("",)) -> Dict[str, str]:
+        """Pending changes inside any of `scopes`."""
+        scopes = list(scopes)
+        return {rel: kind for rel, kind in sorted(self.pending.items())
+                if any(self._in_scope(rel, scope) for scope in scopes)}
+
+    def mark_synced(self, rels: Iterable[str]) -> None:
+        """Fold pushed changes into the snapshot."""
+        rels = list(rels)
+        self._update(lambda: self._mark_synced(rels))
+
+    def _mark_synced(self, rels: List[str]) -> None:
+        for rel in rels:
+            file_path = self.root / rel
+            if file_path.is_file():
+                stat = file_path.stat()
+                self.snapshot[rel] = [stat.st_size, stat.st_mtime_ns]
+            else:
+                self.snapshot.pop(rel, None)
+            self.pending.pop(rel, None)
+
+    def mark_scopes_synced(self, scopes: Iterable[str]) -> None:
+        """Snapshot whole scopes after a full sync and start tracking them."""
+        scopes = list(scopes)
+        self._update(lambda: self._mark_scopes_synced(scopes))
+
+    def _mark_scopes_synced(self, scopes: List[str]) -> None:
+        for scope in scopes:
+            for rel in [rel for rel in self.snapshot if self._in_scope(rel, scope)]:
+                del self.snapshot[rel]
+            for rel in [rel for rel in self.pending if self._in_scope(rel, scope)]:
+                del self.pending[rel]
+            scope_path = self.root / scope
+            for directory, dirs, files in os.walk(scope_path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in files:
+                    if not self._trackable(name):
+                        continue
+                    file_path = Path(directory) / name
+                    stat = file_path.stat()
+                    self.snapshot[file_path.relative_to(self.root).as_posix()] = [stat.st_size, stat.st_mtime_ns]
+            if not self.is_tracked(scope):
+                self.tracked.append(scope)
@@ -0,0 +1,422 @@
+import os
+import re
+import sys
+import json
+import time
+import codecs
+import signal
+import subprocess
+from array import array
+from pathlib import Path
+from typing import Dict, IO, List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+try:
+    from .rclone import CACHE_DIR
+    from .transfer_queue import TransferQueue, format_age
+    from .train_profile import Profiler, PROFILE_FILE, backend_resolutions
+    from .lora_retention import format_bytes
+except ImportError:
+    from rclone import CACHE_DIR
+    from transfer_queue import TransferQueue, format_age
+    from train_profile import Profiler, PROFILE_FILE, backend_resolutions
+    from lora_retention import format_bytes
+
+RUNS_DIR = CACHE_DIR / "runs"
+METRICS_FILE = "metrics.npz"
+SUMMARY_FILE = "summary.json"
+LOG_FILE = "train.log"
+
+# Steps averaged for the final loss and the smoothed best loss
+LOSS_WINDOW = 50
+
+ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+# tqdm bar of the SimpleTuner trainer, e.g.
+# "Epoch 1/3, Steps:  10%|█  | 100/1000 [01:40<15:00,  1.00it/s, lr=0.0001, step_loss=0.0452]"
+# Only the bar labelled "Steps"; cache-building bars have their own labels
+PROGRESS = re.compile(r"Steps[^|]*\|[^|]*\|\s*(\d+)/(\d+)\s*\[([^\]]*)")
+ELAPSED = re.compile(r"^\s*(?:(\d+):)?(\d+):(\d+)<")
+RATE = re.compile(r"(" + NUMBER + r")\s*(it/s|s/it)")
+LOSS = re.compile(r"\b(?:step_loss|loss)=(" + NUMBER + r")")
+LR = re.compile(r"\blr=(" + NUMBER + r")")
+
+
+class LogParser:
+    """Turns the trainer's output stream into one row per optimizer step.
+
+    tqdm redraws its bar with carriage returns, several times per step; the
+    last line seen for a step wins. Rows are kept in typed arrays so long
+    runs stay small until they are written out.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.step = array("i")
+        self.loss = array("f")
+        self.lr = array("f")
+        self.it_s = array("f")
+        self.t = array("f")
+        self.total_steps = 0
+        self._partial = ""
+
+    def feed(self, text: str) -> None:
+        lines = re.split(r"[\r\n]", self._partial + text)
+        self._partial = lines.pop()
+        for line in lines:
+            self.parse_line(line)
+
+    def close(self) -> None:
+        if self._partial:
+            self.parse_line(self._partial)
+            self._partial = ""
+
+    def parse_line(self, line: str) -> None:
+        progress = PROGRESS.search(ANSI.sub("", line))
+        if not progress:
+            return
+        step = int(progress.group(1))
+        self.total_steps = int(progress.group(2))
+        stats = progress.group(3)
+
+        rate = RATE.search(stats)
+        it_s = 0.0
+        if rate:
+            value = float(rate.group(1))
+            it_s = value if rate.group(2) == "it/s" else (1 / value if value else 0.0)
+        # The bar's own elapsed time, so logs ingested after the fact keep their timing
+        elapsed = ELAPSED.search(stats)
+        if elapsed:
+            hours, minutes, seconds = (int(part or 0) for part in elapsed.groups())
+            t = hours * 3600 + minutes * 60 + seconds
+        else:
+            t = time.time() - self.started
+        loss = LOSS.search(stats)
+        lr = LR.search(stats)
+        values = (step, float(loss.group(1)) if loss else np.nan, float(lr.group(1)) if lr else np.nan, it_s, t)
+
+        columns = (self.step, self.loss, self.lr, self.it_s, self.t)
+        if self.step and self.step[-1] == step:
+            for column, value in zip(columns, values):
+                column[-1] = value
+        elif step:
+            for column, value in zip(columns, values):
+                column.append(value)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "step": np.frombuffer(self.step, dtype=np.int32),
+            "loss": np.frombuffer(self.loss, dtype=np.float32),
+            "lr": np.frombuffer(self.lr, dtype=np.float32),
+            "it_s": np.frombuffer(self.it_s, dtype=np.float32),
+            "t": np.frombuffer(self.t, dtype=np.float32),
+        }
+
+
+def summarize(metrics: Dict[str, np.ndarray]) -> Dict:
+    """Final/best smoothed loss, throughput and step counts of one run."""
+    loss = metrics["loss"][~np.isnan(metrics["loss"])]
+    it_s = metrics["it_s"][metrics["it_s"] > 0]
+    summary = {"steps": int(metrics["step"][-1]) if len(metrics["step"]) else 0,
+               "final_loss": None, "best_loss": None, "it_s": None, "final_lr": None,
+               "train_seconds": float(metrics["t"][-1]) if len(metrics["t"]) else None}
+    if len(loss):
+        window = min(LOSS_WINDOW, len(loss))
+        summary["final_loss"] = float(loss[-window:].mean())
+        summary["best_loss"] = float(np.convolve(loss, np.ones(window) / window, mode="valid").min())
+    if len(it_s):
+        summary["it_s"] = float(np.median(it_s))
+    lr = metrics["lr"][~np.isnan(metrics["lr"])]
+    if len(lr):
+        summary["final_lr"] = float(lr[-1])
+    return summary
+
+
+class Run:
+    """One training run: `runs/<id>/` with the raw log, the per-step
+    columns (`metrics.npz`) and a small `summary.json` that `easy runs`
+    reads instead of the log. Runs watched live also get a `profile.json`
+    with phase timings and host load (see `train_profile`)."""
+
+    def __init__(self, config: str, runs_dir: Path = RUNS_DIR, started: Optional[float] = None,
+                 config_dir: Optional[Path] = None, profiler: Optional[Profiler] = None):
+        self.config = config
+        self.config_dir = config_dir
+        self.profiler = profiler
+        self.started = started or time.time()
+        self.id = f"{TransferQueue.new_id(self.started)}-{config}"
+        self.path = Path(runs_dir) / self.id
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.parser = LogParser()
+
+    def _setup(self) -> Dict:
+        """What the run trained with, to compare throughput across setups."""
+        setup = {"resolutions": backend_resolutions(self.config_dir) if self.config_dir else [],
+                 "train_batch_size": None}
+        try:
+            with open(Path(self.config_dir) / "config.json", "r", encoding="utf-8") as f:
+                setup["train_batch_size"] = json.load(f).get("--train_batch_size")
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        return setup
+
+    @property
+    def log_path(self) -> Path:
+        return self.path / LOG_FILE
+
+    def save(self, returncode: Optional[int], extra: Optional[Dict] = None) -> Dict:
+        self.parser.close()
+        metrics = self.parser.arrays()
+        np.savez(self.path / METRICS_FILE, **metrics)
+        summary = {"id": self.id, "config": self.config, "started": self.started, "finished": time.time(),
+                   "returncode": returncode, "total_steps": self.parser.total_steps, **summarize(metrics),
+                   **self._setup(), "phases": None}
+        if self.profiler:
+            report = self.profiler.save(self.path)
+            summary["phases"] = {name: phase["seconds"] for name, phase in report["phases"].items()}
+        summary.update(extra or {})
+        temp_path = self.path / f".{SUMMARY_FILE}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        temp_path.replace(self.path / SUMMARY_FILE)
+        return summary
+
+
+def tee(command: List[str], config: str, cwd: Optional[str] = None, env: Optional[Dict] = None,
+        out: IO = None, runs_dir: Path = RUNS_DIR, config_dir: Optional[Path] = None) -> int:
+    """Run the trainer, passing its output through to `out` (the terminal)
+    while it is written to the run log, parsed into metrics and profiled."""
+    out = out or sys.stdout
+    run = Run(config, runs_dir, config_dir=config_dir, profiler=Profiler())
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    run.profiler.start()
+    # Chunks can end inside a multi-byte character (the bar's blocks)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    returncode = None
+    try:
+        with open(run.log_path, "wb") as log:
+            for chunk in iter(lambda: process.stdout.read1(65536), b""):
+                out.buffer.write(chunk)
+                out.flush()
+                log.write(chunk)
+                text = decoder.decode(chunk)
+                run.parser.feed(text)
+                run.profiler.feed(text)
+        returncode = process.wait()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the trainer too; keep what was parsed so far
+        process.send_signal(signal.SIGINT)
+        returncode = process.wait()
+        raise
+    finally:
+        run.save(returncode)
+    return returncode
+
+
+def ingest_log(log_path: Path, config: str, offset: int = 0, returncode: Optional[int] = None,
+               started: Optional[float] = None, runs_dir: Path = RUNS_DIR, config_dir: Optional[Path] = None,
+               profiler: Optional[Profiler] = None) -> Dict:
+    """Record a run from a log written without `tee` (the training queue),
+    starting at byte `offset`. Phase timings need the stream as it happened,
+    so they are only kept when a `profiler` watched the log live."""
+    run = Run(config, runs_dir, started, config_dir, profiler)
+    with open(log_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    run.log_path.write_bytes(data)
+    run.parser.feed(data.decode("utf-8", errors="replace"))
+    return run.save(returncode)
+
+
+def load_summaries(runs_dir: Path = RUNS_DIR) -> List[Dict]:
+    summaries = []
+    try:
+        entries = sorted(os.scandir(runs_dir), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return summaries
+    for entry in entries:
+        try:
+            with open(os.path.join(entry.path, SUMMARY_FILE), "r", encoding="utf-8") as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def load_metrics(run_id: str, runs_dir: Path = RUNS_DIR) -> Dict[str, np.ndarray]:
+    with np.load(Path(runs_dir) / run_id / METRICS_FILE) as data:
+        return {key: data[key] for key in data.files}
+
+
+SORT_KEYS = {
+    "date": lambda run: run["started"],
+    "loss": lambda run: run["final_loss"] if run["final_loss"] is not None else float("inf"),
+    "best": lambda run: run["best_loss"] if run["best_loss"] is not None else float("inf"),
+    "speed": lambda run: -(run["it_s"] or 0),
+    "steps": lambda run: -run["steps"],
+}
+
+
+def show_runs(runs: List[Dict], console: Optional[Console] = None) -> None:
+    console = console or Console()
+    table = Table(title=f"Training runs ({len(runs)})")
+    table.add_column("Run", style="yellow", no_wrap=True)
+    table.add_column("Config", style="magenta", overflow="fold")
+    table.add_column("Steps", justify="right")
+    table.add_column("Final loss", justify="right")
+    table.add_column("Best loss", justify="right")
+    table.add_column("it/s", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Exit", justify="right")
+
+    def number(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    for run in runs:
+        steps = f"{run['steps']}/{run['total_steps']}" if run["total_steps"] else str(run["steps"])
+        exit_code = run["returncode"]
+        table.add_row(
+            run["id"][:-len(run["config"]) - 1],
+            run["config"],
+            steps,
+            number(run["final_loss"], ".4f"),
+            number(run["best_loss"], ".4f"),
+            number(run["it_s"], ".2f"),
+            format_age(run["train_seconds"]),
+            "-" if exit_code is None else (f"[green]{exit_code}[/green]" if exit_code == 0 else f"[red]{exit_code}[/red]")
+        )
+    console.print(table)
+
+
+def load_profile(run_id: str, runs_dir: Path = RUNS_DIR) -> Optional[Dict]:
+    try:
+        with open(Path(runs_dir) / run_id / PROFILE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def show_profile(run: Dict, profile: Dict, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    resolutions = ",".join(str(value) for value in run.get("resolutions") or []) or "-"
+    table = Table(title=f"{run['id']} (resolutions {resolutions}, batch {run.get('train_batch_size') or '-'}, "
+                        f"{run['it_s'] or 0:.2f} it/s)")
+    table.add_column("Phase", style="magenta")
+    table.add_column("Time", justify="right")
+    table.add_column("Share", justify="right")
+    table.add_column("CPU %", justify="right")
+    table.add_column("iowait %", justify="right")
+    table.add_column("RAM peak", justify="right")
+    table.add_column("Read/s", justify="right")
+    table.add_column("Write/s", justify="right")
+
+    for name, phase in sorted(profile["phases"].items(), key=lambda item: -item[1]["seconds"]):
+        sampled = "cpu" in phase
+        table.add_row(
+            name,
+            format_age(phase["seconds"]),
+            f"{phase['share'] * 100:.0f}%",
+            f"{phase['cpu']:.0f}" if sampled else "-",
+            f"{phase['iowait']:.0f}" if sampled else "-",
+            format_bytes(phase["memory_peak"]) if sampled else "-",
+            format_bytes(phase["read_bps"]) if sampled else "-",
+            format_bytes(phase["write_bps"]) if sampled else "-",
+        )
+    console.print(table)
+
+
+def show_by_resolution(runs: List[Dict], console: Optional[Console] = None) -> None:
+    """Median throughput and cache/validation time per resolution set."""
+    console = console or Console()
+    groups: Dict[str, List[Dict]] = {}
+    for run in runs:
+        key = ",".join(str(value) for value in run.get("resolutions") or []) or "unknown"
+        groups.setdefault(key, []).append(run)
+
+    phases = ["vae_cache", "text_embeds", "validation", "training"]
+    table = Table(title="Throughput by resolution set (medians)")
+    table.add_column("Resolutions", style="magenta")
+    table.add_column("Runs", justify="right")
+    table.add_column("it/s", justify="right")
+    table.add_column("img/s", justify="right")
+    for phase in phases:
+        table.add_column(phase, justify="right")
+
+    def median(values):
+        values = [value for value in values if value is not None]
+        return float(np.median(values)) if values else None
+
+    for key, group in sorted(groups.items()):
+        it_s = median(run["it_s"] for run in group)
+        images = median(run["it_s"] * run["train_batch_size"] for run in group
+                        if run["it_s"] and isinstance(run.get("train_batch_size"), (int, float)))
+        row = [key, str(len(group)), "-" if it_s is None else f"{it_s:.2f}",
+               "-" if images is None else f"{images:.2f}"]
+        for phase in phases:
+            seconds = median((run.get("phases") or {}).get(phase) for run in group)
+            row.append(format_age(seconds))
+        table.add_row(*row)
+    console.print(table)
+
+
+def main(args: List[str]) -> None:
+    """`easy runs [pattern ...] [--sort date|loss|best|speed|steps] [--last N] [--by-resolution]`,
+    `easy runs profile <run id or config>` and `easy runs ingest <log> <config>`."""
+    console = Console()
+    if args and args[0] == "profile":
+        if len(args) < 2:
+            console.print("[red]Usage: easy runs profile <run id or config>[/red]")
+            return
+        # Latest run whose id or config matches
+        matches = [run for run in load_summaries() if run["id"].startswith(args[1]) or args[1] in run["config"]]
+        profile = load_profile(matches[-1]["id"]) if matches else None
+        if not profile:
+            console.print(f"[red]No profiled run matches {args[1]}[/red]")
+            return
+        show_profile(matches[-1], profile, console)
+        return
+    if args and args[0] == "ingest":
+        if len(args) < 3:
+            console.print("[red]Usage: easy runs ingest <log file> <config>[/red]")
+            return
+        summary = ingest_log(Path(args[1]), args[2])
+        console.print(f"[green]Recorded {summary['id']}: {summary['steps']} steps[/green]")
+        return
+
+    sort, last, by_resolution, patterns = "date", None, False, []
+    idx = 0
+    while idx < len(args):
+        if args[idx] == "--by-resolution":
+            by_resolution = True
+            idx += 1
+        elif args[idx] == "--sort" and idx + 1 < len(args):
+            sort = args[idx + 1]
+            idx += 2
+        elif args[idx] == "--last" and idx + 1 < len(args):
+            last = int(args[idx + 1])
+            idx += 2
+        else:
+            patterns.append(args[idx])
+            idx += 1
+    if sort not in SORT_KEYS:
+        console.print(f"[red]Unknown sort {sort}; use {', '.join(SORT_KEYS)}[/red]")
+        return
+
+    runs = [run for run in load_summaries() if not patterns or any(pattern in run["config"] for pattern in patterns)]
+    runs.sort(key=SORT_KEYS[sort])
+    if last:
+        runs = runs[-last:] if sort == "date" else runs[:last]
+    if not runs:
+        console.print("[yellow]No training runs recorded yet[/yellow]")
+        return
+    if by_resolution:
+        show_by_resolution(runs, console)
+    else:
+        show_runs(runs, console)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
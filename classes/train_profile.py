@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import time
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+PROFILE_FILE = "profile.json"
+SAMPLES_FILE = "samples.npz"
+SAMPLE_INTERVAL = 1.0
+SECTOR_SIZE = 512
+
+STARTUP = "startup"
+TRAINING = "training"
+# First match wins; the trainer's "Steps" bar is checked before the rest so
+# a resumed training phase is recognised as soon as the bar is redrawn
+PHASES: List[Tuple[str, re.Pattern]] = [
+    (TRAINING, re.compile(r"Steps[^|]*\|[^|]*\|\s*\d+/\d+")),
+    ("validation", re.compile(r"validation", re.I)),
+    ("text_embeds", re.compile(r"text.?embed|prompt embed|encoding prompts|processing prompts", re.I)),
+    ("vae_cache", re.compile(r"\bvae\b|latents?\b", re.I)),
+    ("dataset_scan", re.compile(r"aspect bucket|bucket|discover|metadata", re.I)),
+    ("model_load", re.compile(r"loading (the )?(model|pipeline|checkpoint|transformer|text encoder)|checkpoint shards",
+                              re.I)),
+]
+PHASE_NAMES = [STARTUP] + [name for name, _ in PHASES]
+
+
+def read_cpu() -> Optional[Tuple[int, int, int]]:
+    """(total, busy, iowait) jiffies over all CPUs from /proc/stat."""
+    try:
+        with open("/proc/stat", "r") as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle, iowait = fields[3], fields[4] if len(fields) > 4 else 0
+    total = sum(fields[:8])
+    return total, total - idle - iowait, iowait
+
+
+def read_memory() -> Optional[int]:
+    """Used RAM in bytes (MemTotal - MemAvailable)."""
+    try:
+        values = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                values[key] = int(rest.split()[0]) * 1024
+        return values["MemTotal"] - values["MemAvailable"]
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+
+
+def _whole_disks() -> List[str]:
+    try:
+        return [name for name in os.listdir("/sys/block")
+                if not name.startswith(("loop", "ram", "zram", "dm-", "md", "sr"))]
+    except OSError:
+        return []
+
+
+def read_disk(disks: List[str]) -> Optional[Tuple[int, int]]:
+    """(read, written) bytes on whole disks since boot, from /proc/diskstats."""
+    wanted = set(disks)
+    read = written = 0
+    try:
+        with open("/proc/diskstats", "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 9 and fields[2] in wanted:
+                    read += int(fields[5]) * SECTOR_SIZE
+                    written += int(fields[9]) * SECTOR_SIZE
+    except (OSError, ValueError):
+        return None
+    return read, written
+
+
+def backend_resolutions(config_dir: Path) -> List[int]:
+    """Resolutions of the enabled image datasets in multidatabackend.json."""
+    try:
+        with open(Path(config_dir) / "multidatabackend.json", "r", encoding="utf-8") as f:
+            blocks = json.load(f)
+    except (OSError, ValueError):
+        return []
+    resolutions = set()
+    for block in blocks if isinstance(blocks, list) else []:
+        if isinstance(block, dict) and block.get("dataset_type", "image") == "image" and not block.get("disabled"):
+            try:
+                resolutions.add(int(float(block.get("resolution"))))
+            except (TypeError, ValueError):
+                continue
+    return sorted(resolutions)
+
+
+class Profiler:
+    """Wall-clock phase timings from the trainer output plus host samples.
+
+    Lines of the output stream move the run between phases (model load,
+    dataset scan, VAE and text embed caches, training, validation); a phase
+    lasts until a line of another phase arrives. A thread samples host CPU,
+    iowait, RAM and disk throughput from /proc every `interval` seconds and
+    tags each sample with the current phase. Without /proc only the phase
+    timings are kept.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.phase = STARTUP
+        self.transitions: List[Tuple[float, str]] = []
+        self.t = array("f")
+        self.cpu = array("f")
+        self.iowait = array("f")
+        self.memory = array("d")
+        self.read_bps = array("f")
+        self.write_bps = array("f")
+        self.phase_idx = array("b")
+        self._partial = ""
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started = time.time()
+        self.transitions = [(0.0, STARTUP)]
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self.finished is None:
+            self.finished = time.time()
+            self._stop.set()
+            if self._thread:
+                self._thread.join()
+
+    def feed(self, text: str) -> None:
+        lines = re.split(r"[\r\n]", self._partial + text)
+        self._partial = lines.pop()
+        now = time.time()
+        for line in lines:
+            self.mark(line, now)
+
+    def mark(self, line: str, now: float) -> None:
+        for name, pattern in PHASES:
+            if pattern.search(line):
+                if name != self.phase:
+                    self.phase = name
+                    self.transitions.append((now - self.started, name))
+                return
+
+    def _sample_loop(self) -> None:
+        disks = _whole_disks()
+        last_cpu, last_disk, last_time = read_cpu(), read_disk(disks), time.time()
+        if last_cpu is None:
+            return
+        while not self._stop.wait(self.interval):
+            cpu, disk, now = read_cpu(), read_disk(disks), time.time()
+            if cpu is None:
+                return
+            elapsed = max(now - last_time, 1e-6)
+            total = max(cpu[0] - last_cpu[0], 1)
+            self.t.append(now - self.started)
+            self.cpu.append(100.0 * (cpu[1] - last_cpu[1]) / total)
+            self.iowait.append(100.0 * (cpu[2] - last_cpu[2]) / total)
+            self.memory.append(read_memory() or 0)
+            if disk and last_disk:
+                self.read_bps.append((disk[0] - last_disk[0]) / elapsed)
+                self.write_bps.append((disk[1] - last_disk[1]) / elapsed)
+            else:
+                self.read_bps.append(0.0)
+                self.write_bps.append(0.0)
+            self.phase_idx.append(PHASE_NAMES.index(self.phase))
+            last_cpu, last_disk, last_time = cpu, disk, now
+
+    def phase_seconds(self) -> Dict[str, float]:
+        end = (self.finished or time.time()) - self.started
+        seconds: Dict[str, float] = {}
+        for (begin, name), (until, _) in zip(self.transitions, self.transitions[1:] + [(end, None)]):
+            seconds[name] = seconds.get(name, 0.0) + max(until - begin, 0.0)
+        return seconds
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "t": np.frombuffer(self.t, dtype=np.float32),
+            "cpu": np.frombuffer(self.cpu, dtype=np.float32),
+            "iowait": np.frombuffer(self.iowait, dtype=np.float32),
+            "memory": np.frombuffer(self.memory, dtype=np.float64),
+            "read_bps": np.frombuffer(self.read_bps, dtype=np.float32),
+            "write_bps": np.frombuffer(self.write_bps, dtype=np.float32),
+            "phase": np.frombuffer(self.phase_idx, dtype=np.int8),
+        }
+
+    def report(self) -> Dict:
+        """Seconds, share of the run and host load per phase."""
+        samples = self.arrays()
+        seconds = self.phase_seconds()
+        total = sum(seconds.values()) or 1.0
+        phases = {}
+        for name, spent in seconds.items():
+            mask = samples["phase"] == PHASE_NAMES.index(name)
+            phase = {"seconds": round(spent, 1), "share": round(spent / total, 3), "samples": int(mask.sum())}
+            if mask.any():
+                phase.update(
+                    cpu=round(float(samples["cpu"][mask].mean()), 1),
+                    iowait=round(float(samples["iowait"][mask].mean()), 1),
+                    memory_peak=int(samples["memory"][mask].max()),
+                    read_bps=round(float(samples["read_bps"][mask].mean())),
+                    write_bps=round(float(samples["write_bps"][mask].mean())),
+                )
+            phases[name] = phase
+        return {"seconds": round(total, 1), "transitions": self.transitions, "phases": phases}
+
+    def save(self, path: Path) -> Dict:
+        self.stop()
+        report = self.report()
+        np.savez(Path(path) / SAMPLES_FILE, **self.arrays())
+        with open(Path(path) / PROFILE_FILE, "w", encoding="utf-8") as f:
+            json.dump({**report, "phase_names": PHASE_NAMES}, f, indent=2)
+        return report
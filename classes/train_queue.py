@@ -0,0 +1,425 @@
+import os
+import sys
+import json
+import time
+import codecs
+import signal
+import threading
+import traceback
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+from rich.console import Console
+from rich.table import Table
+
+try:
+    from .rclone import CACHE_DIR
+    from .transfer_queue import TransferQueue, format_age, QUEUED, RUNNING, DONE, FAILED, CANCELLED, IDLE_TIMEOUT
+    from .train_log import ingest_log
+    from .train_profile import Profiler, SAMPLE_INTERVAL
+except ImportError:
+    from rclone import CACHE_DIR
+    from transfer_queue import TransferQueue, format_age, QUEUED, RUNNING, DONE, FAILED, CANCELLED, IDLE_TIMEOUT
+    from train_log import ingest_log
+    from train_profile import Profiler, SAMPLE_INTERVAL
+
+TRAIN_QUEUE_DIR = CACHE_DIR / "training"
+EASY_DIR = Path(__file__).resolve().parent.parent
+
+# devices: comma separated GPU ids ("" = detect); gpus_per_job: 0 = all of
+# them, i.e. one job at a time; max_attempts: starts per job before a crash
+# loop is marked failed
+DEFAULT_TRAIN_SETTINGS = {"devices": "", "gpus_per_job": 0, "post_process": True, "max_attempts": 3}
+
+
+def detect_devices() -> List[str]:
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if visible is not None:
+        return [device.strip() for device in visible.split(",") if device.strip()]
+    try:
+        result = subprocess.run(["nvidia-smi", "--query-gpu=index", "--format=csv,noheader"],
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return []
+    if result.returncode != 0:
+        return []
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TrainQueue(TransferQueue):
+    """Training runs queued on disk and run by a detached scheduler.
+
+    Same state folders and locking as the transfer queue. A job is a config
+    folder plus the SimpleTuner path it trains with; the scheduler hands
+    each job a slice of the GPUs, so several jobs can share a pod.
+    """
+
+    default_dir = TRAIN_QUEUE_DIR
+    default_settings = DEFAULT_TRAIN_SETTINGS
+    worker_script = Path(__file__).resolve()
+
+    def enqueue_config(self, config: str, simple_tuner_path: str, post_process: Optional[bool] = None) -> str:
+        now = time.time()
+        job_id = self.new_id(now)
+        job = {
+            "id": job_id,
+            "config": config,
+            "simple_tuner_path": simple_tuner_path,
+            "post_process": self.settings()["post_process"] if post_process is None else post_process,
+            "status": QUEUED,
+            "created": now,
+            "started": None,
+            "finished": None,
+            "attempts": 0,
+            "devices": [],
+            "pid": None,
+            "returncode": None,
+            "run": None,
+            "post_status": None,
+            "error": None,
+        }
+        self._write(self._job_path(QUEUED, job_id), job)
+        self.ensure_worker()
+        return job_id
+
+    def finish(self, job: Dict, ok: bool, error: Optional[str] = None) -> None:
+        # A running job stopped with `easy train --cancel` ends up cancelled, not failed
+        marker = self.queue_dir / "cancel" / job["id"]
+        if not ok and marker.exists():
+            job["status"] = CANCELLED
+        else:
+            job["status"] = DONE if ok else FAILED
+        marker.unlink(missing_ok=True)
+        job["finished"] = time.time()
+        job["error"] = error
+        self._write(self._job_path(job["status"], job["id"]), job)
+        self._job_path(RUNNING, job["id"]).unlink(missing_ok=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or stop a running one."""
+        if super().cancel(job_id):
+            return True
+        try:
+            with open(self._job_path(RUNNING, job_id), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return False
+        (self.queue_dir / "cancel").mkdir(exist_ok=True)
+        (self.queue_dir / "cancel" / job_id).touch()
+        if pid_alive(job.get("pid")):
+            # Training runs in its own session; stop the whole process group
+            os.killpg(job["pid"], signal.SIGTERM)
+        return True
+
+    def retry(self, job_id: str) -> bool:
+        """Queue a failed or cancelled job again; training resumes from its last checkpoint."""
+        for state in (FAILED, CANCELLED):
+            path = self._job_path(state, job_id)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            job.update(status=QUEUED, attempts=0, finished=None, returncode=None, pid=None, error=None)
+            self._write(self._job_path(QUEUED, job_id), job)
+            path.unlink()
+            self.ensure_worker()
+            return True
+        return False
+
+
+class TrainScheduler:
+    def __init__(self, queue: TrainQueue, idle_timeout: float = IDLE_TIMEOUT):
+        self.queue = queue
+        self.idle_timeout = idle_timeout
+        self.allocated: Dict[str, List[str]] = {}
+        # Jobs whose trainer outlived a previous scheduler, by job id
+        self.orphans: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def slots(self, settings: Dict) -> List[List[str]]:
+        """Device groups a job can get, e.g. [["0", "1"], ["2", "3"]]."""
+        devices = [d.strip() for d in str(settings["devices"]).split(",") if d.strip()] or detect_devices()
+        per_job = int(settings["gpus_per_job"])
+        if not devices:
+            # No GPUs visible (or none detected): one job at a time, device choice left to SimpleTuner
+            return [[]]
+        if per_job <= 0 or per_job >= len(devices):
+            return [devices]
+        return [devices[i:i + per_job] for i in range(0, len(devices) - per_job + 1, per_job)]
+
+    def free_slot(self, slots: List[List[str]]) -> Optional[List[str]]:
+        with self.lock:
+            busy = {device for devices in self.allocated.values() for device in devices}
+            in_use = len(self.allocated)
+        if not slots[0]:
+            return [] if in_use == 0 else None
+        for slot in slots:
+            if not busy.intersection(slot):
+                return slot
+        return None
+
+    def release(self, job_id: str) -> None:
+        with self.lock:
+            self.allocated.pop(job_id, None)
+
+    def train(self, job: Dict, devices: List[str], log, profiler: Optional[Profiler] = None) -> int:
+        env = dict(os.environ)
+        if devices:
+            env["CUDA_VISIBLE_DEVICES"] = ",".join(devices)
+        offset = log.tell()
+        process = subprocess.Popen(
+            ["bash", str(EASY_DIR / "train.sh"), job["simple_tuner_path"], job["config"]],
+            cwd=str(EASY_DIR),
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+        job["pid"] = process.pid
+        self.queue.update(job)
+        if (self.queue.queue_dir / "cancel" / job["id"]).exists():
+            # Cancelled between being claimed and starting
+            os.killpg(process.pid, signal.SIGTERM)
+        if profiler is None:
+            return process.wait()
+
+        # The trainer writes to the log itself; follow it for phase timings
+        profiler.start()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(log.name, "rb") as follow:
+            follow.seek(offset)
+            while True:
+                try:
+                    returncode = process.wait(timeout=SAMPLE_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    profiler.feed(decoder.decode(follow.read()))
+            profiler.feed(decoder.decode(follow.read()))
+        profiler.stop()
+        return returncode
+
+    def post_process(self, job: Dict, log) -> bool:
+        # Uploads go to the transfer queue so the next run is not held up
+        result = subprocess.run(
+            [sys.executable, str(EASY_DIR / "easy.py"), "pp", "--background", job["config"]],
+            cwd=str(EASY_DIR),
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+        return result.returncode == 0
+
+    def execute(self, job: Dict, devices: List[str]) -> None:
+        ok, error = False, None
+        with open(self.queue.log_path(job["id"]), "a", encoding="utf-8") as log:
+            log.write(f"=== attempt {job['attempts']} on devices {','.join(devices) or 'default'} ===\n")
+            log.flush()
+            offset, started = log.tell(), time.time()
+            profiler = Profiler()
+            try:
+                job["returncode"] = self.train(job, devices, log, profiler)
+                ok = job["returncode"] == 0
+                error = None if ok else f"train.sh exited with code {job['returncode']}"
+            except Exception as e:
+                traceback.print_exc(file=log)
+                error = str(e)
+            finally:
+                self.release(job["id"])
+
+            try:
+                # The trainer wrote straight to the job log, so it is parsed once here
+                job["run"] = ingest_log(self.queue.log_path(job["id"]), job["config"], offset,
+                                        job.get("returncode"), started,
+                                        config_dir=Path(job["simple_tuner_path"]) / "config" / job["config"],
+                                        profiler=profiler if profiler.started else None)["id"]
+            except Exception:
+                traceback.print_exc(file=log)
+
+            job["pid"] = None
+            if ok and job.get("post_process"):
+                job["post_status"] = RUNNING
+            self.queue.finish(job, ok, error)
+
+            if ok and job.get("post_process"):
+                log.write("=== post-processing ===\n")
+                log.flush()
+                try:
+                    job["post_status"] = DONE if self.post_process(job, log) else FAILED
+                except Exception:
+                    traceback.print_exc(file=log)
+                    job["post_status"] = FAILED
+                self.queue._write(self.queue._job_path(job["status"], job["id"]), job)
+
+    def recover(self, max_attempts: int) -> None:
+        """Requeue jobs left running by a scheduler that died.
+
+        A training process that outlived its scheduler keeps its devices
+        marked busy, so it never shares GPUs with its own restart, while
+        other jobs start on the free ones. The job is requeued once that
+        process exits (see `reap_orphans`); the restarted run resumes from
+        the latest checkpoint.
+        """
+        for job in self.queue.jobs([RUNNING]):
+            if pid_alive(job.get("pid")):
+                self.orphans[job["id"]] = job
+                with self.lock:
+                    self.allocated[job["id"]] = job.get("devices") or []
+            else:
+                self.requeue(job, max_attempts)
+
+    def reap_orphans(self, max_attempts: int) -> None:
+        for job_id, job in list(self.orphans.items()):
+            if not pid_alive(job.get("pid")):
+                del self.orphans[job_id]
+                self.release(job_id)
+                self.requeue(job, max_attempts)
+
+    def requeue(self, job: Dict, max_attempts: int) -> None:
+        path = self.queue._job_path(RUNNING, job["id"])
+        if (self.queue.queue_dir / "cancel" / job["id"]).exists():
+            # Stopped with `easy train --cancel` while orphaned
+            self.queue.finish(job, False)
+            return
+        if job["attempts"] >= max_attempts:
+            self.queue.finish(job, False, f"Gave up after {job['attempts']} attempts")
+            return
+        job.update(status=QUEUED, pid=None)
+        self.queue._write(self.queue._job_path(QUEUED, job["id"]), job)
+        path.unlink(missing_ok=True)
+
+    def run(self) -> None:
+        lock = self.queue._try_lock()
+        if lock is None:
+            return
+
+        self.recover(int(self.queue.settings()["max_attempts"]))
+
+        threads: Dict[str, threading.Thread] = {}
+        idle_since = time.time()
+        while True:
+            # Settings are re-read every pass so `easy train --set` applies to the next job
+            settings = self.queue.settings()
+            slots = self.slots(settings)
+            self.reap_orphans(int(settings["max_attempts"]))
+
+            for job_id in [job_id for job_id, thread in threads.items() if not thread.is_alive()]:
+                del threads[job_id]
+
+            while True:
+                devices = self.free_slot(slots)
+                if devices is None:
+                    break
+                job = self.queue.claim()
+                if job is None:
+                    break
+                job["attempts"] += 1
+                job["devices"] = devices
+                self.queue.update(job)
+                with self.lock:
+                    self.allocated[job["id"]] = devices
+                thread = threading.Thread(target=self.execute, args=(job, devices), daemon=True)
+                thread.start()
+                threads[job["id"]] = thread
+
+            if threads or self.orphans:
+                idle_since = time.time()
+            elif time.time() - idle_since > self.idle_timeout:
+                lock.close()
+                if not self.queue.has_queued():
+                    return
+                lock = self.queue._try_lock()
+                if lock is None:
+                    return
+                idle_since = time.time()
+            time.sleep(1)
+
+
+def show_jobs(queue: TrainQueue, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    settings = queue.settings()
+    table = Table(title=f"Training queue (devices {settings['devices'] or 'auto'}, "
+                        f"gpus/job {settings['gpus_per_job'] or 'all'}, "
+                        f"scheduler {'running' if queue.worker_running() else 'stopped'})")
+    table.add_column("Job", style="yellow")
+    table.add_column("Config", style="magenta", overflow="fold")
+    table.add_column("Status")
+    table.add_column("GPUs")
+    table.add_column("Try", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Post", justify="right")
+    table.add_column("Error", style="red", overflow="fold")
+
+    colors = {QUEUED: "cyan", RUNNING: "yellow", DONE: "green", FAILED: "red", CANCELLED: "dim"}
+    now = time.time()
+    for job in queue.jobs():
+        if job["status"] == QUEUED:
+            elapsed = now - job["created"]
+        elif job["started"]:
+            elapsed = (job["finished"] or now) - job["started"]
+        else:
+            elapsed = None
+        table.add_row(
+            job["id"],
+            job["config"],
+            f"[{colors[job['status']]}]{job['status']}[/{colors[job['status']]}]",
+            ",".join(job["devices"]) or "-",
+            str(job["attempts"]),
+            format_age(elapsed),
+            job["post_status"] or ("-" if job["post_process"] else "off"),
+            (job["error"] or "").strip()
+        )
+    console.print(table)
+
+
+def main(args: List[str]) -> None:
+    """`easy train --queue|--cancel <id>|--retry <id>|--log <id>|--clear|--set <key> <value>`"""
+    console = Console()
+    queue = TrainQueue()
+    action = args[0] if args else "--queue"
+
+    if action == "--queue":
+        show_jobs(queue, console)
+    elif action == "--cancel" and len(args) > 1:
+        if queue.cancel(args[1]):
+            console.print(f"[green]Cancelled {args[1]}[/green]")
+        else:
+            console.print(f"[red]{args[1]} is not queued or running[/red]")
+    elif action == "--retry" and len(args) > 1:
+        if queue.retry(args[1]):
+            console.print(f"[green]Requeued {args[1]}[/green]")
+        else:
+            console.print(f"[red]{args[1]} has not failed or been cancelled[/red]")
+    elif action == "--clear":
+        console.print(f"[green]Removed {queue.clear()} finished job(s)[/green]")
+    elif action == "--log" and len(args) > 1:
+        log_path = queue.log_path(args[1])
+        if log_path.exists():
+            console.print(log_path.read_text(encoding="utf-8", errors="replace"), markup=False, highlight=False)
+        else:
+            console.print(f"[red]No log for {args[1]}[/red]")
+    elif action == "--set" and len(args) > 2:
+        queue.set_setting(args[1], args[2])
+        console.print(f"[green]{args[1]} set to {args[2]}[/green]")
+    elif action == "worker":
+        TrainScheduler(queue).run()
+    else:
+        console.print("[red]Usage: easy train --queue|--cancel <id>|--retry <id>|--log <id>|--clear|"
+                      "--set devices|gpus_per_job|post_process|max_attempts <value>[/red]")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
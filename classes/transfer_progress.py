@@ -0,0 +1,87 @@
+from typing import Dict, Optional
+from rich.console import Console
+from rich.filesize import decimal
+from rich.progress import Progress, TextColumn, BarColumn, TaskProgressColumn
+
+
+def format_rate(speed: Optional[float]) -> str:
+    return f"{decimal(int(speed))}/s" if speed else "-"
+
+
+def format_eta(eta: Optional[float]) -> str:
+    if eta is None:
+        return "-"
+    eta = int(eta)
+    return f"{eta // 3600}:{eta % 3600 // 60:02d}:{eta % 60:02d}"
+
+
+class TransferProgress:
+    """Rich progress bars fed by rclone stats records.
+
+    One bar tracks the whole transfer and one bar per file in flight, each
+    showing bytes, rate and ETA as rclone reports them. Use the `line` and
+    `stats` methods as a store's `on_output` and `on_stats` callbacks.
+    """
+
+    def __init__(self, console: Console, description: str):
+        self.console = console
+        self.description = description
+        self.progress = Progress(
+            TextColumn("[bold blue]{task.description}"),
+            BarColumn(complete_style="green"),
+            TaskProgressColumn(),
+            TextColumn("{task.fields[size]}"),
+            TextColumn("[cyan]{task.fields[rate]}"),
+            TextColumn("[yellow]{task.fields[eta]}"),
+            console=console
+        )
+        self.files: Dict[str, int] = {}
+        self.overall = None
+
+    def __enter__(self) -> "TransferProgress":
+        self.progress.start()
+        self.overall = self.progress.add_task(self.description, total=None, size="", rate="-", eta="-")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for task in self.files.values():
+            self.progress.remove_task(task)
+        self.files.clear()
+        self.progress.stop()
+
+    def line(self, line: str) -> None:
+        """Show warnings and errors above the bars; routine INFO lines stay quiet."""
+        line = line.strip()
+        if line and not line.startswith(("INFO", "DEBUG")):
+            self.progress.console.print(line, markup=False, highlight=False)
+
+    def stats(self, stats: Dict) -> None:
+        total = stats.get("totalBytes") or None
+        done = stats.get("bytes", 0)
+        self.progress.update(
+            self.overall,
+            completed=done,
+            total=total,
+            size=f"{decimal(done)}/{decimal(total)}" if total else decimal(done),
+            rate=format_rate(stats.get("speed")),
+            eta=format_eta(stats.get("eta"))
+        )
+
+        active = set()
+        for item in stats.get("transferring") or []:
+            name = item["name"]
+            active.add(name)
+            if name not in self.files:
+                self.files[name] = self.progress.add_task(f"  {name}", total=item.get("size") or None,
+                                                          size="", rate="-", eta="-")
+            size = item.get("size") or 0
+            self.progress.update(
+                self.files[name],
+                completed=item.get("bytes", 0),
+                total=size or None,
+                size=f"{decimal(item.get('bytes', 0))}/{decimal(size)}",
+                rate=format_rate(item.get("speedAvg") or item.get("speed")),
+                eta=format_eta(item.get("eta"))
+            )
+        for name in [name for name in self.files if name not in active]:
+            self.progress.remove_task(self.files.pop(name))
@@ -0,0 +1,505 @@
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import shutil
+import uuid
+import threading
+import traceback
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+from rich.console import Console
+from rich.filesize import decimal
+from rich.prompt import Prompt
+from rich.table import Table
+
+try:
+    from .rclone import CACHE_DIR, METRICS_FILE, RemoteListingCache, write_manifest, copied_name, rcd_pid
+    from .remote_store import get_store, RcdStore, RcloneStore
+    from .sync_journal import SyncJournal
+    from .upload_state import UploadState
+except ImportError:
+    from rclone import CACHE_DIR, METRICS_FILE, RemoteListingCache, write_manifest, copied_name, rcd_pid
+    from remote_store import get_store, RcdStore, RcloneStore
+    from sync_journal import SyncJournal
+    from upload_state import UploadState
+
+QUEUE_DIR = CACHE_DIR / "transfers"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATES = (QUEUED, RUNNING, DONE, FAILED, CANCELLED)
+
+DEFAULT_SETTINGS = {"concurrency": 2, "bwlimit": ""}
+IDLE_TIMEOUT = 60
+
+
+def split_bwlimit(limit: str, parts: int) -> str:
+    """Share an rclone `--bwlimit` value between `parts` concurrent jobs.
+
+    Plain rates like `40M` are divided; timetables and other forms are
+    passed through unchanged.
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([BKMGT]?)", limit.strip(), re.IGNORECASE)
+    if not match or parts <= 1:
+        return limit
+    units = "BKMGT"
+    unit = match.group(2).upper() or "K"
+    kib = float(match.group(1)) * 1024 ** (units.index(unit) - 1)
+    return f"{max(kib / parts, 1):.0f}K"
+
+
+class TransferQueue:
+    """File-based queue of remote transfer jobs shared by every sync tool.
+
+    Each job is a JSON file in a folder named after its state; moving a file
+    between folders is atomic, so the worker claiming a job and a user
+    cancelling it can never both win. A detached worker process runs the
+    jobs and keeps going after the tool that queued them exits.
+    """
+
+    default_dir = QUEUE_DIR
+    default_settings = DEFAULT_SETTINGS
+    # Script started (with `worker`) to run the jobs
+    worker_script = Path(__file__).resolve()
+
+    def __init__(self, queue_dir: Optional[Path] = None):
+        self.queue_dir = Path(queue_dir) if queue_dir else self.default_dir
+        self.settings_file = self.queue_dir / "settings.json"
+        self.lock_file = self.queue_dir / "worker.lock"
+        for state in STATES:
+            (self.queue_dir / state).mkdir(parents=True, exist_ok=True)
+        (self.queue_dir / "logs").mkdir(exist_ok=True)
+
+    def _job_path(self, state: str, job_id: str) -> Path:
+        return self.queue_dir / state / f"{job_id}.json"
+
+    def log_path(self, job_id: str) -> Path:
+        return self.queue_dir / "logs" / f"{job_id}.log"
+
+    def _write(self, path: Path, data: Dict) -> None:
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        temp_path.replace(path)
+
+    def settings(self) -> Dict:
+        try:
+            with open(self.settings_file, "r", encoding="utf-8") as f:
+                return {**self.default_settings, **json.load(f)}
+        except (OSError, ValueError):
+            return dict(self.default_settings)
+
+    def set_setting(self, key: str, value) -> None:
+        if key not in self.default_settings:
+            raise ValueError(f"Unknown setting: {key}")
+        settings = self.settings()
+        default = self.default_settings[key]
+        if isinstance(default, bool):
+            value = str(value).lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            value = int(value)
+        settings[key] = value
+        self._write(self.settings_file, settings)
+
+    def enqueue(self, tool: str, label: str, kind: str, **spec) -> str:
+        """Queue a `copy`, `sync` or `delete` job and make sure a worker runs it.
+
+        `spec` holds the store call arguments (source, remote, names, include,
+        checksum, ignore_existing, flags) plus optional follow-ups the worker
+        applies on success: `journal` ({"root", "remote", "rels"|"scopes"}),
+        `upload_state` ({"source", "remote", "rels"}, also confirmed file by
+        file as copies finish), `invalidate` (remote prefixes whose cached
+        listings become stale) and `cleanup` (local staging folders to
+        delete).
+        """
+        now = time.time()
+        job_id = self.new_id(now)
+        job = {
+            "id": job_id,
+            "tool": tool,
+            "label": label,
+            "kind": kind,
+            "store": spec.pop("store", None) or os.environ.get("EASY_REMOTE"),
+            "status": QUEUED,
+            "created": now,
+            "started": None,
+            "finished": None,
+            "transferred": 0,
+            "bytes": 0,
+            "total_bytes": None,
+            "rate": None,
+            "error": None,
+            **spec,
+        }
+        self._write(self._job_path(QUEUED, job_id), job)
+        self.ensure_worker()
+        return job_id
+
+    @staticmethod
+    def new_id(now: float) -> str:
+        # Ids sort in submission order, which is the order the worker claims them
+        return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1e6) % 1000000:06d}{uuid.uuid4().hex[:2]}"
+
+    def jobs(self, states=STATES) -> List[Dict]:
+        jobs = []
+        for state in states:
+            for path in (self.queue_dir / state).glob("*.json"):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        jobs.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(jobs, key=lambda job: job["created"])
+
+    def claim(self) -> Optional[Dict]:
+        """Move the oldest queued job to running and return it."""
+        for path in sorted((self.queue_dir / QUEUED).glob("*.json")):
+            target = self._job_path(RUNNING, path.stem)
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            with open(target, "r", encoding="utf-8") as f:
+                job = json.load(f)
+            job["status"] = RUNNING
+            job["started"] = time.time()
+            self._write(target, job)
+            return job
+        return None
+
+    def update(self, job: Dict) -> None:
+        self._write(self._job_path(RUNNING, job["id"]), job)
+
+    def finish(self, job: Dict, ok: bool, error: Optional[str] = None) -> None:
+        job["status"] = DONE if ok else FAILED
+        job["finished"] = time.time()
+        job["error"] = error
+        self._write(self._job_path(job["status"], job["id"]), job)
+        self._job_path(RUNNING, job["id"]).unlink(missing_ok=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        try:
+            os.rename(self._job_path(QUEUED, job_id), self._job_path(CANCELLED, job_id))
+        except FileNotFoundError:
+            return False
+        path = self._job_path(CANCELLED, job_id)
+        with open(path, "r", encoding="utf-8") as f:
+            job = json.load(f)
+        job["status"] = CANCELLED
+        job["finished"] = time.time()
+        self._write(path, job)
+        return True
+
+    def clear(self) -> int:
+        """Forget finished jobs and their logs; returns how many were removed."""
+        removed = 0
+        for state in (DONE, FAILED, CANCELLED):
+            for path in (self.queue_dir / state).glob("*.json"):
+                self.log_path(path.stem).unlink(missing_ok=True)
+                path.unlink()
+                removed += 1
+        return removed
+
+    def has_queued(self) -> bool:
+        return any((self.queue_dir / QUEUED).glob("*.json"))
+
+    def _try_lock(self):
+        handle = open(self.lock_file, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def worker_running(self) -> bool:
+        handle = self._try_lock()
+        if handle is None:
+            return True
+        handle.close()
+        return False
+
+    def ensure_worker(self) -> None:
+        """Start a detached worker unless one already holds the lock."""
+        if self.worker_running():
+            return
+        with open(self.queue_dir / "worker.log", "a") as worker_log:
+            subprocess.Popen(
+                [sys.executable, str(self.worker_script), "worker"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=worker_log,
+                start_new_session=True
+            )
+
+
+class TransferWorker:
+    def __init__(self, queue: TransferQueue, idle_timeout: float = IDLE_TIMEOUT):
+        self.queue = queue
+        self.idle_timeout = idle_timeout
+
+    def execute(self, job: Dict, bwlimit: str) -> None:
+        store = get_store(job["store"])
+        flags = list(job.get("flags", []))
+        bypass_rcd = False
+        if bwlimit:
+            flags += ["--bwlimit", bwlimit]
+            # The rc API has no per-job bandwidth limit, so a limited job runs
+            # its own rclone to get its share of the queue's bwlimit
+            bypass_rcd = isinstance(store, RcdStore)
+            if bypass_rcd:
+                store = RcloneStore(store.url)
+        last_save = time.time()
+        state_spec = job.get("upload_state")
+        state = UploadState(Path(state_spec["source"]), state_spec["remote"]) if state_spec else None
+
+        with open(self.queue.log_path(job["id"]), "a", encoding="utf-8") as log:
+            if bypass_rcd:
+                log.write(f"bwlimit {bwlimit}: running rclone directly instead of through the rcd daemon\n")
+
+            def on_output(line: str) -> None:
+                log.write(line + "\n")
+                if state and copied_name(line):
+                    state.confirm([copied_name(line)])
+                if "Copied" in line or "Deleted" in line:
+                    job["transferred"] += 1
+                    save_progress()
+
+            def on_stats(stats: Dict) -> None:
+                job["bytes"] = stats.get("bytes", 0)
+                job["total_bytes"] = stats.get("totalBytes")
+                job["rate"] = stats.get("speed")
+                save_progress()
+
+            def save_progress() -> None:
+                nonlocal last_save
+                if time.time() - last_save > 2:
+                    self.queue.update(job)
+                    last_save = time.time()
+
+            try:
+                ok = self._run_store_call(store, job, flags, on_output, on_stats)
+                error = None if ok else store.last_error
+                if ok:
+                    if state:
+                        state.confirm(state_spec["rels"])
+                    self._apply_followups(job)
+            except Exception as e:
+                traceback.print_exc(file=log)
+                ok, error = False, str(e)
+        self.queue.finish(job, ok, error)
+
+    @staticmethod
+    def _run_store_call(store, job: Dict, flags: List[str], on_output, on_stats) -> bool:
+        kind = job["kind"]
+        if kind == "delete":
+            return store.delete(job["remote"], job.get("names", []), on_output=on_output)
+        if kind == "sync":
+            return store.sync(Path(job["source"]), job["remote"], include=job.get("include"),
+                              flags=flags, on_output=on_output, on_stats=on_stats)
+        if kind != "copy":
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        manifest = write_manifest(job["names"]) if job.get("names") is not None else None
+        try:
+            return store.copy(Path(job["source"]), job["remote"], files_from=manifest,
+                              checksum=job.get("checksum", False),
+                              ignore_existing=job.get("ignore_existing", False),
+                              flags=flags, on_output=on_output, on_stats=on_stats)
+        finally:
+            if manifest:
+                manifest.unlink()
+
+    @staticmethod
+    def _apply_followups(job: Dict) -> None:
+        journal_spec = job.get("journal")
+        if journal_spec:
+            journal = SyncJournal(Path(journal_spec["root"]), journal_spec["remote"])
+            if "scopes" in journal_spec:
+                journal.mark_scopes_synced(journal_spec["scopes"])
+            else:
+                journal.mark_synced(journal_spec.get("rels", []))
+        if job.get("invalidate"):
+            cache = RemoteListingCache(get_store(job["store"]))
+            for prefix in job["invalidate"]:
+                cache.invalidate(prefix)
+        for path in job.get("cleanup", []):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def run(self) -> None:
+        lock = self.queue._try_lock()
+        if lock is None:
+            return
+
+        # Jobs left running by a worker that died are started over
+        for path in (self.queue.queue_dir / RUNNING).glob("*.json"):
+            os.rename(path, self.queue._job_path(QUEUED, path.stem))
+
+        threads: Dict[str, threading.Thread] = {}
+        idle_since = time.time()
+        while True:
+            # Settings are re-read every pass so `easy tq set` applies live
+            settings = self.queue.settings()
+            concurrency = max(1, int(settings["concurrency"]))
+            bwlimit = split_bwlimit(settings["bwlimit"], concurrency) if settings["bwlimit"] else ""
+
+            for job_id in [job_id for job_id, thread in threads.items() if not thread.is_alive()]:
+                del threads[job_id]
+
+            while len(threads) < concurrency:
+                job = self.queue.claim()
+                if job is None:
+                    break
+                thread = threading.Thread(target=self.execute, args=(job, bwlimit), daemon=True)
+                thread.start()
+                threads[job["id"]] = thread
+
+            if threads:
+                idle_since = time.time()
+            elif time.time() - idle_since > self.idle_timeout:
+                lock.close()
+                # A job queued while we were shutting down saw the lock held
+                # and did not start a worker, so pick it up ourselves
+                if not self.queue.has_queued():
+                    return
+                lock = self.queue._try_lock()
+                if lock is None:
+                    return
+                idle_since = time.time()
+            time.sleep(1)
+
+
+def ask_background() -> bool:
+    """Ask whether the upload should go to the background transfer queue."""
+    return Prompt.ask("Queue transfer in the background?", choices=["y", "n"], default="n") == "y"
+
+
+def format_age(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+def format_bytes_done(done: int, total: Optional[int]) -> str:
+    return f"{decimal(done)}/{decimal(total)}" if total else decimal(done)
+
+
+def show_metrics(console: Console, metrics_file: Path = METRICS_FILE) -> None:
+    """Average throughput per destination and `--transfers` setting."""
+    groups: Dict = {}
+    try:
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        records = []
+    for record in records:
+        if record.get("kind") != "run" or not record.get("bytes"):
+            continue
+        key = (record["destination"], record["transfers"])
+        group = groups.setdefault(key, {"runs": 0, "files": 0, "bytes": 0, "seconds": 0.0})
+        group["runs"] += 1
+        group["files"] += record["files"]
+        group["bytes"] += record["bytes"]
+        group["seconds"] += record["seconds"]
+
+    table = Table(title="Transfer throughput")
+    table.add_column("Destination", style="magenta", overflow="fold")
+    table.add_column("--transfers", justify="right")
+    table.add_column("Runs", justify="right")
+    table.add_column("Files", justify="right")
+    table.add_column("Bytes", justify="right")
+    table.add_column("Avg rate", justify="right", style="cyan")
+    for (destination, transfers), group in sorted(groups.items()):
+        table.add_row(destination, str(transfers), str(group["runs"]), str(group["files"]),
+                      decimal(group["bytes"]), f"{decimal(int(group['bytes'] / max(group['seconds'], 1e-3)))}/s")
+    console.print(table)
+
+
+def show_jobs(queue: TransferQueue, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    settings = queue.settings()
+    table = Table(title=f"Transfer queue (concurrency {settings['concurrency']}, "
+                        f"bwlimit {settings['bwlimit'] or 'none'}, "
+                        f"worker {'running' if queue.worker_running() else 'stopped'})")
+    table.add_column("Job", style="yellow")
+    table.add_column("Tool")
+    table.add_column("Target", style="magenta", overflow="fold")
+    table.add_column("Status")
+    table.add_column("Files", justify="right")
+    table.add_column("Bytes", justify="right")
+    table.add_column("Rate", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Error", style="red", overflow="fold")
+
+    colors = {QUEUED: "cyan", RUNNING: "yellow", DONE: "green", FAILED: "red", CANCELLED: "dim"}
+    now = time.time()
+    for job in queue.jobs():
+        if job["status"] == QUEUED:
+            elapsed = now - job["created"]
+        elif job["started"]:
+            elapsed = (job["finished"] or now) - job["started"]
+        else:
+            elapsed = None
+        table.add_row(
+            job["id"],
+            job["tool"],
+            job["label"],
+            f"[{colors[job['status']]}]{job['status']}[/{colors[job['status']]}]",
+            str(job["transferred"]),
+            format_bytes_done(job.get("bytes", 0), job.get("total_bytes")),
+            f"{decimal(int(job['rate']))}/s" if job.get("rate") and job["status"] == RUNNING else "-",
+            format_age(elapsed),
+            (job["error"] or "").strip()
+        )
+    console.print(table)
+
+
+def main(args: List[str]) -> None:
+    """`easy tq [list|cancel <id>|clear|log <id>|set <key> <value>|metrics|worker]`"""
+    console = Console()
+    queue = TransferQueue()
+    action = args[0] if args else "list"
+
+    if action == "list":
+        show_jobs(queue, console)
+    elif action == "cancel" and len(args) > 1:
+        if queue.cancel(args[1]):
+            console.print(f"[green]Cancelled {args[1]}[/green]")
+        else:
+            console.print(f"[red]{args[1]} is not waiting in the queue[/red]")
+    elif action == "clear":
+        console.print(f"[green]Removed {queue.clear()} finished job(s)[/green]")
+    elif action == "log" and len(args) > 1:
+        log_path = queue.log_path(args[1])
+        if log_path.exists():
+            console.print(log_path.read_text(encoding="utf-8"), markup=False, highlight=False)
+        else:
+            console.print(f"[red]No log for {args[1]}[/red]")
+    elif action == "set" and len(args) > 2:
+        queue.set_setting(args[1], args[2])
+        console.print(f"[green]{args[1]} set to {args[2]}[/green]")
+        if args[1] == "bwlimit" and args[2] and rcd_pid():
+            console.print("[yellow]Limited jobs run rclone directly; the rcd daemon cannot apply a per-job bwlimit[/yellow]")
+    elif action == "metrics":
+        show_metrics(console)
+    elif action == "worker":
+        TransferWorker(queue).run()
+    else:
+        console.print("[red]Usage: easy tq [list|cancel <id>|clear|log <id>|set concurrency|bwlimit <value>|metrics|worker][/red]")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
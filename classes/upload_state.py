@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .rclone import CACHE_DIR, state_lock, temp_path_for
+    from .checksums import content_hash, load_sidecar
+except ImportError:
+    from rclone import CACHE_DIR, state_lock, temp_path_for
+    from checksums import content_hash, load_sidecar
+
+
+class UploadState:
+    """Which files of a local folder are confirmed complete on a remote folder.
+
+    An entry records the local size, mtime and content hash of a file and
+    whether a copy with that size and hash is known to be on the remote.
+    Entries are confirmed one file at a time as uploads finish, so an
+    interrupted batch resumes with only the files that never made it, and
+    a remote file is only trusted once its size and hash match. Changes are
+    applied to the state file as stored, under its lock, so concurrent
+    transfer jobs on the same folder keep each other's confirmations.
+    """
+
+    def __init__(self, source: Path, remote: str, state_file: Optional[Path] = None):
+        self.source = Path(source)
+        self.remote = remote.rstrip("/")
+        if state_file is None:
+            key = f"{self.source.resolve()}|{self.remote}"
+            slug = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            state_file = CACHE_DIR / "uploads" / f"{self.source.name}-{slug}.json"
+        self.state_file = Path(state_file)
+        self.entries: Dict[str, Dict] = {}
+        self._sidecars: Dict[Path, Dict[str, Dict]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_path_for(self.state_file)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        temp_path.replace(self.state_file)
+
+    def _commit(self, updates: Dict[str, Dict]) -> None:
+        """Merge entries into the state file as it is on disk now."""
+        with state_lock(self.state_file):
+            self._load()
+            self.entries.update(updates)
+            self._save()
+
+    def _known_hash(self, path: Path, stat: os.stat_result) -> Optional[str]:
+        """Content hash the mover recorded in checksums.json, if the file is unchanged."""
+        if path.parent not in self._sidecars:
+            self._sidecars[path.parent] = load_sidecar(path.parent)
+        entry = self._sidecars[path.parent].get(path.name)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == int(stat.st_mtime):
+            return entry.get("content_hash")
+        return None
+
+    def _entry(self, rel: str) -> Dict:
+        """Entry for the file as it is now (a copy), re-hashing only when it changed."""
+        path = self.source / rel
+        stat = path.stat()
+        entry = self.entries.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return dict(entry)
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            # Checkpoints were hashed while the mover copied them; only other files are read
+            "hash": self._known_hash(path, stat) or content_hash(path),
+            "confirmed": None,
+        }
+
+    def unconfirmed(self, rels: Iterable[str]) -> List[str]:
+        """Files not yet confirmed on the remote in their current form."""
+        # A queued job may have confirmed files since this state was loaded
+        self._load()
+        pending = []
+        for rel in rels:
+            entry = self.entries.get(rel)
+            stat = (self.source / rel).stat()
+            if not (entry and entry["confirmed"] and entry["size"] == stat.st_size
+                    and entry["mtime"] == stat.st_mtime_ns):
+                pending.append(rel)
+        return pending
+
+    def confirm(self, rels: Iterable[str]) -> None:
+        updates = {}
+        for rel in rels:
+            if (self.source / rel).is_file():
+                updates[rel] = {**self._entry(rel), "confirmed": time.time()}
+        self._commit(updates)
+
+    def reconcile(self, rels: Iterable[str], remote_files: Dict[str, Dict]) -> List[str]:
+        """Confirm files whose remote copy matches; return the ones to upload.
+
+        `remote_files` is a `RemoteStore.file_info` result. A remote file with
+        a different size or hash (e.g. truncated by an interrupted upload) is
+        returned for re-upload rather than skipped.
+        """
+        uploads, updates = [], {}
+        for rel in rels:
+            entry = self._entry(rel)
+            remote = remote_files.get(rel)
+            if (remote and remote["size"] == entry["size"]
+                    and (remote["hash"] is None or remote["hash"] == entry["hash"])):
+                entry["confirmed"] = time.time()
+            else:
+                entry["confirmed"] = None
+                uploads.append(rel)
+            updates[rel] = entry
+        self._commit(updates)
+        return uploads
@@ -1,34 +1,36 @@
 import os
-import time
 import json
 from .response import Response
 
+def fill_prompts(prompts, key, value):
+    """Replace `{key}` placeholders in prompt names and texts."""
+
+    updated_prompts = {}
+
+    for skey, svalue in prompts.items():
+        new_key = skey.replace(f"{{{key}}}", value)
+        new_value = svalue.replace(f"{{{key}}}", value)
+        updated_prompts[new_key] = new_value
+
+    return updated_prompts
+
 class UserPromptLibrary:
 
-    def __init__(self):
+    def __init__(self, headless=None):
 
         self.instance_prompt = None
         self.save_path = None
         self.sample_prompt_file_path = None
-        self.response = Response()
+        self.response = Response(headless)
 
         self.upl = {}
 
     def update_config_data(self, prompts, key, value):
 
-        self.upl = {}
-
-        updated_prompts = {}
-
-        for skey, svalue in prompts.items():
-            new_key = skey.replace(f"{{{key}}}", value)
-            new_value = svalue.replace(f"{{{key}}}", value)
-            updated_prompts[new_key] = new_value
-
-        self.upl.update(updated_prompts)
+        self.upl = fill_prompts(prompts, key, value)
 
-        self.response.print(f"Updated key {key}: {value}",'s')   
-        time.sleep(0.5)
+        self.response.status(f"Updated key {key}: {value}")   
+        self.response.pause(0.5)
 
     def take_inputs(self, instance_prompt=None, save_path=None, sample_prompt_file_path=None):
        
@@ -69,7 +71,8 @@ class UserPromptLibrary:
         self.update_config_data(prompts,"--instance_prompt",self.instance_prompt)
 
         folder = f"{self.save_path}"        
-        time.sleep(1)
+        self.response.pause(1)
+        self.response.flush_status("Prompt library")
 
         os.makedirs(folder, exist_ok=True)
         self.response.print(f"Saving user_prompt_library to {folder}/user_prompt_library.json", 'i')
@@ -11,6 +11,11 @@ from rich.panel import Panel
 from rich.columns import Columns
 from time import sleep
 
+try:
+    from .catalog import Catalog
+except ImportError:
+    from catalog import Catalog
+
 class Tool:
     def __init__(self):
         print("Debug: Initializing Tool wrapper")
@@ -170,21 +175,7 @@ class ValidationGridTool:
 
     def scan_model_versions(self, model_name: str) -> list:
         """Scan for model versions in both output and config directories."""
-        versions = set()
-        
-        output_model_path = self.output_path / model_name
-        if output_model_path.exists():
-            output_versions = [p.name for p in output_model_path.iterdir() 
-                             if p.is_dir() and p.name != '.ipynb_checkpoints']
-            versions.update(output_versions)
-        
-        config_versions = [
-            p.name.split('-')[-1] for p in self.config_path.iterdir()
-            if p.is_dir() and p.name.startswith(f"{model_name}-")
-        ]
-        versions.update(config_versions)
-        
-        return sorted(versions, key=lambda x: str(x))
+        return Catalog(config_base=self.config_path, output_base=self.output_path).versions(model_name)
 
     def create_grid(self, images: List[Path], model: str, version: str) -> Optional[Image.Image]:
         try:
@@ -319,8 +310,7 @@ class ValidationGridTool:
                 print()  # Add space after loading message
                 
                 # Scan for models
-                models = [p.name for p in self.output_path.iterdir() 
-                         if p.is_dir() and p.name != '.ipynb_checkpoints']
+                models = Catalog(config_base=self.config_path, output_base=self.output_path).output_models()
                 
                 if not models:
                     self.console.print("[red]No models found.[/red]")
@@ -2,40 +2,55 @@ import sys
 import time
 import os
 import json
-import subprocess
+import importlib
 from pathlib import Path
 from classes.response import Response
-from classes.config import Config
-from classes.multidatabackend import MultiDataBackend
-from classes.userpromptlibrary import UserPromptLibrary
+
+# Command modules (config classes, tools) are imported by the command that
+# needs them, so quick commands like `easy list` start in tens of milliseconds
 
 response = Response()
 
 config_options_file_path = "/workspace/easy/settings/options.json"
+settings_file_path = "/workspace/easy/settings/easy.json"
 
 settings = None
-try:
-    with open("/workspace/easy/settings/easy.json", "r", encoding="utf-8") as setting_f:
-        settings = json.load(setting_f)
-except Exception as e:
-    response.print(f"Settings file not found or error reading settings:\n{e}", "e")
-    sys.exit(0)
-
-response.print(f"Settings loaded successfully", "s")
-time.sleep(0.5)
-response.console.clear()
-
-def find_folder(base_path, partial_name):
+
+def load_settings():
+    global settings
+    if settings is None:
+        try:
+            with open(settings_file_path, "r", encoding="utf-8") as setting_f:
+                settings = json.load(setting_f)
+        except Exception as e:
+            response.print(f"Settings file not found or error reading settings:\n{e}", "e")
+            sys.exit(0)
+    return settings
+
+def config_lookup():
+    from classes.lookup import ConfigLookup
+    return ConfigLookup(config_base=load_settings()["config_folder_path"])
+
+def find_config(query):
     try:
-        for folder in os.listdir(base_path):
-            if os.path.isdir(os.path.join(base_path, folder)) and partial_name in folder:
-                return folder
-    except FileNotFoundError:
-        response.print(f"Error: Directory '{base_path}' not found.", "e")
+        lookup = config_lookup()
+        config = lookup.best(query)
+        if not config:
+            suggestions = lookup.suggest(query)
+            if suggestions:
+                response.print(f"No config matches '{query}'. Did you mean: {', '.join(suggestions)}", "e")
+        return config
     except Exception as e:
-        response.print(f"Error finding folder:\n{e}", "e")
+        response.print(f"Error finding config folder:\n{e}", "e")
     return None
 
+def find_configs(query):
+    try:
+        return config_lookup().matches(query)
+    except Exception as e:
+        response.print(f"Error finding config folders:\n{e}", "e")
+    return []
+
 def find_folders(base_path, partial_name):
     folders = []
     try:
@@ -53,78 +68,114 @@ def find_folders(base_path, partial_name):
     return folders
 
 
-def init(args):
+def init_sweep(args):
+    """`easy init` with key=value lists after the usual arguments: one config per combination."""
     try:
-        response.console.clear()
-        response.print("Easy init\n-------------", "i")
+        from classes.sweep import Sweep, parse_sweep_args, expand, describe
 
-        config = Config()
-        verify = config.take_inputs(
+        settings = load_settings()
+        flags = {arg for arg in args[8:] if arg in ("--zip", "--dry-run")}
+        combinations = expand(parse_sweep_args([arg for arg in args[8:] if arg not in flags]),
+                              zipped="--zip" in flags)
+
+        started = time.perf_counter()
+        sweep = Sweep(
             instance_prompt=args[0],
             instance_prompt_version=args[1],
             dataset_folder=f"{settings['dataset_folder_path']}/{args[2]}",
             config_folder=settings["config_folder_path"],
             output_folder=settings["output_folder_path"],
             sample_config_file_path=f"{settings['scenario_folder_path']}/{args[3]}/config.json",
-            options_file=config_options_file_path,
             naming_preset_file=f"{settings['names_folder_path']}/{args[4]}.json",
+            id_base=args[5],
+            resolutions=[int(value.strip()) for value in str(args[6]).split(",")],
+            sample_prompt_file_path=f"{settings['prompt_folder_path']}/{args[7]}.json"
         )
+        planned = sweep.plan(combinations)
+
+        if "--dry-run" in flags:
+            for (folder, _), params in zip(planned, combinations):
+                response.print(f"{folder}  ({describe(params)})", "n")
+            response.print(f"\n{len(planned)} config(s) would be written", "i")
+            return
+
+        sweep.write(planned)
+        response.print(f"Easy init sweep wrote {len(planned)} config(s) to {settings['config_folder_path']} "
+                       f"in {time.perf_counter() - started:.2f}s", "s")
 
-        final_config_folder = None
+    except Exception as e:
+        response.print(f"Error in init sweep:\n{e}", "e")
+        sys.exit(1)
 
-        if verify:
-            config.editor()
-            final_config_folder = config.save()
 
-        mdb = MultiDataBackend()
+def init(args):
+    # Without the flag, EASY_HEADLESS decides
+    headless = True if "--headless" in args else None
+    args = [arg for arg in args if arg != "--headless"]
+    if len(args) > 8:
+        return init_sweep(args)
 
-        verify = mdb.take_inputs(
-            dataset_folder=f"{settings['dataset_folder_path']}/{args[2]}",
-            config_folder=final_config_folder,
-            id_base=args[5],
-            resolutions=[int(value.strip()) for value in str(args[6]).split(",")]
-        )
+    try:
+        from classes.generate import init_config
 
-        if verify:
-            mdb.resolve()
-            mdb.editor()
-            mdb.save()
+        settings = load_settings()
+        if not (headless or response.headless):
+            response.console.clear()
+        response.print("Easy init\n-------------", "i")
 
-        upl = UserPromptLibrary()
-        verify = upl.take_inputs(
+        result = init_config(
+            settings,
             instance_prompt=args[0],
-            save_path=final_config_folder,
-            sample_prompt_file_path=f"{settings['prompt_folder_path']}/{args[7]}.json"
+            version=args[1],
+            dataset=args[2],
+            scenario=args[3],
+            naming_preset=args[4],
+            id_base=args[5],
+            resolutions=[int(value.strip()) for value in str(args[6]).split(",")],
+            prompt_file=args[7],
+            headless=headless
         )
 
-        if verify:
-            upl.save()
-
-        response.print(f"\n\nEasy init finished successfully folder: {final_config_folder}", "s")
+        response.print(f"\n\nEasy init finished successfully folder: {result['folder']}", "s")
 
     except Exception as e:
         response.print(f"Error in init:\n{e}", "e")
         sys.exit(1)
 
 
+def batch(args=None):
+    """Create many config folders from a manifest in one process."""
+    try:
+        from classes.manifest import main
+
+        main(load_settings(), args or [])
+
+    except Exception as e:
+        response.print(f"Error in batch:\n{e}", "e")
+        sys.exit(1)
+
+
 def edit(args):
     try:
+        settings = load_settings()
         response.print("Easy edit\n-------------", "i")
 
         base_path = settings["config_folder_path"]
         ctype = args[1]
         name = args[0]  # Make sure you have this variable
 
-        edit_folder = find_folder(base_path, name)
+        edit_folder = find_config(name)
         if not edit_folder:
             response.print("Cannot find config folder to edit", "e")
             return
 
         if ctype == "config":
+            from classes.config import Config
             config = Config()
             config.direct_editor(f"{base_path}/{edit_folder}/config.json", config_options_file_path)
 
         elif ctype == "backend":
+            from classes.multidatabackend import MultiDataBackend
             mdb = MultiDataBackend()
             mdb.direct_editor(f"{base_path}/{edit_folder}/multidatabackend.json", settings['dataset_folder_path'])
         else:
@@ -136,64 +187,28 @@ def edit(args):
 
 
 def reinit(args):
-    try:
-        response.print("Easy reinit\n-------------", "i")
-
-        base_path = settings["config_folder_path"]
-        name = args[0]
-        edit_folder = find_folder(base_path, name)
+    headless = True if "--headless" in args else None
+    args = [arg for arg in args if arg != "--headless"]
 
-        if not edit_folder:
-            response.print("Cannot find config folder", "e")
-            return
+    try:
+        from classes.generate import reinit_config
 
-        config_file_path = f"{base_path}/{edit_folder}/config.json"
-        backend_file_path = f"{base_path}/{edit_folder}/multidatabackend.json"
-        upl_file_path = f"{base_path}/{edit_folder}/user_prompt_library.json"
+        settings = load_settings()
+        response.print("Easy reinit\n-------------", "i")
 
-        config = Config()
-        verify = config.take_inputs(
+        result = reinit_config(
+            settings,
+            name=args[0],
             instance_prompt=args[1],
-            instance_prompt_version=args[2],
-            dataset_folder=f"{settings['dataset_folder_path']}/{args[3]}",
-            config_folder=settings["config_folder_path"],
-            output_folder=settings["output_folder_path"],
-            sample_config_file_path=config_file_path,
-            options_file=config_options_file_path,
-            naming_preset_file=f"{settings['names_folder_path']}/{args[4]}.json",
-        )
-
-        final_config_folder = None
-
-        if verify:
-            config.editor()
-            final_config_folder = config.save()
-
-        mdb = MultiDataBackend()
-
-        verify = mdb.take_inputs(
-            dataset_folder=f"{settings['dataset_folder_path']}/{args[3]}",
-            config_folder=final_config_folder,
+            version=args[2],
+            dataset=args[3],
+            naming_preset=args[4],
             id_base=args[5],
-            resolutions=[int(value.strip()) for value in str(args[6]).split(",")]
+            resolutions=[int(value.strip()) for value in str(args[6]).split(",")],
+            headless=headless
         )
 
-        if verify:
-            mdb.resolve()
-            mdb.editor()
-            mdb.save()
-
-        upl = UserPromptLibrary()
-        verify = upl.take_inputs(
-            instance_prompt=args[1],
-            save_path=final_config_folder,
-            sample_prompt_file_path=upl_file_path
-        )
-
-        if verify:
-            upl.save()
-
-        response.print(f"\n\nEasy reinit finished successfully folder: {final_config_folder}", "s")
+        response.print(f"\n\nEasy reinit finished successfully folder: {result['folder']}", "s")
 
     except Exception as e:
         response.print(f"Error in reinit:\n{e}", "e")
@@ -202,14 +217,14 @@ def reinit(args):
 
 def lister(args):
     try:
+        settings = load_settings()
         response.print("Easy list\n-------------", "i")
 
         ctype = args[0]
         group = args[1] if len(args) > 1 else None
 
         if ctype == "config":
-            base_path = settings["config_folder_path"]
-            folders = find_folders(base_path, group)
+            folders = find_configs(args[1:])
             for folder in folders:
                 response.print(folder, "i")
         elif ctype == "datasets":
@@ -226,44 +241,139 @@ def lister(args):
 
 
 def train(args):
+    if args and args[0].startswith("--"):
+        return train_queue(args)
+
     try:
+        from classes.train_log import tee
 
+        settings = load_settings()
         response.console.clear()
         response.print("Easy train\n-------------", "i")
 
-        base_path = settings["config_folder_path"]
         name = args[0]
 
-        config = find_folder(base_path, name)
+        config = find_config(name)
         if not config:
             response.print("Cannot find config folder to train", "e")
             return
 
         response.print(f"Training:  {config}", "i")
 
-        subprocess.run(["bash", "train.sh", settings['simple_tuner_path'], config])
+        # Output is passed through, recorded and profiled; `easy runs` summarizes it
+        returncode = tee(["bash", "train.sh", settings['simple_tuner_path'], config], config,
+                         config_dir=Path(settings["config_folder_path"]) / config)
+        if returncode != 0:
+            response.print(f"Training exited with code {returncode}", "e")
+            return None
+        return config
 
     except Exception as e:
         response.print(f"Error in train:\n{e}", "e")
         sys.exit(1)
 
 
+def train_queue(args):
+    try:
+        from classes.train_queue import TrainQueue, main
+
+        if args[0] != "--enqueue":
+            return main(args)
+
+        settings = load_settings()
+        post_process = False if "--no-pp" in args else None
+        patterns = [arg for arg in args[1:] if not arg.startswith("--")]
+        if not patterns:
+            response.print("Usage: easy train --enqueue <pattern> [pattern ...] [--no-pp]", "e")
+            return
+
+        queue = TrainQueue()
+        # Each name pattern is matched on its own; key=value filters apply to all of them
+        filters = [pattern for pattern in patterns if "=" in pattern]
+        names = [pattern for pattern in patterns if "=" not in pattern] or [None]
+        configs = []
+        for name in names:
+            query = ([name] if name else []) + filters
+            configs.extend(folder for folder in find_configs(query) if folder not in configs)
+        if not configs:
+            response.print(f"No configs match {', '.join(patterns)}", "e")
+            return
+
+        for config in configs:
+            job_id = queue.enqueue_config(config, settings["simple_tuner_path"], post_process=post_process)
+            response.print(f"Queued {config} as job {job_id}", "s")
+        response.print("Check progress with: easy train --queue", "i")
+
+    except Exception as e:
+        response.print(f"Error in train queue:\n{e}", "e")
+        sys.exit(1)
+
+
+def find(args=None):
+    """Ranked config matches for names, name fragments and key=value filters."""
+    try:
+        from classes.lookup import EXACT, PREFIX, TOKEN_PREFIX, SUBSTRING
+
+        if not args:
+            response.print("Usage: easy find <name or fragment> [lr=1e-4 rank=16,32 ...]", "e")
+            return
+
+        lookup = config_lookup()
+        kinds = {EXACT: "exact", PREFIX: "prefix", TOKEN_PREFIX: "token", SUBSTRING: "contains"}
+        ranked = lookup.search(args, limit=50)
+        if not ranked:
+            response.print(f"No config matches {' '.join(args)}", "e")
+            return
+
+        columns = ["#", "Config", "Match", "lr", "rank", "batch", "optimizer", "steps"]
+        rows = []
+        for idx, (name, kind) in enumerate(ranked, 1):
+            row = lookup.rows[name]
+            rows.append([idx, name, kinds.get(kind, "similar"), row["learning_rate"], row["lora_rank"],
+                         row["train_batch_size"], row["optimizer"], row["max_train_steps"]])
+        response.edit_table("Configs", columns, rows)
+
+    except Exception as e:
+        response.print(f"Error in find:\n{e}", "e")
+        sys.exit(1)
+
+
+def runs(args=None):
+    try:
+        from classes.train_log import main
+
+        main(args or [])
+
+    except Exception as e:
+        response.print(f"Error in runs:\n{e}", "e")
+        sys.exit(1)
+
+
 def help(args=None): 
     try:
         command_map = {
-            "init": "<instance_prompt> <version> <dataset> <scenario> <naming_preset> <id_base> <resolutions> <prompt_file>",
-            "edit": "<partial config folder name> <type(config/backend)>",
-            "reinit": "<partial config folder name> <instance_prompt> <version> <dataset> <naming_preset> <id_base> <resolutions>",
-            "list": "<config/datasets> [group]",
-            "train": "<name>",
+            "init": "<instance_prompt> <version> <dataset> <scenario> <naming_preset> <id_base> <resolutions> <prompt_file> [--headless] [lr=1e-4,5e-5 rank=16,32 ... [--zip] [--dry-run]]",
+            "batch": "<manifest.json|yaml|csv> [--dry-run] [--workers N] - init/reinit every manifest row, validated up front",
+            "edit": "<config name or fragment> <type(config/backend)>",
+            "reinit": "<partial config folder name> <instance_prompt> <version> <dataset> <naming_preset> <id_base> <resolutions> [--headless]",
+            "list": "<config/datasets> [group] [lr=1e-4 rank=32 ...]",
+            "find": "<name or fragment> [lr=1e-4 rank=16,32 ...] - ranked config matches with their hyperparameters",
+            "train": "<name> | --enqueue <pattern> ... [--no-pp] | --queue | --cancel <id> | --retry <id> | --log <id> | --clear | --set <key> <value>",
+            "runs": "[pattern ...] [--sort date|loss|best|speed|steps] [--last N] | ingest <log> <config> - compare recorded training runs",
             "help": "Shows this help message",
             "lm": "LoRA mover (specific functionality not documented)",
             "ls": "LoRA sync (specific functionality not documented)",
             "dc": "Download configuration files",
             "vg": "Run validation grid",
             "dg": "Run dataset grid",
-            "pp": "Run post process",
-            "tpp": "Run train post process"
+            "la": "LoRA checkpoint statistics (norms, deltas, effective rank)",
+            "pp": "[--background] [--bundle] [--stages lm,upload,vg,dg,dc] [family|config ...] - post process with one selection, stages in parallel",
+            "tpp": "<config> [pp options] - train, then post process that config",
+            "cache": "clear [remote] - drop cached Dropbox listings",
+            "tq": "[list|cancel <id>|clear|log <id>|set <concurrency|bwlimit> <value>|metrics] - background transfer queue",
+            "rcd": "<start|stop|status> - shared rclone daemon reused by the sync tools",
+            "pull": "[--lazy] [--bundles] [--loras-only|--configs-only] [family ...] | fetch <family/version> | status - hydrate LoRAs and configs from Dropbox",
+            "bench": "[runs] - time cold starts of quick commands"
         }
 
         response.print("\n", "i")
@@ -278,57 +388,164 @@ def help(args=None):
         response.print(f"Error in help:\n{e}", "e")
         sys.exit(1)
 
+def remote_cache(args=None):
+    try:
+        from classes.rclone import RemoteListingCache
+
+        action = args[0] if args else "clear"
+        remote = args[1] if args and len(args) > 1 else None
+
+        if action == "clear":
+            RemoteListingCache().invalidate(remote)
+            response.print(f"Cleared remote listings for {remote or 'all remotes'}", "s")
+        else:
+            response.print("Unknown cache action. Use 'clear'.", "e")
+
+    except Exception as e:
+        response.print(f"Error in cache:\n{e}", "e")
+        sys.exit(1)
+
+def transfer_queue(args=None):
+    try:
+        from classes.transfer_queue import main
+
+        main(args or [])
+
+    except Exception as e:
+        response.print(f"Error in tq:\n{e}", "e")
+        sys.exit(1)
+
+def rclone_daemon(args=None):
+    try:
+        from classes.rclone import start_rcd, stop_rcd, rcd_pid, RCD_ADDR
+
+        action = args[0] if args else "status"
+
+        if action == "start":
+            response.print(f"rclone rcd running on {RCD_ADDR} (pid {start_rcd()})", "s")
+        elif action == "stop":
+            if stop_rcd():
+                response.print("rclone rcd stopped", "s")
+            else:
+                response.print("rclone rcd is not running", "i")
+        elif action == "status":
+            pid = rcd_pid()
+            response.print(f"rclone rcd running on {RCD_ADDR} (pid {pid})" if pid else "rclone rcd is not running", "i")
+        else:
+            response.print("Unknown rcd action. Use 'start', 'stop' or 'status'.", "e")
+
+    except Exception as e:
+        response.print(f"Error in rcd:\n{e}", "e")
+        sys.exit(1)
+
+def pull(args=None):
+    try:
+        from classes.hydrate import main
+
+        main(args or [])
+
+    except Exception as e:
+        response.print(f"Error in pull:\n{e}", "e")
+        sys.exit(1)
+
+# Interactive tools run in this interpreter; each module is imported on first use
+TOOLS = {
+    "lm": ("classes.lora_mover", "Tool"),
+    "ls": ("classes.lora_sync", "LoraSync"),
+    "dc": ("classes.download_configs", "Tool"),
+    "vg": ("classes.validation_grid", "Tool"),
+    "dg": ("classes.dataset_grid", "Tool"),
+    "la": ("classes.lora_stats", "Tool"),
+}
+
+def run_tool(name):
+    module_name, class_name = TOOLS[name]
+    try:
+        module = importlib.import_module(module_name)
+        getattr(module, class_name)().run()
+        return True
+    except Exception as e:
+        import traceback
+
+        # A failing tool must not stop the rest of a pp/tpp chain
+        response.print(f"Error in {module_name.split('.')[-1]}:\n{e}", "e")
+        traceback.print_exc()
+        return False
+
 def lora_mover():
-    # Use the full path to the script
-    script_path = str(Path(__file__).parent / "classes" / "lora_mover.py")
-    response.print(f"Running lora_mover from {script_path}", "i")
-    subprocess.run([sys.executable, script_path])
+    return run_tool("lm")
 
 def lora_sync():
-    # Use the full path to the script
-    script_path = str(Path(__file__).parent / "classes" / "lora_sync.py")
-    response.print(f"Running lora_sync from {script_path}", "i")
-    subprocess.run([sys.executable, script_path])
+    return run_tool("ls")
 
 def download_configs():
-    # Use the full path to the script
-    script_path = str(Path(__file__).parent / "classes" / "download_configs.py")
-    response.print(f"Running download_configs from {script_path}", "i")
-    subprocess.run([sys.executable, script_path])
+    return run_tool("dc")
 
 def validation_grid():
-    # Use the full path to the script
-    script_path = str(Path(__file__).parent / "classes" / "validation_grid.py")
-    response.print(f"Running validation_grid from {script_path}", "i")
-    subprocess.run([sys.executable, script_path])
+    return run_tool("vg")
 
 def dataset_grid():
-    # Use the full path to the script
-    script_path = str(Path(__file__).parent / "classes" / "dataset_grid.py")
-    response.print(f"Running dataset_grid from {script_path}", "i")
-    subprocess.run([sys.executable, script_path])
-
-def post_process():
-    lora_mover()
-    download_configs()
-    validation_grid()
-    dataset_grid()
-
-def train_post_process():
-    train()
-    lora_mover()
-    download_configs()
-    validation_grid()
-    dataset_grid()
+    return run_tool("dg")
+
+def lora_stats():
+    return run_tool("la")
+
+def bench(args=None):
+    """Time cold starts of quick commands in fresh interpreters."""
+    try:
+        import subprocess
+        import statistics
+
+        runs = int(args[0]) if args else 10
+        commands = [["-c", "pass"], [__file__, "help"], [__file__, "list", "config"]]
+
+        for command in commands:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                subprocess.run([sys.executable] + command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                timings.append((time.perf_counter() - started) * 1000)
+            label = "python (baseline)" if command[0] == "-c" else f"easy {' '.join(command[1:])}"
+            response.print(f"{label:<20} median {statistics.median(timings):6.1f} ms   min {min(timings):6.1f} ms", "i")
+
+    except Exception as e:
+        response.print(f"Error in bench:\n{e}", "e")
+        sys.exit(1)
+
+def post_process(args=None):
+    try:
+        from classes.pipeline import main
+
+        return main(args or [])
+
+    except Exception as e:
+        response.print(f"Error in pp:\n{e}", "e")
+        sys.exit(1)
+
+def train_post_process(args=None):
+    if not args:
+        response.print("Usage: easy tpp <partial config folder name> [pp options]", "e")
+        return
+
+    config = train(args[:1])
+    if not config:
+        response.print("Training did not finish; skipping post-processing", "e")
+        return
+
+    # Post-process exactly the config that was trained, without prompts
+    post_process([Path(config).name] + args[1:])
 
 def run():
     try:
         function_map = {
             "init": init,
             "reinit": reinit,
+            "batch": batch,
             "edit": edit,
             "train": train,
             "list": lister,
+            "find": find,
+            "runs": runs,
             "help": help,
             "h": help,
             "lm": lora_mover,
@@ -336,8 +553,14 @@ def run():
             "dc": download_configs,
             "vg": validation_grid,
             "dg": dataset_grid,
+            "la": lora_stats,
             "pp": post_process,
-            "tpp": train_post_process
+            "tpp": train_post_process,
+            "cache": remote_cache,
+            "tq": transfer_queue,
+            "rcd": rclone_daemon,
+            "pull": pull,
+            "bench": bench
         }
 
         if len(sys.argv) > 1: